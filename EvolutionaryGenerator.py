@@ -1,4 +1,3 @@
-import random as rnd
 import numpy as np
 import copy
 import math
@@ -6,22 +5,46 @@ from mingus.core import *
 from mingus.containers import *
 import track_functions as Track_Functions
 import fitness_functions as Fitness_Functions 
+import genome_functions as Genome_Functions
+import parallel_fitness as Parallel_Fitness
+import fitness_cache as Fitness_Cache
+import island_model as Island_Model
+import checkpoint as Checkpoint
+import rhythm_table as Rhythm_Table
 
 class EvolutionaryGenerator():
 
     def __init__(self, key, nr_bars = 2, fitness_function = 'C', global_max = None, input_melody = None, 
-            from_bar = None, to_bar = None, from_key = None, to_key = None, wildness = False, nr_generations = 500):
+            from_bar = None, to_bar = None, from_key = None, to_key = None, wildness = False, nr_generations = 500,
+            genome_mode = False, batch_fitness = False, nr_workers = 1, fitness_cache_size = 1000,
+            nr_islands = 1, migration_interval = 20, migration_size = 2, 
+            plateau_generations = None, min_relative_improvement = None, improvement_window = 20, min_diversity = None,
+            checkpoint_file = None, checkpoint_interval = 10, seed = None, bar_cache_size = 10000,
+            lazy_fitness_contenders = None):
         "Initialize all the parameters"
         
-        # When testing to regenerate same case:
-        #rnd.seed(1)
-        #np.random.seed(1)
+        # All random numbers are drawn from this generator. To regenerate the same case, give the same seed
+        # (an int or a numpy.random.Generator).
+        self.rng = np.random.default_rng(seed)
 
         # == Parameters ==
         self.fitness_function = fitness_function
         self.input_melody = input_melody
+        
+        # The pitch of the input melody at every semiquaver, so the two-voice measures do not have to search it
+        self.input_grid = None
+        if input_melody is not None:
+            self.input_grid = Track_Functions.pitch_grid(input_melody)
         self.from_bar = from_bar
         self.to_bar = to_bar
+        
+        # Notes are counted in ticks in the generator (see Track_Functions.TICKS_PER_BAR), so notes that are not 
+        # on the ticks are found here and not in the middle of a run
+        if input_melody is not None:
+            Track_Functions.check_on_ticks(input_melody, 'input_melody')
+        for name, bar in [('from_bar', from_bar), ('to_bar', to_bar)]:
+            if bar is not None:
+                Track_Functions.check_on_ticks([bar], name)
         self.from_key = from_key
         self.to_key = to_key
         
@@ -50,8 +73,69 @@ class EvolutionaryGenerator():
         
         self.wildness = wildness
         
+        # If True the population is stored as arrays on a semiquaver grid (see genome_functions) 
+        # instead of as Tracks. The best individual is still returned as a Track.
+        self.genome_mode = genome_mode
+        
+        # If True the harmony fitness is calculated for the whole population at once (see batch_tests)
+        self.batch_fitness = batch_fitness
+        
+        # If more than one, the fitness is calculated in this many worker processes (see parallel_fitness)
+        self.nr_workers = nr_workers
+        self.fitness_run = None
+        
+        # Fitness of individuals already seen in this run, 0 turns the cache off (see fitness_cache)
+        self.fitness_cache_size = fitness_cache_size
+        self.fitness_cache = None
+        
+        # Statistics of single bars, so only bars not seen before are measured, 0 turns the cache off (see fitness_functions.bar_measures). 
+        # Depends only on the bars, so it is kept between runs.
+        self.bar_cache_size = bar_cache_size
+        self.bar_cache = None
+        if bar_cache_size > 0:
+            self.bar_cache = Fitness_Cache.FitnessCache(bar_cache_size)
+        
+        # If given, the expensive two-voice features are only calculated for individuals that can be among the
+        # lazy_fitness_contenders best, the others get the highest fitness they can have (see 
+        # fitness_functions.calculate_fitness_profile_lazy). Must be at least the number of elite copies.
+        # Only exact fitness values are saved in the fitness cache, so the individuals drawn for a tournament that
+        # are not in it are calculated exactly before they are compared (see exact_fitness_values).
+        if lazy_fitness_contenders is not None and lazy_fitness_contenders < 1:
+            raise ValueError('lazy_fitness_contenders must be at least 1.')
+        if lazy_fitness_contenders is not None and fitness_cache_size == 0:
+            raise ValueError('lazy_fitness_contenders needs the fitness cache, fitness_cache_size must be above 0.')
+        self.lazy_fitness_contenders = lazy_fitness_contenders
+        
+        # If more than one, this many populations evolve in separate processes and every migration_interval 
+        # generations each sends its migration_size best individuals to the next one (see island_model)
+        self.nr_islands = nr_islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        
+        # Rules to stop before nr_generations, None turns a rule off (see check_stopping):
+        # no improvement in plateau_generations generations, 
+        # relative improvement in the last improvement_window generations below min_relative_improvement,
+        # fraction of unique individuals in the population below min_diversity.
+        self.plateau_generations = plateau_generations
+        self.min_relative_improvement = min_relative_improvement
+        self.improvement_window = improvement_window
+        self.min_diversity = min_diversity
+        
+        # Best fitness value of each generation and the reason the last run stopped
+        self.fitness_history = []
+        self.stop_reason = None
+        
+        # If a file name is given, the state of the run is saved there every checkpoint_interval generations 
+        # and when the run is finished. run_evolution resumes from the file if it exists (see checkpoint).
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_interval = checkpoint_interval
+        self.run_settings_hash = None
+        
         # Deciding here which note lengths that are allowed
         self.possible_lengths = [16, 8, 16/3, 4, 8/3, 2, 4/3, 1]
+        
+        # All bar rhythms that can be made of the possible lengths, see rhythm_table
+        self.rhythm_table = Rhythm_Table.get_rhythm_table(self.possible_lengths)
 
     def test_population(self):
         "Returns a population consisting of a single individual which is the C-scale."
@@ -76,69 +160,168 @@ class EvolutionaryGenerator():
         
     def run_evolution(self):
         
-        # Initialize population
-        self.population = self.initialize_population()
-        #self.population = self.test_population()
+        # Several populations evolving in parallel (see island_model)
+        if self.nr_islands > 1:
+            Island_Model.run_evolution(self)
+            return
         
-        fitness_values = np.zeros(self.population_size)
-        self.max_fitness_value = -5000
-        for iGen in range(self.nr_generations):
+        # Continue from the checkpoint if there is one
+        resumed_generation = None
+        if self.checkpoint_file is not None:
+            self.run_settings_hash = Checkpoint.settings_hash(self)
+            checkpoint = Checkpoint.load_checkpoint(self.checkpoint_file)
+            if checkpoint is not None:
+                resumed_generation, fitness_values = Checkpoint.restore_checkpoint(self, checkpoint)
+                if checkpoint['finished']:
+                    return
+        
+        if resumed_generation is None:
+            self.start_evolution()
+            first_generation = 0
+        else:
+            first_generation = resumed_generation
+        
+        for iGen in range(first_generation, self.nr_generations):
             
             # == Calculate fitness and save best individual ==
-            fitness_values = self.calculate_fitness()
-            
-            # Save a copy of the best individual
-            best_individual_index = np.argmax(fitness_values)        
-            self.best_individual = copy.deepcopy(self.population[best_individual_index])
-            
-            # Print best individual and its fitness value if better than before
-            if fitness_values[best_individual_index] > self.max_fitness_value:
-                print(f"Generation: {iGen}")
-                print(f"Best individual: {self.best_individual}")
-                print(f"Maximal fitness: {fitness_values[best_individual_index]}")
-                self.max_fitness_value = fitness_values[best_individual_index]
-                if self.max_fitness_value == self.global_max:
+            # The fitness of a resumed generation is saved in the checkpoint
+            if iGen != resumed_generation:
+                fitness_values = self.evaluate_generation(iGen)
+                self.stop_reason = self.check_stopping()
+                if self.stop_reason is not None:
                     break
+                
+                if self.checkpoint_file is not None and (iGen + 1) % self.checkpoint_interval == 0:
+                    Checkpoint.save_checkpoint(self, iGen, fitness_values)
             
-            # == Tournament selection ==
-            tmp_population = []
-            for i in range(self.population_size):
-                index_selected = self.tournament_selection(fitness_values, self.tournament_selection_parameter, self.tournament_size)
-                individual_selected = copy.deepcopy(self.population[index_selected])
-                tmp_population.append(individual_selected)
-            
-            
+            # == Create the next generation ==
+            self.next_generation(fitness_values)
+        
+        if self.stop_reason is None:
+            self.stop_reason = 'max_generations'
+        self.finish_evolution(iGen)
+        
+        if self.checkpoint_file is not None:
+            Checkpoint.save_checkpoint(self, iGen, None, finished = True)
+    
+    def start_evolution(self, population = None):
+        "Creates the fitness cache and the first population, if no population is given."
+        
+        # Start with an empty fitness cache for this run
+        if self.fitness_cache_size > 0:
+            self.fitness_cache = Fitness_Cache.FitnessCache(self.fitness_cache_size)
+        
+        # Initialize population
+        if population is not None:
+            self.population = population
+        elif self.genome_mode:
+            self.population = self.initialize_genome_population()
+        else:
+            self.population = self.initialize_population()
+        #self.population = self.test_population()
+        
+        self.max_fitness_value = -5000
+        self.fitness_history = []
+        self.stop_reason = None
+    
+    def evaluate_generation(self, iGen, fitness_values = None):
+        """Calculates the fitness of the population, unless fitness_values is given, and saves the best individual.
+        Returns the fitness values."""
+        
+        if fitness_values is None:
+            fitness_values = self.calculate_fitness()
+        
+        # Save the best individual. Individuals are never changed in place, so no copy is needed.
+        best_individual_index = np.argmax(fitness_values)        
+        self.best_individual = self.get_individual(best_individual_index)
+        
+        # Print best individual and its fitness value if better than before
+        if fitness_values[best_individual_index] > self.max_fitness_value:
+            print(f"Generation: {iGen}")
+            print(f"Best individual: {self.individual_to_track(self.best_individual)}")
+            print(f"Maximal fitness: {fitness_values[best_individual_index]}")
+            self.max_fitness_value = fitness_values[best_individual_index]
+        
+        self.fitness_history.append(fitness_values[best_individual_index])
+        
+        return fitness_values
+    
+    def check_stopping(self):
+        """Returns the reason to stop the evolution after the last evaluated generation, or None to continue.
+        The reasons are 'global_max', 'plateau', 'min_improvement' and 'diversity'."""
+        
+        history = self.fitness_history
+        
+        if self.max_fitness_value == self.global_max:
+            return 'global_max'
+        
+        # No improvement in the last plateau_generations generations
+        if self.plateau_generations is not None and len(history) > self.plateau_generations:
+            if max(history[-self.plateau_generations:]) <= history[-self.plateau_generations - 1]:
+                return 'plateau'
+        
+        # Too small relative improvement in the last improvement_window generations
+        if self.min_relative_improvement is not None and len(history) > self.improvement_window:
+            previous_best = history[-self.improvement_window - 1]
+            improvement = history[-1] - previous_best
+            if improvement <= self.min_relative_improvement*abs(previous_best):
+                return 'min_improvement'
+        
+        # Too few unique individuals left in the population
+        if self.min_diversity is not None:
+            nr_unique = len(set(self.individual_hash(i) for i in range(len(self.population))))
+            if nr_unique/len(self.population) < self.min_diversity:
+                return 'diversity'
+        
+        return None
+    
+    def next_generation(self, fitness_values):
+        "Replaces the population with a new one created by selection, crossover, mutation and elitism."
+        
+        # == Tournament selection ==
+        indices_selected = self.tournament_selection_batch(fitness_values, self.tournament_selection_parameter, 
+                self.tournament_size, self.population_size)
+        # The selected Tracks are shared, crossover and mutation create new Tracks when they change something
+        tmp_population = self.select_individuals(indices_selected)
+        
+        
+        if self.genome_mode:
+            # == Crossover and mutation of the whole population as arrays ==
+            self.cross_over_population_genome(tmp_population)
+            self.mutate_population_genome(tmp_population)
+        
+        else:
             # == Crossover ==
             for iCross in range(0, self.population_size-1, 2):
-                chromosome1 = tmp_population[iCross]
-                chromosome2 = tmp_population[iCross + 1]
-                
-                r_cross = rnd.random()
+                r_cross = self.rng.random()
                 if r_cross < self.crossover_probability:
+                    chromosome1 = tmp_population[iCross]
+                    chromosome2 = tmp_population[iCross + 1]
                     crossed_pair = self.cross_over([chromosome1, chromosome2])
                     tmp_population[iCross] = crossed_pair[0]
                     tmp_population[iCross + 1] = crossed_pair[1]
-                
             
             # == Mutation ==            
             for i in range(self.population_size):
                 tmp_population[i] = self.mutate(tmp_population[i])
-            
-                        
-            # == Elitism ==            
-            tmp_population = self.insert_best_individual(tmp_population, self.best_individual)
-            
-            
-            # == Save generation ==
-            self.population = tmp_population
-            
+        
+                    
+        # == Elitism ==            
+        tmp_population = self.insert_best_individual(tmp_population, self.best_individual)
+        
+        
+        # == Save generation ==
+        self.population = tmp_population
+    
+    def finish_evolution(self, iGen):
+        "Calculates the fitness of the last population and saves the best individual as a Track."
         
         # == Calculate fitness and save best individual ==
         fitness_values = self.calculate_fitness()
         
-        # Save a copy of the best individual
+        # Save the best individual
         best_individual_index = np.argmax(fitness_values)        
-        self.best_individual = copy.deepcopy(self.population[best_individual_index])
+        self.best_individual = self.individual_to_track(self.get_individual(best_individual_index))
         
         # Print best individual and its fitness value if better than before
         if fitness_values[best_individual_index] > self.max_fitness_value:
@@ -146,6 +329,15 @@ class EvolutionaryGenerator():
             print(f"Best individual: {self.best_individual}")
             print(f"Maximal fitness: {fitness_values[best_individual_index]}")
             self.max_fitness_value = fitness_values[best_individual_index]
+        
+        print(f"Stopped after generation {iGen}: {self.stop_reason}")
+        if self.fitness_cache is not None:
+            print(f"Fitness cache: {self.fitness_cache.hits} hits, {self.fitness_cache.misses} misses")
+        
+        # The fixed inputs saved for the worker processes are not needed anymore
+        if self.fitness_run is not None:
+            Parallel_Fitness.end_run(self.fitness_run)
+            self.fitness_run = None
     
     def initialize_population(self, meter = (4,4), min_pitch = -12, max_pitch = 24):
         """Create the population consisting of the wanted number of
@@ -155,22 +347,19 @@ class EvolutionaryGenerator():
         
         scale_tones = scales.get_notes(key = self.key)
         
+        # Decide the rhythm of every bar
+        rhythms = self.rhythm_table.draw_rhythms(self.rng, (self.population_size, self.nr_bars))
+        
         for i in range(self.population_size):
             melody = Track()            
             
-            for i in range(self.nr_bars):
+            for j in range(self.nr_bars):
                 bar = Bar(self.key, meter)
-                while not bar.is_full():
-                    # Decide length of a note. Maximum length is what is left of this bar.
-                    length_left = 1 - bar.current_beat
-                    
-                    length = 0.5
-                    while 1/length > length_left:
-                        length = rnd.choice(self.possible_lengths)
-                    
+                for nr_slots in self.rhythm_table.rhythms[rhythms[i, j]]:
+                    length = Genome_Functions.slots_to_duration(nr_slots)
                     
                     # Decide pitch of a note                
-                    r = rnd.random()
+                    r = self.rng.random()
                     if r < self.probability_rest:
                         pitch_tone = None
                         # Add note to bar with the decided length                        
@@ -190,21 +379,58 @@ class EvolutionaryGenerator():
         
         return population
 
+    def initialize_genome_population(self):
+        """Create the population in genome mode. The melodies are randomized
+        in the same way as in initialize_population.
+        """
+        population = Genome_Functions.empty_population(self.population_size, self.nr_bars)
+        size = population.pitch.shape
+        
+        scale_tones = scales.get_notes(key = self.key)
+        
+        # Decide the rhythm of every bar
+        rhythms = self.rhythm_table.draw_rhythms(self.rng, (self.population_size, self.nr_bars))
+        population.onset = self.rhythm_table.onsets[rhythms].reshape(size)
+        
+        # Decide pitch of every slot, the slots where a note starts give the pitch of the note
+        r = self.rng.random(size)
+        note_pitches = np.where(r < self.probability_rest, Genome_Functions.REST, 
+                self.get_random_note_pitches(scale_tones, size))
+        note_starts = np.maximum.accumulate(np.where(population.onset, np.arange(size[1]), 0), axis = 1)
+        population.pitch[:] = np.take_along_axis(note_pitches, note_starts, axis = 1)
+        
+        return population
+
     def get_random_note_pitch(self, scale_tones):
         "Generates a note with random pitch"
         
         # Choose one random tone in the scale
-        note_letter = rnd.choice(scale_tones)
+        note_letter = self.random_choice(scale_tones)
         
         # Choose one random octave, with more chance to get close to 4.
         octave = 4 
         if self.wildness:
-            octave = round(np.random.normal(loc = 4, scale = 0.5))
+            octave = round(self.rng.normal(loc = 4, scale = 0.5))
              
         # Note: Might be problematic if a octave number that is too high or too low is chosen.
         note = Note(note_letter, octave)
         
         return note
+    
+    def get_random_note_pitches(self, scale_tones, size):
+        "Array version of get_random_note_pitch, returns an array of the given size with integer pitches."
+        
+        tone_pitches = np.array([int(Note(note_letter, 4)) for note_letter in scale_tones])
+        note_pitches = tone_pitches[self.rng.integers(len(tone_pitches), size = size)]
+        if self.wildness:
+            octaves = np.round(self.rng.normal(loc = 4, scale = 0.5, size = size)).astype(int)
+            note_pitches += 12*(octaves - 4)
+        
+        return note_pitches
+    
+    def random_choice(self, values):
+        "Returns a random element of the list values, of the same type as the element."
+        return values[int(self.rng.integers(len(values)))]
  
     def cross_over(self, chromosomes):
         """Change chromosome by using crossover between two chromosomes.
@@ -212,9 +438,9 @@ class EvolutionaryGenerator():
         between the two chromosomes.
         """
         
-        # Decide at which semiquaver to cross
-        bar_to_break_in = rnd.randrange(self.nr_bars)
-        beat_to_break_at = rnd.randrange(16)/16
+        # Decide at which semiquaver to cross, in ticks from the start of the bar
+        bar_to_break_in = int(self.rng.integers(self.nr_bars))
+        tick_to_break_at = int(self.rng.integers(16))*(Track_Functions.TICKS_PER_BAR//16)
         
         
         # Initialize list to save heads and tails of each chromosome      
@@ -240,38 +466,38 @@ class EvolutionaryGenerator():
                 # The break bar is breaked in two parts.
                 else:
                     # If breaking between bars, add the break bar to the tail
-                    if beat_to_break_at == 0:
+                    if tick_to_break_at == 0:
                         tail_chromosome[iChrom].add_bar(bar)
                         bar_nr += 1
                         continue
                     
-                    beat = 0
+                    tick = 0
                     note_index = 0
-                    while beat < 1.0:
+                    while tick < Track_Functions.TICKS_PER_BAR:
                         note_pitch = bar[note_index][2]
                         note_duration = bar[note_index][1]
+                        note_ticks = Track_Functions.duration_to_ticks(note_duration)
                     
                         # If note stops before or at breakpoint, add to first part
-                        if beat + 1/bar[note_index][1] <= beat_to_break_at:
+                        if tick + note_ticks <= tick_to_break_at:
                             end_head_chromosome[iChrom].place_notes(note_pitch, note_duration)
                         
                         # If note starts at or after breakpoint, add to second part
-                        elif beat >= beat_to_break_at:
+                        elif tick >= tick_to_break_at:
                             # If the first one after break, add it at the breakpoint. Otherwise, add it after the previous.
-                            if beat == beat_to_break_at:
-                                start_tail_chromosome[iChrom].current_beat = beat_to_break_at
+                            if tick == tick_to_break_at:
+                                start_tail_chromosome[iChrom].current_beat = Track_Functions.ticks_to_beat(tick_to_break_at)
                                 
                             start_tail_chromosome[iChrom].place_notes(note_pitch, note_duration)
                         
                         else:  
-                            # Divide to one part from beat to breakpoint, and one the length left over starting at breakpoint
-                            first_part_duration = 1/(beat_to_break_at - beat)
-                            second_part_duration = 1/(1/note_duration - 1/first_part_duration)
+                            # Divide to one part from the note start to breakpoint, and one the length left over starting at breakpoint
+                            first_part_ticks = tick_to_break_at - tick
                             
-                            end_head_chromosome[iChrom].place_notes(note_pitch, first_part_duration)
-                            start_tail_chromosome[iChrom].current_beat = beat_to_break_at
-                            start_tail_chromosome[iChrom].place_notes(note_pitch, second_part_duration)
-                        beat += 1/bar[note_index][1]
+                            end_head_chromosome[iChrom].place_notes(note_pitch, Track_Functions.ticks_to_duration(first_part_ticks))
+                            start_tail_chromosome[iChrom].current_beat = Track_Functions.ticks_to_beat(tick_to_break_at)
+                            start_tail_chromosome[iChrom].place_notes(note_pitch, Track_Functions.ticks_to_duration(note_ticks - first_part_ticks))
+                        tick += note_ticks
                         note_index += 1
                         
                 bar_nr += 1
@@ -281,7 +507,7 @@ class EvolutionaryGenerator():
         cross_chromosomes = []
         for i in range(2):
         
-            if beat_to_break_at != 0:
+            if tick_to_break_at != 0:
                 # Combine the two middle parts in the new way
                 middle_bars.append(self.combine_bars(end_head_chromosome[i], start_tail_chromosome[1-i]))
                 
@@ -300,46 +526,89 @@ class EvolutionaryGenerator():
     def combine_bars(self, bar1, bar2):
     
         new_bar = Bar(self.key)
-        end_bar1 = bar1.current_beat
-        start_bar2 = bar2[0][0]
+        end_bar1 = Track_Functions.beat_to_ticks(bar1.current_beat)
+        start_bar2 = Track_Functions.beat_to_ticks(bar2[0][0])
         
         if end_bar1 > start_bar2:
             raise ValueError('Bars overlapping.')
         
         if end_bar1 < start_bar2:
             # Fill the void with rests
-            difference_duration = 1/(start_bar2 - end_bar1)
-            bar1.place_rest(difference_duration)
-            end_bar1 = bar1.current_beat
-        
-        if end_bar1 == start_bar2:
-            for note in bar1:
-                note_duration = note[1]
-                note_type = note[2]
-                
-                if note_type is None:
-                    new_bar.place_rest(note_duration)
-                else:
-                    new_bar.place_notes(note_type, note_duration)
-                    
-            for note in bar2:
-                note_duration = note[1]
-                note_type = note[2]
+            bar1.place_rest(Track_Functions.ticks_to_duration(start_bar2 - end_bar1))
+        
+        for note in bar1:
+            note_duration = note[1]
+            note_type = note[2]
+            
+            if note_type is None:
+                new_bar.place_rest(note_duration)
+            else:
+                new_bar.place_notes(note_type, note_duration)
                 
-                if note_type is None:
-                    new_bar.place_rest(note_duration)
-                else:
-                    new_bar.place_notes(note_type, note_duration)
+        for note in bar2:
+            note_duration = note[1]
+            note_type = note[2]
+            
+            if note_type is None:
+                new_bar.place_rest(note_duration)
+            else:
+                new_bar.place_notes(note_type, note_duration)
         
         return new_bar
 
+    def cross_over_genome(self, population, index):
+        """Genome mode version of cross_over. Exchanges the tails of the individuals at
+        index and index + 1 in the population after a random semiquaver.
+        A note that is split by the break keeps its pitch on both sides of the break.
+        """
+        
+        # Decide at which semiquaver to cross
+        bar_to_break_in = int(self.rng.integers(self.nr_bars))
+        slot_to_break_at = int(self.rng.integers(Genome_Functions.SLOTS_PER_BAR))
+        cut = bar_to_break_in*Genome_Functions.SLOTS_PER_BAR + slot_to_break_at
+        
+        for values in [population.pitch, population.onset]:
+            tail = values[index, cut:].copy()
+            values[index, cut:] = values[index + 1, cut:]
+            values[index + 1, cut:] = tail
+        
+        population.onset[index:index + 2, cut] = True
+
+    def cross_over_population_genome(self, population):
+        """Batch version of cross_over_genome. Decides crossover for all pairs (index, index + 1) 
+        of the population at once and exchanges the tails of the crossed pairs."""
+        
+        slots_per_bar = Genome_Functions.SLOTS_PER_BAR
+        nr_pairs = len(population)//2
+        nr_slots = population.pitch.shape[1]
+        
+        # Draw the random numbers of all pairs at once
+        r_cross = self.rng.random(nr_pairs)
+        cuts = (self.rng.integers(self.nr_bars, size = nr_pairs)*slots_per_bar 
+                + self.rng.integers(slots_per_bar, size = nr_pairs))
+        
+        crossed_pairs = np.flatnonzero(r_cross < self.crossover_probability)
+        first = 2*crossed_pairs
+        second = first + 1
+        cuts = cuts[crossed_pairs]
+        
+        is_tail = np.arange(nr_slots) >= cuts[:, None]
+        for values in [population.pitch, population.onset]:
+            values1 = values[first]
+            values2 = values[second]
+            values[first] = np.where(is_tail, values2, values1)
+            values[second] = np.where(is_tail, values1, values2)
+        
+        population.onset[first, cuts] = True
+        population.onset[second, cuts] = True
+
     def tournament_selection(self, fitness_values, 
             tournament_selection_parameter, tournament_size):
         "Select index of new individual by using tournament selection"
     
         # == Choose individuals for the tournament ==
         
-        chosen_indices = [rnd.randrange(self.population_size) for i in range(tournament_size)]
+        chosen_indices = [int(self.rng.integers(self.population_size)) for i in range(tournament_size)]
         
         # == Sort chosen indices with highest fitness first ==
         
@@ -359,23 +628,50 @@ class EvolutionaryGenerator():
         # == Run the tournament selection ==
         
         for i in range(tournament_size - 1):
-            r = rnd.random()
+            r = self.rng.random()
             if r < tournament_selection_parameter:
                 index_selected = sort_index[i]
                 return index_selected
         index_selected = sort_index[-1]
         return index_selected
+    
+    def tournament_selection_batch(self, fitness_values, 
+            tournament_selection_parameter, tournament_size, nr_selected):
+        """Batch version of tournament_selection. Runs nr_selected tournaments at once and returns 
+        an array with the selected indices. Gives the same distribution as tournament_selection."""
+        
+        fitness_values = np.asarray(fitness_values)
+        
+        # == Choose individuals for all tournaments, one row per tournament ==
+        
+        chosen_indices = self.rng.integers(len(fitness_values), size = (nr_selected, tournament_size))
+        
+        # == Fitness values that are only bounds are calculated exactly before they are compared ==
+        
+        fitness_values = self.exact_fitness_values(fitness_values, chosen_indices)
+        
+        # == Sort each row in the same order as tournament_selection (by fitness, then index) ==
+        
+        order = np.lexsort((chosen_indices, fitness_values[chosen_indices]), axis = -1)
+        sort_index = np.take_along_axis(chosen_indices, order, axis = -1)
+        
+        # == Run the tournament selection ==
+        
+        # The position selected is the number of failed draws before the first r < tournament_selection_parameter,
+        # or the last position if all draws fail
+        if tournament_selection_parameter <= 0:
+            positions = np.full(nr_selected, tournament_size - 1)
+        else:
+            positions = self.rng.geometric(min(tournament_selection_parameter, 1), size = nr_selected) - 1
+            positions = np.minimum(positions, tournament_size - 1)
+        
+        return sort_index[np.arange(nr_selected), positions]
 
     def mutate(self, chromosome):
         """Mutate each gene with a certain probability. Can either split the note into two 
         notes of same pitch, shorten tone and add pause at the rest part or longer the note 
-        and delete any notes that where there previously."""
-        
-        mutated_chromosome = Track()
-        
-        # Set key
-        b = Bar(self.key)
-        mutated_chromosome.add_bar(b)
+        and delete any notes that where there previously. 
+        Returns the same chromosome if no note is mutated, otherwise a new one."""
         
         # Calculate number of notes in the chromosome
         nr_notes_in_chromosome = len([i for i in chromosome.get_notes()])
@@ -383,49 +679,63 @@ class EvolutionaryGenerator():
         # Decide mutation probability
         mutation_probability = 2/nr_notes_in_chromosome
         
+        # Decide for each note if it should be mutated, if it is not covered by a mutated note before it
+        mutation_draws = self.rng.random(nr_notes_in_chromosome)
+        if min(mutation_draws) >= mutation_probability:
+            return chromosome
+        
+        mutated_chromosome = Track()
+        
+        # Set key
+        b = Bar(self.key)
+        mutated_chromosome.add_bar(b)
+        
         input_notes = chromosome.get_notes()
           
+        # Beats are counted in ticks (see Track_Functions.TICKS_PER_BAR)
+        ticks_per_bar = Track_Functions.TICKS_PER_BAR
         notes_added = False
         ind = 0
-        current_beat = 0
+        current_tick = 0
         for note in input_notes:
             ind += 1
-            current_beat = (current_beat % 1)
+            current_tick = (current_tick % ticks_per_bar)
             
-            if current_beat == 0.0 and notes_added:
+            if current_tick == 0 and notes_added:
                 if len(mutated_chromosome) == self.nr_bars:
                     break
                 else:
-                    current_beat += 1
+                    current_tick += ticks_per_bar
             
             if not notes_added:
                 notes_added = True
             
-            note_beat = note[0]
+            note_tick = Track_Functions.beat_to_ticks(note[0])
             note_duration = note[1]
+            note_ticks = Track_Functions.duration_to_ticks(note_duration)
             note_pitch = note[2]
 
             # If completely covered by previous note, skip this note
-            if note_beat < current_beat and note_beat != current_beat % 1:
-                if note_beat + 1/note_duration <= current_beat:
+            if note_tick < current_tick and note_tick != current_tick % ticks_per_bar:
+                if note_tick + note_ticks <= current_tick:
                 
                     continue
             
             # If the previous note is partly covered by previous note, add the not covered part
-            if note_beat < current_beat and note_beat != current_beat % 1:
-                new_note_duration = 1/(note_beat + 1/note_duration - current_beat)
-                mutated_chromosome.add_notes(note_pitch, duration = new_note_duration)
-                current_beat += 1/new_note_duration
+            if note_tick < current_tick and note_tick != current_tick % ticks_per_bar:
+                new_note_ticks = note_tick + note_ticks - current_tick
+                mutated_chromosome.add_notes(note_pitch, duration = Track_Functions.ticks_to_duration(new_note_ticks))
+                current_tick += new_note_ticks
                 continue
             
             # If not affected by mutations on previous notes, check if this one should be mutated
                 
-            r = rnd.random()            
+            r = mutation_draws[ind - 1]
             if r < mutation_probability:
                 # Mutate this note
                 
                 # Either change the pitch of the note                    
-                r_pitch = rnd.random()
+                r_pitch = self.rng.random()
                 if r_pitch < self.pitch_probability:
                 
                     # Mutate the pitch
@@ -433,35 +743,35 @@ class EvolutionaryGenerator():
                     
                     # Add mutated note to the mutated chromosome
                     mutated_chromosome.add_notes(note_pitch, note_duration)
-                    current_beat += 1/note_duration
+                    current_tick += note_ticks
                 
                 # Or change the length of the note
                 else:
                     
-                    max_duration = 1/(1-(current_beat%1))
+                    max_duration = Track_Functions.ticks_to_duration(ticks_per_bar - current_tick % ticks_per_bar)
                     
                     # Mutate the duration
                     note_duration = self.mutate_duration(note_duration, max_duration)
                     
                     # Add mutated note to the mutated chromosome
                     mutated_chromosome.add_notes(note_pitch, note_duration[0])
-                    current_beat += 1/note_duration[0]
+                    current_tick += Track_Functions.duration_to_ticks(note_duration[0])
                     
                     # If duration change is negative, fill up the empty space with note of
                     # same pitch or a rest.                    
                     if len(note_duration) > 1:
-                        r_split = rnd.random()
+                        r_split = self.rng.random()
                         if r_split < self.pause_probability:
                             mutated_chromosome.add_notes(note_pitch, note_duration[1])
                         else:
                             mutated_chromosome.add_notes(None, note_duration[1])
-                        current_beat += 1/note_duration[1]
+                        current_tick += Track_Functions.duration_to_ticks(note_duration[1])
                         
                     continue
             # If no mutation, add the old note
             else:
                 mutated_chromosome.add_notes(note_pitch, note_duration)
-                current_beat += 1/note_duration
+                current_tick += note_ticks
                         
         if len(mutated_chromosome) != self.nr_bars:
             # Some error must have occured
@@ -484,7 +794,7 @@ class EvolutionaryGenerator():
         # If the note had a pitch, change it slightly
         else:
             # Decide change of pitch in halfnotes
-            pitch_change = round(np.random.normal(scale = 4))
+            pitch_change = round(self.rng.normal(scale = 4))
             octave_change = 0
             if abs(pitch_change) > 11:
                 octave_change = pitch_change // 12
@@ -493,8 +803,9 @@ class EvolutionaryGenerator():
             interval_change = Track_Functions.get_interval_from_halfnotes(pitch_change)
             up = (pitch_change > 0)
             
-            # Change the pitch (which is a NoteContainer)
-            note_pitch = note_pitch.transpose(interval_change, up)
+            # Change the pitch (which is a NoteContainer). The container may be shared with other
+            # individuals, so a copy is changed.
+            note_pitch = copy.deepcopy(note_pitch).transpose(interval_change, up)
             for each_note_pitch in note_pitch:
                 each_note_pitch.change_octave(octave_change)
                 if len(each_note_pitch.name) > 2:
@@ -506,80 +817,367 @@ class EvolutionaryGenerator():
         "Mutates the duration and returns list of new durations"
     
         durations = []
-        for ind_max in range(len(self.possible_lengths)):
-            if self.possible_lengths[ind_max] < max_duration:
-                break
-        
-        
-        # Decide how much to change the length
-        new_note_duration = rnd.choice(self.possible_lengths[:ind_max])
-        while 1/new_note_duration > 1/max_duration:
-            new_note_duration = rnd.choice(self.possible_lengths)
-            
         
-        if new_note_duration < 0:
-            breakpoint()
+        # Decide how much to change the length, among the lengths that fit in what is left of the bar. 
+        # A mutated note is never a whole note.
+        slots_left = round(Genome_Functions.SLOTS_PER_BAR/max_duration)
+        fitting_lengths = self.rhythm_table.fitting_lengths(min(slots_left, Genome_Functions.SLOTS_PER_BAR - 1))
+        new_note_duration = Genome_Functions.slots_to_duration(int(self.random_choice(fitting_lengths)))
         durations.append(new_note_duration)
            
-        length_change = 1/new_note_duration - 1/note_duration
+        length_change = Track_Functions.duration_to_ticks(new_note_duration) - Track_Functions.duration_to_ticks(note_duration)
            
         # If making the note shorter, fill up the space
         if length_change < 0:                    
             # Decide if the note should be split
-            second_note_duration = -1/length_change
-            durations.append(second_note_duration)
+            durations.append(Track_Functions.ticks_to_duration(-length_change))
         
         return durations
     
+    def mutate_genome(self, pitch, onset):
+        """Genome mode version of mutate. Changes the pitch and onset arrays of one 
+        individual in place, with the same kind of mutations as mutate."""
+        
+        slots_per_bar = Genome_Functions.SLOTS_PER_BAR
+        starts, lengths = Genome_Functions.note_lengths(onset)
+        
+        # Decide mutation probability
+        mutation_probability = 2/len(starts)
+        
+        # Slot where the last mutated note ends
+        covered_until = 0
+        for start, length in zip(starts.tolist(), lengths.tolist()):
+            end = start + length
+            
+            # If completely or partly covered by a previous note, the part that is left is already in place
+            if start < covered_until:
+                continue
+            
+            r = self.rng.random()            
+            if r >= mutation_probability:
+                continue
+            
+            # Either change the pitch of the note                    
+            r_pitch = self.rng.random()
+            if r_pitch < self.pitch_probability:
+                pitch[start:end] = self.mutate_genome_pitch(pitch[start])
+                continue
+            
+            # Or change the length of the note
+            slots_left = slots_per_bar - start % slots_per_bar
+            note_duration = self.mutate_duration(Genome_Functions.slots_to_duration(length), slots_per_bar/slots_left)
+            new_length = Genome_Functions.duration_to_slots(note_duration[0])
+            
+            if new_length < length:
+                # Fill up the empty space with note of same pitch or a rest
+                onset[start + new_length] = True
+                r_split = self.rng.random()
+                if r_split >= self.pause_probability:
+                    pitch[start + new_length:end] = Genome_Functions.REST
+            
+            elif new_length > length:
+                # The note covers the start of the following notes
+                pitch[start:start + new_length] = pitch[start]
+                onset[start + 1:start + new_length] = False
+                if start + new_length < len(onset):
+                    onset[start + new_length] = True
+            
+            covered_until = start + new_length
+
+    def mutate_genome_pitch(self, note_pitch):
+        "Genome mode version of mutate_pitch, returns the new integer pitch."
+        
+        # If the note was a rest, generate a random pitch
+        if note_pitch == Genome_Functions.REST:
+            scale_tones = scales.get_notes(self.key)
+            return int(self.get_random_note_pitch(scale_tones))
+        
+        # Decide change of pitch in halfnotes
+        pitch_change = round(self.rng.normal(scale = 4))
+        
+        # get_interval_from_halfnotes gives a seventh down for whole octaves, 
+        # so mutate_pitch moves those notes 11 halfnotes less.
+        if pitch_change % 12 == 0:
+            pitch_change -= 11
+        
+        return int(note_pitch) + pitch_change
+    
+    def mutate_population_genome(self, population):
+        """Batch version of mutate_genome, mutates all individuals of the population in place.
+        The random numbers are drawn as arrays with one value per slot, and then the first mutated
+        note of all individuals is changed at once, then the second mutated note and so on."""
+        
+        slots_per_bar = Genome_Functions.SLOTS_PER_BAR
+        pitch = population.pitch
+        onset = population.onset
+        nr_individuals, nr_slots = pitch.shape
+        slot_indices = np.arange(nr_slots)
+        
+        # Slot where the note starting in each slot ends, that is the next onset
+        next_onset = np.where(onset, slot_indices, nr_slots)
+        next_onset = np.minimum.accumulate(next_onset[:, ::-1], axis = 1)[:, ::-1]
+        note_ends = np.concatenate([next_onset[:, 1:], np.full((nr_individuals, 1), nr_slots)], axis = 1)
+        
+        # Draw all random numbers of the generation
+        size = (nr_individuals, nr_slots)
+        r = self.rng.random(size)
+        r_pitch = self.rng.random(size)
+        r_length = self.rng.random(size)
+        r_split = self.rng.random(size)
+        pitch_changes = np.round(self.rng.normal(scale = 4, size = size)).astype(int)
+        random_pitches = self.get_random_note_pitches(scales.get_notes(self.key), size)
+        
+        # get_interval_from_halfnotes gives a seventh down for whole octaves, 
+        # so mutate_pitch moves those notes 11 halfnotes less.
+        pitch_changes[pitch_changes % 12 == 0] -= 11
+        
+        # Decide mutation probability and which notes to mutate
+        mutation_probability = 2/np.sum(onset, axis = 1)
+        is_mutated = onset & (r < mutation_probability[:, None])
+        nr_mutated = int(np.max(np.sum(is_mutated, axis = 1), initial = 0))
+        mutated_slots = np.sort(np.where(is_mutated, slot_indices, nr_slots), axis = 1)[:, :nr_mutated]
+        
+        def fill(values, rows, from_slots, to_slots, new_values):
+            "Sets values[row, from_slot:to_slot] = new_value for each row."
+            in_range = (slot_indices >= from_slots[:, None]) & (slot_indices < to_slots[:, None])
+            values[rows] = np.where(in_range, np.asarray(new_values)[..., None], values[rows])
+        
+        # Slot where the last mutated note ends
+        covered_until = np.zeros(nr_individuals, dtype = int)
+        for iMutated in range(nr_mutated):
+            starts = mutated_slots[:, iMutated]
+            
+            # If completely or partly covered by a previous note, the part that is left is already in place
+            rows = np.flatnonzero((starts < nr_slots) & (starts >= covered_until))
+            starts = starts[rows]
+            ends = note_ends[rows, starts]
+            
+            # Either change the pitch of the note
+            is_pitch = r_pitch[rows, starts] < self.pitch_probability
+            pitch_rows = rows[is_pitch]
+            pitch_starts = starts[is_pitch]
+            old_pitches = pitch[pitch_rows, pitch_starts]
+            new_pitches = np.where(old_pitches == Genome_Functions.REST, random_pitches[pitch_rows, pitch_starts], 
+                    old_pitches + pitch_changes[pitch_rows, pitch_starts])
+            fill(pitch, pitch_rows, pitch_starts, ends[is_pitch], new_pitches)
+            
+            # Or change the length of the note
+            rows = rows[~is_pitch]
+            starts = starts[~is_pitch]
+            ends = ends[~is_pitch]
+            # As in mutate_duration, choose among the lengths that fit in the bar but never a whole note
+            slots_left = np.minimum(slots_per_bar - starts % slots_per_bar, slots_per_bar - 1)
+            nr_lengths = self.rhythm_table.nr_fitting_lengths[slots_left]
+            new_ends = starts + self.rhythm_table.lengths[(r_length[rows, starts]*nr_lengths).astype(int)]
+            
+            # Fill up the empty space with note of same pitch or a rest
+            is_shorter = new_ends < ends
+            onset[rows[is_shorter], new_ends[is_shorter]] = True
+            is_rest = is_shorter & (r_split[rows, starts] >= self.pause_probability)
+            fill(pitch, rows[is_rest], new_ends[is_rest], ends[is_rest], Genome_Functions.REST)
+            
+            # The longer notes cover the start of the following notes
+            is_longer = new_ends > ends
+            longer_rows = rows[is_longer]
+            longer_starts = starts[is_longer]
+            longer_ends = new_ends[is_longer]
+            fill(pitch, longer_rows, longer_starts, longer_ends, pitch[longer_rows, longer_starts])
+            fill(onset, longer_rows, longer_starts + 1, longer_ends, False)
+            in_track = longer_ends < nr_slots
+            onset[longer_rows[in_track], longer_ends[in_track]] = True
+            
+            covered_until[rows] = new_ends
+    
     def calculate_fitness(self):
-        "Calls on the wanted fitness function using self and the population as arguments."
+        """Calculates the fitness of the population. Individuals that are in the fitness cache are
+        not calculated again, and each distinct new individual is only calculated once."""
+        
+        if self.fitness_cache is None:
+            return self.calculate_uncached_fitness(self.population)
+        
+        fitness_values = np.zeros(len(self.population))
+        
+        # Look up all individuals, and collect the indices of each new individual
+        new_individuals = {}
+        for i in range(len(self.population)):
+            individual_hash = self.individual_hash(i)
+            fitness = self.fitness_cache.get(individual_hash)
+            if fitness is not None:
+                fitness_values[i] = fitness
+                self.fitness_cache.hits += 1
+            elif individual_hash in new_individuals:
+                new_individuals[individual_hash].append(i)
+                self.fitness_cache.hits += 1
+            else:
+                new_individuals[individual_hash] = [i]
+                self.fitness_cache.misses += 1
+        
+        if len(new_individuals) > 0:
+            # Calculate fitness of the first copy of each new individual
+            first_indices = [indices[0] for indices in new_individuals.values()]
+            new_fitness_values, is_exact = self.calculate_uncached_fitness(self.select_individuals(first_indices), 
+                    return_exact = True)
+            
+            # Fitness values that are only bounds by the lazy fitness are not saved
+            for individual_hash, fitness, exact in zip(new_individuals, new_fitness_values, is_exact):
+                if exact:
+                    self.fitness_cache.put(individual_hash, fitness)
+                fitness_values[new_individuals[individual_hash]] = fitness
+        
+        return fitness_values
+    
+    def exact_fitness_values(self, fitness_values, chosen_indices):
+        """Returns the fitness values with exact values for the individuals at chosen_indices. With 
+        lazy_fitness_contenders, the individuals that are not in the fitness cache only have a bound and are
+        calculated again with all features. Otherwise the fitness values are returned as they are."""
+        
+        if self.lazy_fitness_contenders is None:
+            return fitness_values
+        
+        fitness_values = np.array(fitness_values)
+        bound_individuals = {}
+        for i in np.unique(chosen_indices):
+            individual_hash = self.individual_hash(i)
+            fitness = self.fitness_cache.get(individual_hash)
+            if fitness is not None:
+                fitness_values[i] = fitness
+            elif individual_hash in bound_individuals:
+                bound_individuals[individual_hash].append(i)
+            else:
+                bound_individuals[individual_hash] = [i]
+        
+        if len(bound_individuals) > 0:
+            first_indices = [indices[0] for indices in bound_individuals.values()]
+            exact_values = self.calculate_uncached_fitness(self.select_individuals(first_indices), exact = True)
+            for individual_hash, fitness in zip(bound_individuals, exact_values):
+                self.fitness_cache.put(individual_hash, fitness)
+                fitness_values[bound_individuals[individual_hash]] = fitness
+        
+        return fitness_values
+    
+    def calculate_uncached_fitness(self, population, return_exact = False, exact = False):
+        """Calculates the fitness of the given population, split over worker processes if nr_workers > 1.
+        return_exact and exact are as in calculate_population_fitness."""
+        
+        if self.nr_workers > 1:
+            return Parallel_Fitness.calculate_fitness(self, population, return_exact, exact)
+        return self.calculate_population_fitness(population, return_exact, exact)
+    
+    def individual_hash(self, index):
+        "Returns the canonical hash of the individual at index in the population, used as key in the fitness cache."
+        
+        if self.genome_mode:
+            return Fitness_Cache.genome_hash(self.population.pitch[index], self.population.onset[index])
+        return Fitness_Cache.track_hash(self.population[index])
+    
+    def select_individuals(self, indices):
+        "Returns a population with the individuals at the given indices."
+        
+        if self.genome_mode:
+            return self.population.select(indices)
+        return [self.population[i] for i in indices]
+    
+    def calculate_population_fitness(self, population, return_exact = False, exact = False):
+        """Calls on the wanted fitness function using self and the given population as arguments.
+        With return_exact, also returns an array that is False for the fitness values that are only 
+        bounds (see lazy_fitness_contenders). With exact, all fitness values are exact."""
+        
+        is_exact = np.ones(len(population), dtype = bool)
+        
+        # The batch fitness can use the genome arrays directly
+        if self.batch_fitness and self.fitness_function in ['counter', 'harmony']:
+            if len(self.input_melody) == 0:
+                raise ValueError('Input is empty')
+            fitness_values = Fitness_Functions.calculate_fitness_harmony_batch(population, self.input_melody, self.key)
+            if return_exact:
+                return fitness_values, is_exact
+            return fitness_values
+        
+        if self.genome_mode:
+            population = population.to_tracks(self.key)
         
         if self.fitness_function == 'C':
-            fitness_values = Fitness_Functions.calculate_fitness_C(self.population)
+            fitness_values = Fitness_Functions.calculate_fitness_C(population, self.nr_bars)
             self.global_max = 2
         elif self.fitness_function == 'pauses':
-            fitness_values = Fitness_Functions.calculate_fitness_rests(self.population)
-        elif self.fitness_function == 'counter':
-            fitness_values = Fitness_Functions.calculate_fitness_harmony(self.population, self.input_melody, self.key)
-        elif self.fitness_function == 'modulate':
-            fitness_values = Fitness_Functions.calculate_fitness_modulate(self.population, self.from_bar, self.to_bar)
-        elif self.fitness_function == 'harmony':
-            if len(self.input_melody) == 0:
+            fitness_values = Fitness_Functions.calculate_fitness_rests(population)
+        elif self.fitness_function in Fitness_Functions.fitness_profiles:
+            # The other fitness functions are weight profiles of the same features, see fitness_functions
+            if Fitness_Functions.fitness_profiles[self.fitness_function]['two_voices'] and len(self.input_melody) == 0:
                 raise ValueError('Input is empty')
-            fitness_values = Fitness_Functions.calculate_fitness_harmony(self.population, self.input_melody, self.key)
-        elif self.fitness_function == 'ending':
-            fitness_values = Fitness_Functions.calculate_fitness_harmony_and_modulate(self.population, self.from_bar, self.to_bar, self.input_melody, self.key)
-        elif self.fitness_function == 'test':
-            fitness_values = Fitness_Functions.calculate_fitness_test(self.population, self.input_melody, self.key)
+            if self.lazy_fitness_contenders is None or exact:
+                fitness_values = Fitness_Functions.calculate_fitness_profile(population, self.fitness_function, self.key, 
+                        self.input_melody, self.from_bar, self.to_bar, bar_cache = self.bar_cache, input_grid = self.input_grid)
+            else:
+                fitness_values, is_exact = Fitness_Functions.calculate_fitness_profile_lazy(population, self.fitness_function, 
+                        self.lazy_fitness_contenders, self.key, self.input_melody, self.from_bar, self.to_bar, 
+                        bar_cache = self.bar_cache, input_grid = self.input_grid)
+        else:
+            raise ValueError(f'Unknown fitness function {self.fitness_function}.')
 
+        if return_exact:
+            return fitness_values, is_exact
         return fitness_values
    
+    def fitness_settings(self):
+        "Returns the fixed inputs needed to calculate fitness, as keyword arguments to EvolutionaryGenerator."
+        
+        return {'key': self.key, 'nr_bars': self.nr_bars, 'fitness_function': self.fitness_function, 
+                'global_max': self.global_max, 'input_melody': self.input_melody, 'from_bar': self.from_bar, 
+                'to_bar': self.to_bar, 'from_key': self.from_key, 'to_key': self.to_key, 
+                'genome_mode': self.genome_mode, 'batch_fitness': self.batch_fitness, 'bar_cache_size': self.bar_cache_size,
+                'lazy_fitness_contenders': self.lazy_fitness_contenders}
+    
+    def evolution_settings(self):
+        "Returns the inputs needed to evolve a population, as keyword arguments to EvolutionaryGenerator."
+        
+        settings = self.fitness_settings()
+        settings.update({'wildness': self.wildness, 'fitness_cache_size': self.fitness_cache_size})
+        return settings
+   
     def insert_best_individual(self, tmp_population, best_individual):
         """Insert the individual with highest fitness in the previous
         generation to the new generation.
         """
         
         for i in range(self.nr_copies):
-            tmp_population[i] = best_individual
+            if self.genome_mode:
+                tmp_population.set_individual(i, best_individual)
+            else:
+                tmp_population[i] = best_individual
 
         return tmp_population
     
+    def get_individual(self, index):
+        """Returns the individual at index in the population without copying it. 
+        In genome mode the individual is a tuple of views (pitch, onset) into the population arrays."""
+        
+        if self.genome_mode:
+            return self.population.get_individual(index)
+        return self.population[index]
+    
+    def individual_to_track(self, individual):
+        "Returns the individual as a Track. In genome mode the individual is a tuple (pitch, onset)."
+        
+        if self.genome_mode:
+            return Genome_Functions.genome_to_track(individual[0], individual[1], self.key)
+        return individual
+    
     def correct_accidentals(self, pitch):
         "Change the note name to be as simple as possible"
 
         pitch.remove_redundant_accidentals()
-        ind = 0
+        # Every pass removes one or two accidentals, so the loop ends
         while len(pitch.name) > 2:
-            ind += 1
-            if ind > 1:
-                breakpoint()
             tone = pitch.name[0]
+            if not pitch.name[1] in 'b#':
+                raise ValueError(f'Cannot simplify {pitch.name}')
             if pitch.name[1] == 'b':
                 if tone == 'C':
                     pitch.name = 'B' + pitch.name[1:]
                     pitch.name = pitch.name[:-1]
                 elif tone == 'F':
-                    pitch.name[0] = 'E'
+                    pitch.name = 'E' + pitch.name[1:]
                     pitch.name = pitch.name[:-1]
                 else:
                     if tone == 'D':
@@ -17,7 +17,10 @@ import track_functions as Track_Functions
 from mingus.midi import midi_file_out
 import copy
 from EvolutionaryGenerator import EvolutionaryGenerator
-import random as rnd
+import parallel_fitness as Parallel_Fitness
+import task_graph as Task_Graph
+import numpy as np
+import os
 
 #Important variables!
 fugue = Composition()
@@ -26,7 +29,24 @@ second_voice = Track()
             
 #input_key is a char signifying what key we are using
 #input_subject is a Track, subject can be any length
-def generate_fugue(key,subject):
+#seed is an int or a numpy.random.Generator, the same seed gives the same fugue
+def generate_fugue(key,subject, seed = None):
+
+    # Every part with islands would start a pool of its own in its process (see nr_parallel_parts)
+    if nr_parallel_parts > 1 and nr_islands > 1:
+        raise ValueError('nr_islands > 1 can not be used with nr_parallel_parts > 1.')
+
+    # Every generator gets its own seed drawn from rng
+    rng = np.random.default_rng(seed)
+
+    # Every call makes a new fugue, instead of continuing the voices of the last one
+    global fugue, second_voice
+    fugue = Composition()
+    second_voice = Track()
+
+    # Checkpoints are numbered in the order the generators are run
+    global nr_checkpoints
+    nr_checkpoints = 0
 
     #If subject doesn't fill full bars fill out rest of last bar of subject with rest
     #if last bar is not full
@@ -50,52 +70,101 @@ def generate_fugue(key,subject):
     #second_voice = second_voice + answer
     Track_Functions.add_tracks(second_voice,answer)
     
-    # Generate countersubject
-    eg_counter = EvolutionaryGenerator(key, nr_bars = 1, fitness_function = 'counter', input_melody = subject, nr_generations = counter_nr_generations)
-    print('Generating evolutionary part 1 of 7')
-    eg_counter.run_evolution()
-    counter_subject = copy.deepcopy(eg_counter.best_individual)
+    # == Evolutionary parts ==
+    # The 7 parts are run as a task graph (see task_graph), each part starts when the parts it needs are done:
+    # 1 countersubject, 2 harmony in bar 5, 3 modulation to minor in bar 3-4 (needs 1), 4 harmony to 3 (needs 3),
+    # 5 modulation to major in bar 7-8 (needs 1), 6 harmony to 3 (needs 3), 7 ending (needs only the subject).
+    # Seeds and checkpoints are decided in the order of the parts, so the fugue is the same for any nr_parallel_parts.
+    seeds = [rng.integers(2**32) for i in range(7)]
+    checkpoint_files = [next_checkpoint_file() for i in range(7)]
+    
+    # The fitness workers are divided between the parts that run at the same time, each part has its own pool
+    part_nr_workers = max(1, nr_workers//nr_parallel_parts)
+    
+    def settings(part, **kwargs):
+        print(f'Generating evolutionary part {part} of 7')
+        kwargs.update({'key': key, 'nr_workers': part_nr_workers, 'checkpoint_file': checkpoint_files[part - 1], 
+                'seed': seeds[part - 1]})
+        # Checkpoints are not supported in island mode
+        if kwargs.get('nr_islands', 1) > 1:
+            kwargs['checkpoint_file'] = None
+        return kwargs
+    
+    # The first bar of the minor development (bar 5) is the subject transposed to minor
+    minor_subject = Track_Functions.transpose_to_relative_minor(subject, key, False)
     
-    Track_Functions.add_tracks(first_voice, counter_subject)
+    # Create canon in bar 9 and 10.
+    # subject i first voice
+    # second voice is subject but shifted (half a bar for now) 
+    canon_first_voice = Track()
+    canon_first_voice.add_bar(copy.deepcopy(subject[0]))
     
+    bar_9 = canon_first_voice[0]
 
-    # Save bar 2 for later modulation
-    bar_2 = first_voice[-1]    
+    canon_second_voice = Track_Functions.shift(subject, 2)
+    
+    # The cadence ending of the second voice only depends on the canon
+    canon_ending = copy.deepcopy(canon_second_voice)
+    Track_Functions.second_voice_ending(canon_ending, key)
+    second_voice_ending = Track().add_bar(copy.deepcopy(canon_ending[-3]))
+    second_voice_ending.add_bar(copy.deepcopy(canon_ending[-2]))
+    first_voice_last_bar = Track_Functions.first_voice_ending(first_voice, key)
+    
+    parts = {
+        # Generate countersubject
+        'counter': ([], lambda: settings(1, nr_bars = 1, fitness_function = 'counter', input_melody = subject, 
+                nr_generations = counter_nr_generations, nr_islands = nr_islands)),
+        
+        # Generate harmony in second voice in bar 5
+        'harmony_minor': ([], lambda: settings(2, nr_bars = 1, fitness_function = 'harmony', 
+                input_melody = Track().add_bar(copy.deepcopy(minor_subject[0])), nr_generations = harmony_nr_generations, 
+                nr_islands = nr_islands)),
+        
+        # Generate bar 3 and 4 as a modulation between bar 2 (last bar of the countersubject) and 5
+        'modulate_to_minor': (['counter'], lambda counter_subject: settings(3, nr_bars = 2, fitness_function = 'modulate', 
+                from_bar = counter_subject[-1], to_bar = minor_subject[0], nr_generations = modulate_nr_generations)),
+        
+        # Generate second voice as harmony to the first voice in bar 3 and 4
+        'second_voice_modulate': (['modulate_to_minor'], lambda modulate_first_voice: settings(4, nr_bars = 2, 
+                fitness_function = 'harmony', input_melody = modulate_first_voice, nr_generations = harmony_nr_generations, 
+                nr_islands = nr_islands)),
+        
+        # Create modulation from minor to major in 7 and 8, from bar 6 (last bar of the countersubject in minor) to 9
+        'modulate_to_major': (['counter'], lambda counter_subject: settings(5, nr_bars = 2, fitness_function = 'modulate', 
+                from_bar = Track_Functions.transpose_to_relative_minor(counter_subject, key, False)[-1], to_bar = bar_9, 
+                nr_generations = modulate_nr_generations)),
+        
+        # Generate second voice as harmony to the first voice in bar 7 and 8
+        'second_voice_modulate_back': (['modulate_to_minor'], lambda modulate_first_voice: settings(6, nr_bars = 2, 
+                fitness_function = 'harmony', input_melody = modulate_first_voice, nr_generations = harmony_nr_generations, 
+                nr_islands = nr_islands)),
+        
+        # Generate harmony to cadence in first voice
+        'first_voice_ending': ([], lambda: settings(7, nr_bars = 2, fitness_function = 'ending', 
+                input_melody = second_voice_ending, from_bar = subject[0], to_bar = first_voice_last_bar[0], 
+                nr_generations = harmony_nr_generations)),
+    }
+    # The shared pool is made once, big enough for both the fitness workers and the islands of the parts
+    if nr_parallel_parts == 1 and max(nr_workers, nr_islands) > 1:
+        Parallel_Fitness.get_pool(max(nr_workers, nr_islands))
+    if nr_parallel_parts == 1:
+        best_individuals = Task_Graph.run_task_graph(parts, run_evolutionary_part)
+    else:
+        best_individuals = Task_Graph.run_task_graph(parts, run_parallel_evolutionary_part, nr_parallel_parts)
+    
+    
+    counter_subject = best_individuals['counter']
+    Track_Functions.add_tracks(first_voice, counter_subject)
     
     # Generate development in minor in bar 5 and 6. 
     # Transposed -3 to minor + (stämma i för second voice tills vidare tom)
     minor_first_voice = Track_Functions.transpose_to_relative_minor(first_voice, key, False)
     minor_second_voice = Track_Functions.transpose_to_relative_minor(second_voice, key, False)
-        
-    bar_5 = minor_first_voice[0]
-    
-    # Generate harmony in second voice in bar 5
-    eg_harmony_minor = EvolutionaryGenerator(key, nr_bars = 1, fitness_function = 'harmony', 
-            input_melody = Track().add_bar(copy.deepcopy(minor_first_voice[0])), nr_generations = harmony_nr_generations)
     
-    print('Generating evolutionary part 2 of 7')
-    eg_harmony_minor.run_evolution()
+    minor_second_voice[0] = best_individuals['harmony_minor'][0]
     
-    minor_second_voice[0] = eg_harmony_minor.best_individual[0]
-
-    # Generate bar 3 and 4 as a modulation between bar 2 and 5
-
-    eg_modulate_to_minor = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'modulate', 
-            from_bar = bar_2, to_bar = bar_5, nr_generations = modulate_nr_generations)
-
-    print('Generating evolutionary part 3 of 7')
-    eg_modulate_to_minor.run_evolution()
-    modulate_first_voice = copy.deepcopy(eg_modulate_to_minor.best_individual)
-
-    # Generate second voice as harmony to the first voice in bar 3 and 4
-    
-    eg_second_voice_modulate = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'harmony', 
-            input_melody = modulate_first_voice, nr_generations = harmony_nr_generations)
-    
-    print('Generating evolutionary part 4 of 7')
-    eg_second_voice_modulate.run_evolution()    
-    modulate_second_voice = copy.deepcopy(eg_second_voice_modulate.best_individual)
-
+    modulate_first_voice = best_individuals['modulate_to_minor']
+    modulate_second_voice = best_individuals['second_voice_modulate']
 
     # Add bar 3-6 to the voice tracks
     Track_Functions.add_tracks(first_voice, modulate_first_voice)
@@ -103,37 +172,10 @@ def generate_fugue(key,subject):
     
     Track_Functions.add_tracks(first_voice, minor_first_voice)
     Track_Functions.add_tracks(second_voice, minor_second_voice)
-
-    bar_6 = first_voice[-1]
-
-    # Create canon in bar 9 and 10.
-    # subject i first voice
-    # second voice is subject but shifted (half a bar for now) 
-
-    canon_first_voice = Track()
-    canon_first_voice.add_bar(copy.deepcopy(subject[0]))
-    
-    bar_9 = canon_first_voice[0]
-
-    canon_second_voice = Track_Functions.shift(subject, 2)
-
-    # Create modulation from minor to major in 7 and 8
-    
-    eg_modulate_to_major = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'modulate', 
-            from_bar = bar_6, to_bar = bar_9, nr_generations = modulate_nr_generations)
-    
-    print('Generating evolutionary part 5 of 7')
-    eg_modulate_to_major.run_evolution()
-    modulate_back_first_voice = copy.deepcopy(eg_modulate_to_major.best_individual)
-
-    # Generate second voice as harmony to the first voice in bar 7 and 8
-    
-    eg_second_voice_modulate_back = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'harmony', 
-            input_melody = modulate_first_voice, nr_generations = harmony_nr_generations)
     
-    print('Generating evolutionary part 6 of 7')
-    eg_second_voice_modulate_back.run_evolution()    
-    modulate_back_second_voice = copy.deepcopy(eg_second_voice_modulate.best_individual)
+    modulate_back_first_voice = best_individuals['modulate_to_major']
+    # Note: as before, the second voice in bar 7 and 8 is the result of part 4, the result of part 6 is not used
+    modulate_back_second_voice = copy.deepcopy(best_individuals['second_voice_modulate'])
     
     
     # Add bar 7-10 to the voice tracks
@@ -145,19 +187,8 @@ def generate_fugue(key,subject):
 
     # Add cadence ending to second voice
     Track_Functions.second_voice_ending(second_voice, key)
-
-    second_voice_ending = Track().add_bar(copy.deepcopy(second_voice[-3]))
-    second_voice_ending.add_bar(copy.deepcopy(second_voice[-2]))
     
-    # Generate harmony to cadence in first voice
-    first_voice_last_bar = Track_Functions.first_voice_ending(first_voice, key)
-
-    eg_first_voice_ending = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'ending', 
-            input_melody = second_voice_ending, from_bar = subject[0], to_bar = first_voice_last_bar[0], nr_generations = harmony_nr_generations)
-
-    print('Generating evolutionary part 7 of 7')
-    eg_first_voice_ending.run_evolution()
-    first_voice_ending = copy.deepcopy(eg_first_voice_ending.best_individual)
+    first_voice_ending = best_individuals['first_voice_ending']
     Track_Functions.add_tracks(first_voice, first_voice_ending)
     Track_Functions.add_tracks(first_voice, first_voice_last_bar)
     
@@ -171,10 +202,27 @@ def generate_fugue(key,subject):
 
     #Generate MIDI output for fugue named final_fugue
     midi_file_out.write_Composition("final_fugue.mid", fugue)
+    
+    # Stop the worker processes used for fitness calculations
+    Parallel_Fitness.shutdown_pool()
 
  
 # nr_parts tells how many parts (inverse, reverse, minor, other start note) is wanted between first subject/answer and the last stretto.
-def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
+# seed is an int or a numpy.random.Generator, the same seed gives the same fugue
+def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None, seed = None):
+
+    # The variants and the seeds of the generators are drawn from rng
+    rng = np.random.default_rng(seed)
+
+    # Every call makes a new fugue, instead of continuing the voices of the last one
+    global fugue, second_voice
+    fugue = Composition()
+    second_voice = Track()
+
+    # Checkpoints are numbered in the order the generators are run
+    global nr_checkpoints
+    nr_checkpoints = 0
+
     #If subject doesn't fill full bars fill out rest of last bar of subject with rest
     #if last bar is not full
     if not (subject[-1].is_full()): 
@@ -190,6 +238,10 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
     for i in range(len(subject)):  
         second_voice.add_bar(copy.deepcopy(rest_1bar))
     
+    # The shared pool is made once, big enough for both the fitness workers and the islands of the generators
+    if max(nr_workers, nr_islands) > 1:
+        Parallel_Fitness.get_pool(max(nr_workers, nr_islands))
+    
     total_nr_evolutionary_parts = 3 + 3*nr_parts
 
     # Create second bar with answer in second voice.
@@ -199,7 +251,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
     
     # Generate countersubject
     nr_current_generated = 1
-    eg_counter = EvolutionaryGenerator(key, nr_bars = 1, fitness_function = 'counter', input_melody = subject, nr_generations = counter_nr_generations)
+    eg_counter = EvolutionaryGenerator(key, nr_bars = 1, fitness_function = 'counter', input_melody = subject, nr_generations = counter_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(nr_islands), seed = rng.integers(2**32), nr_islands = nr_islands)
     print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
     nr_current_generated += 1
     eg_counter.run_evolution()
@@ -221,7 +273,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
     if order_of_parts is None:
         order_of_parts = []
         for i in range(nr_parts):
-            rVariant = rnd.choice(variants)
+            rVariant = variants[rng.integers(len(variants))]
             order_of_parts.append(rVariant)
     
     
@@ -238,7 +290,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
             
                 # Generate harmony in second voice first bar
                 eg_harmony = EvolutionaryGenerator(key, nr_bars = 1, fitness_function = 'harmony', 
-                        input_melody = Track().add_bar(copy.deepcopy(new_first_voice[0])), nr_generations = harmony_nr_generations)
+                        input_melody = Track().add_bar(copy.deepcopy(new_first_voice[0])), nr_generations = harmony_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(nr_islands), seed = rng.integers(2**32), nr_islands = nr_islands)
                 
                 print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
                 nr_current_generated += 1
@@ -256,7 +308,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
 
                 # Generate harmony in second voice first bar
                 eg_harmony = EvolutionaryGenerator(key, nr_bars = 1, fitness_function = 'harmony', 
-                        input_melody = Track().add_bar(copy.deepcopy(new_first_voice[1])), nr_generations = harmony_nr_generations)
+                        input_melody = Track().add_bar(copy.deepcopy(new_first_voice[1])), nr_generations = harmony_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(nr_islands), seed = rng.integers(2**32), nr_islands = nr_islands)
                 
                 print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
                 nr_current_generated += 1
@@ -273,7 +325,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
 
                 # Generate harmony in second voice first bar
                 eg_harmony = EvolutionaryGenerator(key, nr_bars = 1, fitness_function = 'harmony', 
-                        input_melody = Track().add_bar(copy.deepcopy(new_first_voice[0])), nr_generations = harmony_nr_generations)
+                        input_melody = Track().add_bar(copy.deepcopy(new_first_voice[0])), nr_generations = harmony_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(nr_islands), seed = rng.integers(2**32), nr_islands = nr_islands)
 
                 print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
                 nr_current_generated += 1
@@ -285,7 +337,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
             # Generate the two bars linking this new part to the previous parts
 
             eg_modulate = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'modulate', 
-                    from_bar = bar_prev, to_bar = bar_after, nr_generations = modulate_nr_generations)
+                    from_bar = bar_prev, to_bar = bar_after, nr_generations = modulate_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(), seed = rng.integers(2**32))
 
             print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
             nr_current_generated += 1
@@ -295,7 +347,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
             # Generate second voice as harmony to this linking part
             
             eg_second_voice_modulate = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'harmony', 
-                    input_melody = modulate_first_voice, nr_generations = harmony_nr_generations)
+                    input_melody = modulate_first_voice, nr_generations = harmony_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(nr_islands), seed = rng.integers(2**32), nr_islands = nr_islands)
             
             print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
             nr_current_generated += 1
@@ -329,7 +381,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
     # Create modulation from minor to major in 7 and 8
     
     eg_modulate_to_major = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'modulate', 
-            from_bar = bar_prev, to_bar = bar_after, nr_generations = modulate_nr_generations)
+            from_bar = bar_prev, to_bar = bar_after, nr_generations = modulate_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(), seed = rng.integers(2**32))
 
     print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
     nr_current_generated += 1
@@ -339,7 +391,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
     # Generate second voice as harmony to the first voice in bar 7 and 8
     
     eg_second_voice_modulate_back = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'harmony', 
-            input_melody = modulate_first_voice, nr_generations = harmony_nr_generations)
+            input_melody = modulate_first_voice, nr_generations = harmony_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(nr_islands), seed = rng.integers(2**32), nr_islands = nr_islands)
     
     print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
     nr_current_generated += 1
@@ -364,7 +416,7 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
     first_voice_last_bar = Track_Functions.first_voice_ending(first_voice, key)
 
     eg_first_voice_ending = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'ending', 
-            input_melody = second_voice_ending, from_bar = subject[0], to_bar = first_voice_last_bar[0], nr_generations = harmony_nr_generations)
+            input_melody = second_voice_ending, from_bar = subject[0], to_bar = first_voice_last_bar[0], nr_generations = harmony_nr_generations, nr_workers = nr_workers, checkpoint_file = next_checkpoint_file(), seed = rng.integers(2**32))
 
     print(f"Generating evolutionary part {nr_current_generated} of {total_nr_evolutionary_parts}")
     eg_first_voice_ending.run_evolution()
@@ -382,6 +434,9 @@ def generate_longer_fugue(key, subject, nr_parts = 1, order_of_parts = None):
 
     #Generate MIDI output for fugue named final_fugue
     midi_file_out.write_Composition("final_fugue.mid", fugue) 
+    
+    # Stop the worker processes used for fitness calculations
+    Parallel_Fitness.shutdown_pool()
     return
 
  
@@ -390,8 +445,52 @@ harmony_nr_generations = 200
 modulate_nr_generations = 100
 counter_nr_generations = 200
 
-# Test for debugging
-test_track, key = Track_Functions.init_preset_track("blinka")
-generate_fugue(key, test_track)
-#generate_longer_fugue(key, test_track, 3, ['Minor', 'Inverse', 'Reverse'])
+# Number of worker processes used to calculate fitness in each generator, 1 means no extra processes
+nr_workers = 1
+
+# Number of islands (populations evolving in parallel processes) in the counter and harmony generators, 1 means one population
+nr_islands = 1
+
+# Number of evolutionary parts of generate_fugue that are run at the same time in separate processes, 1 means one at a time.
+# The nr_workers fitness workers are then divided between the parts, so at most nr_parallel_parts + nr_workers processes
+# are used. Islands need a pool in every part, so nr_islands must be 1 when nr_parallel_parts > 1.
+nr_parallel_parts = 1
+
+# Directory where every generator saves checkpoints, so a stopped job continues where it was when it is restarted.
+# Use one directory per job. None means no checkpoints. Generators in island mode (nr_islands > 1) do not
+# support checkpoints, so they are run without one and start again when the job is restarted.
+checkpoint_directory = None
+nr_checkpoints = 0
+
+def next_checkpoint_file(part_nr_islands = 1):
+    """Returns the checkpoint file for the next generator, or None if checkpoint_directory is None or the
+    generator runs on part_nr_islands > 1 islands. The files keep their numbers either way."""
+    global nr_checkpoints
+    if checkpoint_directory is None:
+        return None
+    nr_checkpoints += 1
+    if part_nr_islands > 1:
+        return None
+    os.makedirs(checkpoint_directory, exist_ok = True)
+    return os.path.join(checkpoint_directory, f'evolution_{nr_checkpoints}.pickle.gz')
+
+def run_evolutionary_part(settings):
+    "Runs an EvolutionaryGenerator with the keyword arguments settings and returns the best individual."
+    generator = EvolutionaryGenerator(**settings)
+    generator.run_evolution()
+    return generator.best_individual
+
+def run_parallel_evolutionary_part(settings):
+    """Runs an evolutionary part in a worker process of the task graph. The pool the part started there is
+    stopped afterwards, since a worker process can not exit while its pool is running."""
+    try:
+        return run_evolutionary_part(settings)
+    finally:
+        Parallel_Fitness.shutdown_pool()
+
+# Test for debugging. Only run when this is the main file, since the worker processes may import it.
+if __name__ == '__main__':
+    test_track, key = Track_Functions.init_preset_track("blinka")
+    generate_fugue(key, test_track)
+    #generate_longer_fugue(key, test_track, 3, ['Minor', 'Inverse', 'Reverse'])
 
@@ -0,0 +1,742 @@
+#---------------------------------------------
+# In this file we create batch versions of the measures in track_tests.
+# The whole population is stored as padded 2D arrays with one row per melody and one column
+# per note (PopulationMatrix), and every measure returns one value per melody.
+# The batch measures give the same values as the track_tests functions for melodies on the
+# semiquaver grid, which is always true for melodies made by EvolutionaryGenerator.
+#---------------------------------------------
+
+import numpy as np
+import mingus.core.keys as keys
+import genome_functions as Genome_Functions
+
+"""FUNCTION INDEX                                           (to be able to find functions easier)
+PopulationMatrix                                            Population stored as padded (population_size, nr_notes) arrays.
+tracks_to_matrix(tracks)                                    Returns a PopulationMatrix for a list of tracks.
+genomes_to_matrix(genome_population, key)                   Returns a PopulationMatrix for a GenomePopulation.
+repeating_note_length(matrix)                               Batch version of track_tests.repeating_note_length.
+average_note_length_clusters(matrix)                        Batch version of track_tests.average_note_length_clusters.
+repeating_note_pitch(matrix)                                Batch version of track_tests.repeating_note_pitch with exact = True.
+repeating_passages(matrix)                                  Batch version of track_tests.repeating_passages with with_duration = False.
+count_notes_on_beat(matrix)                                 Batch version of track_tests.count_notes_on_beat.
+count_notes_in_scale(matrix, key)                           Batch version of track_tests.count_notes_in_scale.
+count_tritone_or_seventh_in_two_skips(matrix)               Batch version of track_tests.count_tritone_or_seventh_in_two_skips.
+check_melody_intervals(matrix)                              Batch version of track_tests.check_melody_intervals.
+check_motion_of_melody(matrix)                              Batch version of track_tests.check_motion_of_melody.
+melodic_interval_measures(matrix)                           Returns a dict with the three measures above, calculated together from one interval array.
+check_note_durations(matrix)                                Batch version of track_tests.check_note_durations, returns a dict of arrays.
+rhythm_measures(matrix)                                     Returns a dict with the four measures of the rhythm, calculated once for every distinct rhythm.
+check_same_pattern(fixed_matrix, matrix)                    Batch version of track_tests.check_same_pattern with a fixed first track.
+check_if_intervals_are_consonant_or_too_big(fixed_matrix, matrix)
+                                                            Batch version of track_tests.check_if_intervals_are_consonant_or_too_big.
+contrapuntal_motion(fixed_matrix, matrix)                   Batch version of track_tests.contrapuntal_motion, returns a dict of arrays.
+two_voice_measures(fixed_matrix, matrix)                    Returns a dict with the three measures above, calculated together on the semiquaver grid.
+"""
+
+SLOTS_PER_BAR = Genome_Functions.SLOTS_PER_BAR
+REST = Genome_Functions.REST
+
+# Note names are stored as integer ids in the matrices, this dict gives the id of every name seen so far
+note_name_ids = {}
+
+def get_note_name_id(name):
+    if not name in note_name_ids:
+        note_name_ids[name] = len(note_name_ids)
+    return note_name_ids[name]
+
+
+# ---------------------------------------------
+# PopulationMatrix:
+# All arrays have the shape (population_size, max number of notes), notes are in the order of get_notes().
+# pitch is the integer pitch of the note (as int(Note)), or REST.
+# name is the id of the note name (see get_note_name_id), or REST.
+# start is the start of the note in slots from the start of the melody, length is the length in slots.
+# valid is False for the padding after the last note of shorter melodies.
+# grid is the pitch sounding in every slot, with the shape (population_size, nr_bars*SLOTS_PER_BAR).
+# ---------------------------------------------
+class PopulationMatrix():
+
+    def __init__(self, pitch, name, start, length, valid, grid, nr_bars):
+        self.pitch = pitch
+        self.name = name
+        self.start = start
+        self.length = length
+        self.valid = valid
+        self.grid = grid
+        self.nr_bars = nr_bars
+
+    def __len__(self):
+        return self.pitch.shape[0]
+
+    @property
+    def nr_notes(self):
+        return self.valid.sum(axis = 1)
+
+    @property
+    def rest(self):
+        return np.logical_and(self.valid, self.pitch == REST)
+
+    @property
+    def beat_in_bar(self):
+        "Start of every note in slots from the start of its bar"
+        return self.start % SLOTS_PER_BAR
+
+
+def tracks_to_matrix(tracks):
+    """Returns a PopulationMatrix for a list of tracks of the same number of bars.
+    Raises ValueError if a note is not on the semiquaver grid."""
+
+    nr_bars = len(tracks[0])
+    all_notes = []
+    for track in tracks:
+        track_notes = []
+        for bar_nr in range(len(track)):
+            for note in track[bar_nr]:
+                start = note[0]*SLOTS_PER_BAR
+                if abs(start - round(start)) > 1e-9:
+                    raise ValueError('Note start is not on the semiquaver grid.')
+                start = bar_nr*SLOTS_PER_BAR + int(round(start))
+                length = Genome_Functions.duration_to_slots(note[1])
+                if note[2] is None:
+                    track_notes.append((REST, REST, start, length))
+                else:
+                    track_notes.append((int(note[2][0]), get_note_name_id(note[2][0].name), start, length))
+        all_notes.append(track_notes)
+
+    population_size = len(tracks)
+    max_nr_notes = max(len(track_notes) for track_notes in all_notes)
+    values = np.zeros((4, population_size, max_nr_notes), dtype = np.int32)
+    values[0:2] = REST
+    valid = np.zeros((population_size, max_nr_notes), dtype = bool)
+    grid = np.full((population_size, nr_bars*SLOTS_PER_BAR), REST, dtype = np.int32)
+    for iPop in range(population_size):
+        nr_notes = len(all_notes[iPop])
+        if nr_notes == 0:
+            continue
+        values[:, iPop, :nr_notes] = np.array(all_notes[iPop], dtype = np.int32).T
+        valid[iPop, :nr_notes] = True
+        for (pitch, name, start, length) in all_notes[iPop]:
+            grid[iPop, start:start + length] = pitch
+
+    return PopulationMatrix(values[0], values[1], values[2], values[3], valid, grid, nr_bars)
+
+
+def genomes_to_matrix(genome_population, key):
+    "Returns a PopulationMatrix for a GenomePopulation, with note names spelled as in Genome_Functions.genome_to_track."
+
+    onset = genome_population.onset
+    population_size, nr_slots = onset.shape
+
+    # Find row and slot of every onset, and the position of the note in its row
+    rows, slots = np.nonzero(onset)
+    nr_notes = onset.sum(axis = 1)
+    first_note = np.concatenate(([0], np.cumsum(nr_notes)[:-1]))
+    position = np.arange(len(rows)) - first_note[rows]
+
+    # A note lasts until the next onset in the same row, or to the end of the row
+    next_slots = np.append(slots[1:], nr_slots)
+    next_rows = np.append(rows[1:], -1)
+    ends = np.where(next_rows == rows, next_slots, nr_slots)
+
+    max_nr_notes = nr_notes.max()
+    pitch = np.full((population_size, max_nr_notes), REST, dtype = np.int32)
+    name = np.full((population_size, max_nr_notes), REST, dtype = np.int32)
+    start = np.zeros((population_size, max_nr_notes), dtype = np.int32)
+    length = np.zeros((population_size, max_nr_notes), dtype = np.int32)
+    valid = np.zeros((population_size, max_nr_notes), dtype = bool)
+
+    note_pitch = genome_population.pitch[rows, slots]
+    pitch[rows, position] = note_pitch
+    start[rows, position] = slots
+    length[rows, position] = ends - slots
+    valid[rows, position] = True
+
+    # Spell every distinct pitch once
+    for value in np.unique(note_pitch):
+        if value == REST:
+            continue
+        name_id = get_note_name_id(Genome_Functions.pitch_to_note(value, key).name)
+        name[rows[note_pitch == value], position[note_pitch == value]] = name_id
+
+    grid = genome_population.pitch.astype(np.int32)
+    return PopulationMatrix(pitch, name, start, length, valid, grid, nr_slots // SLOTS_PER_BAR)
+
+
+# Helper function, counts how many times every value occurs in every row. Values must be in [0, nr_values).
+def count_per_row(values, mask, nr_values):
+    rows = np.nonzero(mask)[0]
+    counts = np.bincount(rows*nr_values + values[mask], minlength = values.shape[0]*nr_values)
+    return counts.reshape(values.shape[0], nr_values)
+
+# Helper function, divides and gives 0 where the denominator is 0
+def safe_divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype = float)
+    denominator = np.asarray(denominator, dtype = float)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out = result, where = denominator != 0)
+    return result
+
+
+#--------------------------------------------------------------------
+# Measures within one melody
+#--------------------------------------------------------------------
+
+def repeating_note_length(matrix):
+    return rhythm_measures(matrix)['repeating_note_length']
+
+def average_note_length_clusters(matrix):
+    return rhythm_measures(matrix)['average_note_length_clusters']
+
+def repeating_note_pitch(matrix):
+    "Batch version of repeating_note_pitch(track, exact = True)."
+    has_pitch = np.logical_and(matrix.valid, matrix.pitch != REST)
+    counts = count_per_row(matrix.name, has_pitch, max(len(note_name_ids), 1))
+    return safe_divide(counts.max(axis = 1), has_pitch.sum(axis = 1))
+
+def repeating_passages(matrix):
+    """Batch version of repeating_passages(track, with_duration = False).
+    Returns three arrays: average number of repetitions, average length of repetition and percentage of repetition."""
+
+    population_size = len(matrix)
+    result = np.zeros((3, population_size))
+    beat_in_bar = matrix.beat_in_bar
+    for iPop in range(population_size):
+        nr_notes = int(matrix.nr_notes[iPop])
+        result[:, iPop] = passage_repetitions(matrix.pitch[iPop, :nr_notes].tolist(), beat_in_bar[iPop, :nr_notes].tolist())
+    return result[0], result[1], result[2]
+
+def passage_repetitions(pitches, beats_in_bar):
+    "Same calculation as track_tests.repeating_passages for one melody given as lists of integer pitches and beats."
+
+    passage_repetitions = {}
+    passage_lengths = {}
+    current_passage = []
+    previous_pitch = None
+
+    for pitch, beat in zip(pitches, beats_in_bar):
+        if pitch == REST:
+            continue
+        elif beat == 0 or previous_pitch is None:
+            previous_pitch = pitch
+            current_passage = []
+            continue
+
+        current_passage.append(pitch - previous_pitch)
+        previous_pitch = pitch
+
+        for i in range(len(current_passage)):
+            passage = tuple(current_passage[i:])
+            if passage in passage_repetitions:
+                passage_repetitions[passage] += 1.0
+                break
+            else:
+                passage_repetitions[passage] = 0.0
+                passage_lengths[passage] = len(current_passage) - i + 1.0
+
+    average_nm_of_rep = 0.0
+    average_len_of_repetition = 0.0
+    nmb_of_repeating_passages = 0.0
+    percentage_of_repetition = 0.0
+    for passage, occurences in passage_repetitions.items():
+        if occurences > 0.0:
+            average_nm_of_rep += occurences
+            percentage_of_repetition += passage_lengths[passage]*occurences
+            average_len_of_repetition += passage_lengths[passage]
+            nmb_of_repeating_passages += 1.0
+
+    if nmb_of_repeating_passages > 0.0:
+        average_nm_of_rep = average_nm_of_rep/nmb_of_repeating_passages
+        average_len_of_repetition = average_len_of_repetition/nmb_of_repeating_passages
+        percentage_of_repetition = percentage_of_repetition/len(pitches)
+
+    return (average_nm_of_rep, average_len_of_repetition, percentage_of_repetition)
+
+def count_notes_on_beat(matrix):
+    "Returns two arrays, the fraction of notes on a beat of their own duration and the fraction in the middle of two such beats."
+    return rhythm_measures(matrix)['count_notes_on_beat']
+
+def count_notes_in_scale(matrix, key):
+    scale_ids = [get_note_name_id(name) for name in keys.get_notes(key)]
+    in_scale = np.logical_and(matrix.valid, np.isin(matrix.name, scale_ids))
+    return safe_divide(in_scale.sum(axis = 1), matrix.nr_notes)
+
+def count_tritone_or_seventh_in_two_skips(matrix):
+    return melodic_interval_measures(matrix)['count_tritone_or_seventh_in_two_skips']
+
+def check_melody_intervals(matrix):
+    return melodic_interval_measures(matrix)['check_melody_intervals']
+
+def check_motion_of_melody(matrix):
+    return melodic_interval_measures(matrix)['check_motion_of_melody']
+
+
+# ---------------------------------------------
+# Lookup tables of the melodic interval measures.
+# unwanted_two_skip[interval % 12] is True for tritones and sevenths.
+# good_melody_interval[min(abs(interval), 13)] is True for the good intervals of check_melody_intervals.
+# ---------------------------------------------
+unwanted_two_skip = np.zeros(12, dtype = bool)
+unwanted_two_skip[[6, 10, 11]] = True
+good_melody_interval = np.zeros(14, dtype = bool)
+good_melody_interval[[0, 1, 2, 3, 4, 5, 7, 12]] = True
+
+# ---------------------------------------------
+# Transition table of check_motion_of_melody.
+# The rules of track_tests.fraction_of_good_melody_motion are a state machine over the intervals of the melody. 
+# The state is skip_next_iteration and last_two_skips_dir, as 3*skip_next_iteration + DIRECTIONS.index(dir).
+# The input of every interval is its kind (STEP, SKIP_UP, SKIP_DOWN, or NO_INTERVAL after the end of the 
+# melody), the kind of the next interval, and if the next interval is smaller, as
+# motion_input(kind, next_kind, smaller). motion_next_state[state, input] is the state after the interval
+# and motion_good[state, input] is the number of good intervals it adds.
+# ---------------------------------------------
+STEP, SKIP_UP, SKIP_DOWN, NO_INTERVAL = 0, 1, 2, 3
+DIRECTIONS = [0, 1, -1]
+NR_MOTION_STATES = 6
+NR_MOTION_INPUTS = 32
+
+def motion_input(kind, next_kind, smaller):
+    return (4*kind + next_kind)*2 + smaller
+
+def motion_transition(state, kind, next_kind, smaller):
+    "Returns the next state and the number of good intervals, by the rules of fraction_of_good_melody_motion."
+    skip_next_iteration, last_two_skips_dir = state // 3, DIRECTIONS[state % 3]
+    if skip_next_iteration or kind == NO_INTERVAL:
+        return DIRECTIONS.index(last_two_skips_dir), 0
+    # Steps are always good
+    if kind == STEP:
+        return 0, 1
+    # Bad: Skip is in the same direction as previous two
+    direction = DIRECTIONS[kind]
+    if direction == last_two_skips_dir:
+        return state, 0
+    # Good: Skip is last interval of melody
+    if next_kind == NO_INTERVAL:
+        return 0, 1
+    # Good : Skip - step
+    if next_kind == STEP:
+        return 3, 2
+    # Good: Skip - Skip (in opposite directions)
+    if DIRECTIONS[next_kind] != direction:
+        return 3, 2
+    # Skip - Skip in the same direction is good if the second skip is smaller, and saves the direction as warning
+    return 3 + DIRECTIONS.index(direction), 2 if smaller else 0
+
+motion_next_state = np.zeros((NR_MOTION_STATES, NR_MOTION_INPUTS), dtype = np.int8)
+motion_good = np.zeros((NR_MOTION_STATES, NR_MOTION_INPUTS), dtype = np.int8)
+for state in range(NR_MOTION_STATES):
+    for kind in range(4):
+        for next_kind in range(4):
+            for smaller in range(2):
+                next_state, good = motion_transition(state, kind, next_kind, smaller)
+                motion_next_state[state, motion_input(kind, next_kind, smaller)] = next_state
+                motion_good[state, motion_input(kind, next_kind, smaller)] = good
+
+# Helper function, returns the pitches of every row with the rests removed (padded with REST) and the number of pitches
+def melody_without_rests(matrix):
+    has_pitch = np.logical_and(matrix.valid, matrix.pitch != REST)
+    nr_pitches = has_pitch.sum(axis = 1)
+    position = np.cumsum(has_pitch, axis = 1) - 1
+    melody = np.full(matrix.pitch.shape, REST, dtype = matrix.pitch.dtype)
+    rows = np.nonzero(has_pitch)[0]
+    melody[rows, position[has_pitch]] = matrix.pitch[has_pitch]
+    return melody, nr_pitches
+
+# ---------------------------------------------
+# melodic_interval_measures:
+# Calculates count_tritone_or_seventh_in_two_skips, check_melody_intervals and check_motion_of_melody for all 
+# melodies at once. The melodies are read into one integer pitch array and one interval array, and the 
+# intervals are classified with the lookup tables above.
+# Returns a dict from the name of each measure to an array with one value per melody.
+# ---------------------------------------------
+def melodic_interval_measures(matrix):
+    population_size = len(matrix)
+    measures = {}
+
+    # Tritones or sevenths between every note and the note after the next one, rests included
+    has_pitch = np.logical_and(matrix.valid, matrix.pitch != REST)
+    both = np.logical_and(has_pitch[:, :-2], has_pitch[:, 2:])
+    unwanted = unwanted_two_skip[np.abs(matrix.pitch[:, 2:] - matrix.pitch[:, :-2]) % 12]
+    measures['count_tritone_or_seventh_in_two_skips'] = np.logical_and(both, unwanted).sum(axis = 1)
+
+    melody, nr_pitches = melody_without_rests(matrix)
+    if melody.shape[1] < 2:
+        measures['check_melody_intervals'] = np.zeros(population_size)
+        measures['check_motion_of_melody'] = np.zeros(population_size)
+        return measures
+
+    intervals = np.diff(melody, axis = 1)
+    size = np.abs(intervals)
+    index = np.arange(intervals.shape[1])[None, :]
+    is_interval = index < (nr_pitches - 1)[:, None]
+    has_next = index + 1 < (nr_pitches - 1)[:, None]
+
+    # Melody intervals, a sixth up is good if it is followed by downward motion
+    next_down = np.zeros(intervals.shape, dtype = bool)
+    next_down[:, :-1] = intervals[:, 1:] < 0
+    sixth_up = np.logical_and(np.logical_or(intervals == 8, intervals == 9), np.logical_and(next_down, has_next))
+    good = np.logical_or(good_melody_interval[np.minimum(size, 13)], sixth_up)
+    measures['check_melody_intervals'] = safe_divide(np.logical_and(is_interval, good).sum(axis = 1), nr_pitches - 1)
+
+    # Motion of melody, the state machine takes one interval of every melody at a time
+    kind = np.where(size <= 2, STEP, np.where(intervals > 0, SKIP_UP, SKIP_DOWN))
+    kind[np.logical_not(is_interval)] = NO_INTERVAL
+    next_kind = np.full(kind.shape, NO_INTERVAL)
+    next_kind[:, :-1] = kind[:, 1:]
+    smaller = np.zeros(kind.shape, dtype = bool)
+    smaller[:, :-1] = size[:, 1:] < size[:, :-1]
+    inputs = motion_input(kind, next_kind, smaller)
+
+    state = np.zeros(population_size, dtype = np.int8)
+    nr_good = np.zeros(population_size, dtype = np.int32)
+    for i in range(intervals.shape[1]):
+        nr_good += motion_good[state, inputs[:, i]]
+        state = motion_next_state[state, inputs[:, i]]
+    measures['check_motion_of_melody'] = safe_divide(nr_good, nr_pitches - 1)
+
+    return measures
+
+def check_note_durations(matrix):
+    "Returns a dict with the same keys as track_tests.check_note_durations, with one count per melody."
+    return rhythm_measures(matrix)['check_note_durations']
+
+# ---------------------------------------------
+# rhythm_measures:
+# Calculates repeating_note_length, average_note_length_clusters, count_notes_on_beat and check_note_durations,
+# the measures that only depend on the rhythm, for all melodies at once. Melodies with the same rhythm get the
+# same values, so every distinct rhythm is measured once. The note lengths are counted with one bincount, and
+# the clusters of notes with the same length are the runs of the length array.
+# Returns a dict from the name of each measure to its batch value.
+# ---------------------------------------------
+def rhythm_measures(matrix):
+
+    # The notes of a melody follow each other, so its rhythm is given by the slots where notes start and end.
+    # These are packed into bytes, and one melody of every distinct rhythm is measured.
+    population_size, nr_slots = len(matrix), matrix.nr_bars*SLOTS_PER_BAR
+    rows = np.nonzero(matrix.valid)[0]
+    marks = np.zeros((population_size, 2*nr_slots + 1), dtype = bool)
+    marks[rows, matrix.start[matrix.valid]] = True
+    marks[rows, nr_slots + (matrix.start + matrix.length)[matrix.valid]] = True
+    packed = np.ascontiguousarray(np.packbits(marks, axis = 1))
+    rhythm_keys = packed.view(np.dtype((np.void, packed.shape[1]))).reshape(-1)
+    rhythm_keys, first_melody, rhythm_index = np.unique(rhythm_keys, return_index = True, return_inverse = True)
+    rhythm_index = rhythm_index.reshape(-1)
+    
+    valid = matrix.valid[first_melody]
+    start = matrix.start[first_melody]
+    length = np.where(valid, matrix.length[first_melody], 0)
+    nr_notes = valid.sum(axis = 1)
+
+    # Number of notes of every length
+    counts = count_per_row(length, valid, nr_slots + 1)
+    
+    # A new cluster starts at every note that has another length than the note before
+    new_cluster = np.logical_and(valid[:, 1:], length[:, 1:] != length[:, :-1])
+    nr_clusters = 1 + new_cluster.sum(axis = 1)
+
+    beat_in_bar = start % SLOTS_PER_BAR
+    on_beat = np.logical_and(valid, beat_in_bar % np.maximum(length, 1) == 0)
+    on_half_beat = np.logical_and(valid, np.logical_and(np.logical_not(on_beat), (2*beat_in_bar) % np.maximum(length, 1) == 0))
+
+    duration_counter = {}
+    accepted_slots = []
+    for duration in [16, 8, 16/3, 4, 8/3, 2, 4/3, 1]:
+        duration_slots = Genome_Functions.duration_to_slots(duration)
+        accepted_slots.append(duration_slots)
+        duration_counter[duration] = counts[rhythm_index, duration_slots]
+    duration_counter['Strange'] = (nr_notes - counts[:, accepted_slots].sum(axis = 1))[rhythm_index]
+
+    return {'repeating_note_length': safe_divide(counts.max(axis = 1), nr_notes)[rhythm_index],
+            'average_note_length_clusters': (nr_notes/nr_clusters)[rhythm_index],
+            'count_notes_on_beat': (safe_divide(on_beat.sum(axis = 1), nr_notes)[rhythm_index], 
+                                    safe_divide(on_half_beat.sum(axis = 1), nr_notes)[rhythm_index]),
+            'check_note_durations': duration_counter}
+
+
+#--------------------------------------------------------------------
+# Measures between a fixed first voice (one row matrix) and every melody
+# Both voices are compared on the shared semiquaver grid, for all melodies at once. The measures that 
+# follow the notes of the voices step through them with one index per melody, so every step is a few
+# operations on arrays of the population size.
+#--------------------------------------------------------------------
+
+def check_same_pattern(fixed_matrix, matrix):
+    "Batch version of check_same_pattern(fixed track, melody)."
+    return two_voice_measures(fixed_matrix, matrix)['check_same_pattern']
+
+def check_if_intervals_are_consonant_or_too_big(fixed_matrix, matrix):
+    "Batch version of check_if_intervals_are_consonant_or_too_big(fixed track, melody), returns two arrays."
+    return two_voice_measures(fixed_matrix, matrix)['check_if_intervals_are_consonant_or_too_big']
+
+def contrapuntal_motion(fixed_matrix, matrix):
+    """Batch version of contrapuntal_motion(fixed track, melody). Returns a dict with the same keys,
+    with one value per melody."""
+    return two_voice_measures(fixed_matrix, matrix)['contrapuntal_motion']
+
+# ---------------------------------------------
+# two_voice_measures:
+# Calculates check_same_pattern, check_if_intervals_are_consonant_or_too_big and contrapuntal_motion between
+# the fixed voice and every melody. Returns a dict from the name of each measure to its batch value.
+# ---------------------------------------------
+def two_voice_measures(fixed_matrix, matrix):
+    nr_slots = min(fixed_matrix.grid.shape[1], matrix.grid.shape[1])
+    fixed_grid = fixed_matrix.grid[0, :nr_slots]
+    grid = matrix.grid[:, :nr_slots]
+    total_nr_slots = SLOTS_PER_BAR*fixed_matrix.nr_bars
+
+    measures = {'check_same_pattern': same_pattern_slots(fixed_matrix, matrix)/total_nr_slots}
+
+    # Interval classes of every slot where both voices play
+    both_playing = np.logical_and(fixed_grid != REST, grid != REST)
+    intervals = np.abs(grid - fixed_grid)
+    consonant = np.logical_and(both_playing, consonant_interval[np.minimum(intervals, 12)])
+    too_big = np.logical_and(both_playing, intervals > 16)
+    measures['check_if_intervals_are_consonant_or_too_big'] = (consonant.sum(axis = 1)/total_nr_slots, too_big.sum(axis = 1)/total_nr_slots)
+
+    measures['contrapuntal_motion'] = motion_values(fixed_matrix, matrix, total_nr_slots)
+    return measures
+
+# consonant_interval[min(abs(interval), 12)] is True for the consonant intervals
+consonant_interval = np.zeros(13, dtype = bool)
+consonant_interval[[0, 3, 4, 7, 8, 9]] = True
+
+def same_pattern_slots(fixed_matrix, matrix):
+    """Returns the number of slots where the notes of the fixed voice and the melody start on the same beat in 
+    the bar and have the same length. The notes are walked as in track_tests.check_same_pattern."""
+
+    nr_fixed = int(fixed_matrix.nr_notes[0])
+    population_size, nr_columns = matrix.pitch.shape
+    rows = np.arange(population_size)
+    nr_notes = matrix.nr_notes
+
+    # The fixed notes are padded with one note after the last, so the indices can be looked up when they are done
+    beats_1 = np.append(fixed_matrix.beat_in_bar[0, :nr_fixed], 0)
+    lengths_1 = np.append(fixed_matrix.length[0, :nr_fixed], 0)
+    beats_2 = matrix.beat_in_bar
+    lengths_2 = matrix.length
+
+    same_duration = np.zeros(population_size, dtype = np.int32)
+    ind_1 = np.zeros(population_size, dtype = np.int64)
+    ind_2 = np.zeros(population_size, dtype = np.int64)
+    for iStep in range(nr_fixed + nr_columns):
+        active = np.logical_and(ind_1 < nr_fixed, ind_2 < nr_notes)
+        if not np.any(active):
+            break
+        ind_2_column = np.minimum(ind_2, nr_columns - 1)
+        beat_1 = beats_1[ind_1]
+        beat_2 = beats_2[rows, ind_2_column]
+        
+        # The index of the note that starts first takes a step, or both if they start on the same beat
+        step_1 = np.logical_and(active, beat_1 <= beat_2)
+        step_2 = np.logical_and(active, beat_2 <= beat_1)
+        same = np.logical_and(np.logical_and(step_1, step_2), lengths_1[ind_1] == lengths_2[rows, ind_2_column])
+        same_duration += np.where(same, lengths_1[ind_1], 0)
+        ind_1 += step_1
+        ind_2 += step_2
+
+    return same_duration
+
+# ---------------------------------------------
+# Motion codes of motion_of_notes. NO_MOTION is a part with only one note, that is neither up nor down.
+# ---------------------------------------------
+UP, DOWN, SAME, RESTING, NO_MOTION = 0, 1, 2, 3, 4
+
+def motion_of_notes(matrix):
+    """Same calculation as track_tests.motion_of_track for every melody, with all beats in slots.
+    Returns (start, length, motion, nr_parts), where the first three have one row per melody and one column per 
+    part of the melody with the same motion, and nr_parts is the number of parts of every melody."""
+
+    population_size, nr_columns = matrix.pitch.shape
+    rows = np.arange(population_size)
+    nr_notes = matrix.nr_notes
+    start = np.zeros((population_size, nr_columns + 1), dtype = np.int64)
+    length = np.zeros((population_size, nr_columns + 1), dtype = np.int64)
+    motion = np.full((population_size, nr_columns + 1), NO_MOTION, dtype = np.int8)
+    nr_parts = np.zeros(population_size, dtype = np.int64)
+
+    def add_parts(add):
+        start[rows[add], nr_parts[add]] = current_start[add]
+        length[rows[add], nr_parts[add]] = current_passage[add]
+        motion[rows[add], nr_parts[add]] = current_motion[add]
+        nr_parts[add] += 1
+
+    # The first note starts a rest part, or a part where the motion is set by the next note
+    previous_pitch = matrix.pitch[:, 0].copy()
+    previous_length = matrix.length[:, 0].copy()
+    current_start = np.zeros(population_size, dtype = np.int64)
+    current_passage = previous_length.astype(np.int64)
+    current_motion = np.where(previous_pitch == REST, RESTING, NO_MOTION).astype(np.int8)
+    for iNote in range(1, nr_columns):
+        active = iNote < nr_notes
+        pitch = matrix.pitch[:, iNote]
+        note_length = matrix.length[:, iNote]
+        is_rest = pitch == REST
+        was_resting = current_motion == RESTING
+
+        # A rest ends the last part and starts a rest part, if not already resting. A part with one note is Same.
+        start_rest = np.logical_and(active, np.logical_and(is_rest, np.logical_not(was_resting)))
+        current_motion[np.logical_and(start_rest, current_motion == NO_MOTION)] = SAME
+        # A note after a rest ends the rest part and starts a part where the motion is set by the next note
+        end_rest = np.logical_and(active, np.logical_and(np.logical_not(is_rest), was_resting))
+        # Other notes continue the part if the motion is the same, otherwise they start a new part from the previous note
+        note_motion = np.where(pitch > previous_pitch, UP, np.where(pitch < previous_pitch, DOWN, SAME))
+        moving = np.logical_and(active, np.logical_and(np.logical_not(is_rest), np.logical_not(was_resting)))
+        new_motion = np.logical_and(moving, np.logical_and(current_motion != note_motion, current_motion != NO_MOTION))
+
+        add_parts(np.logical_or(np.logical_or(start_rest, end_rest), new_motion))
+        
+        restart = np.logical_or(start_rest, end_rest)
+        current_start[restart] += current_passage[restart]
+        current_passage[restart] = note_length[restart]
+        current_motion[start_rest] = RESTING
+        current_motion[end_rest] = NO_MOTION
+
+        current_start[new_motion] += current_passage[new_motion] - previous_length[new_motion]
+        current_passage[new_motion] = previous_length[new_motion] + note_length[new_motion]
+        
+        extend = np.logical_and(active, np.logical_and(np.logical_not(restart), np.logical_not(new_motion)))
+        current_passage[extend] += note_length[extend]
+        current_motion[moving] = note_motion[moving]
+        
+        previous_pitch = np.where(active, pitch, previous_pitch)
+        previous_length = np.where(active, note_length, previous_length)
+
+    add_parts(nr_notes > 0)
+    return start, length, motion, nr_parts
+
+def motion_values(fixed_matrix, matrix, total_nr_slots):
+    """Same calculation as the main loop of track_tests.contrapuntal_motion for every melody, with all beats in slots.
+    The parts of both voices are walked together, and the parts where both voices have the same motion are 
+    measured by parallel_and_similar."""
+
+    population_size = len(matrix)
+    rows = np.arange(population_size)
+    start_first, length_first, motion_first, nr_parts_first = motion_of_notes(fixed_matrix)
+    end_first = (start_first + length_first)[0]
+    start_first = start_first[0]
+    motion_first = motion_first[0]
+    nr_parts_first = int(nr_parts_first[0])
+    start_second, length_second, motion_second, nr_parts_second = motion_of_notes(matrix)
+    end_second = start_second + length_second
+
+    motion_keys = ['Contrary', 'Parallel', 'Oblique', 'Similar', 'Rest', 'One']
+    motion_slots = {motion: np.zeros(population_size, dtype = np.int64) for motion in motion_keys}
+    extra_beats = np.zeros(population_size, dtype = np.int64)
+    same_motion_parts = [(np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64))]
+
+    previous_beat = np.zeros(population_size, dtype = np.int64)
+    current_beat = np.minimum(length_first[0, 0], length_second[:, 0])
+    ind_first = np.zeros(population_size, dtype = np.int64)
+    ind_second = np.zeros(population_size, dtype = np.int64)
+    active = previous_beat < total_nr_slots
+    while np.any(active):
+        if np.any(np.logical_and(active, np.logical_or(ind_first >= nr_parts_first, ind_second >= nr_parts_second))):
+            raise ValueError('The motion of a voice ended before the end of the track.')
+        if np.any(np.logical_and(active, current_beat <= previous_beat)):
+            raise ValueError('Contrapuntal motion did not move forward.')
+        
+        first = motion_first[ind_first]
+        second = motion_second[rows, ind_second]
+        part_length = np.where(active, current_beat - previous_beat, 0)
+        same = first == second
+        both_resting = np.logical_and(same, first == RESTING)
+        oblique = np.logical_and(np.logical_not(same), np.logical_or(first == SAME, second == SAME))
+        one = np.logical_and(np.logical_not(np.logical_or(same, oblique)), np.logical_or(first == RESTING, second == RESTING))
+        contrary = np.logical_not(np.logical_or(np.logical_or(same, oblique), one))
+        motion_slots['Rest'] += np.where(both_resting, part_length, 0)
+        motion_slots['Oblique'] += np.where(oblique, part_length, 0)
+        motion_slots['One'] += np.where(one, part_length, 0)
+        motion_slots['Contrary'] += np.where(contrary, part_length, 0)
+        
+        # The parts with the same motion are measured together after the walk
+        same_motion = np.flatnonzero(np.logical_and(active, np.logical_and(same, np.logical_not(both_resting))))
+        same_motion_parts.append((same_motion, previous_beat[same_motion], current_beat[same_motion]))
+        
+        active = np.logical_and(active, current_beat != total_nr_slots)
+        
+        # Take the next part of the voices whose parts end here
+        ind_first += np.logical_and(active, end_first[np.minimum(ind_first, nr_parts_first - 1)] == current_beat)
+        ind_second += np.logical_and(active, end_second[rows, ind_second] == current_beat)
+        ind_first_part = np.minimum(ind_first, nr_parts_first - 1)
+        new_previous_beat = np.maximum(start_first[ind_first_part], start_second[rows, ind_second])
+        
+        # Double the beats that are in two separate parts
+        extra_beats += np.where(active, current_beat - new_previous_beat, 0)
+        previous_beat = np.where(active, new_previous_beat, previous_beat)
+        current_beat = np.where(active, np.minimum(end_first[ind_first_part], end_second[rows, ind_second]), current_beat)
+        active = np.logical_and(active, previous_beat < total_nr_slots)
+
+    part_rows = np.concatenate([part[0] for part in same_motion_parts])
+    part_starts = np.concatenate([part[1] for part in same_motion_parts])
+    part_ends = np.concatenate([part[2] for part in same_motion_parts])
+    parallel, similar, extra = parallel_and_similar(fixed_matrix, matrix, part_rows, part_starts, part_ends)
+    motion_slots['Parallel'] += parallel
+    motion_slots['Similar'] += similar
+    extra_beats += extra
+
+    total = total_nr_slots + extra_beats
+    return {motion: motion_slots[motion]/total for motion in motion_keys}
+
+def parallel_and_similar(fixed_matrix, matrix, part_rows, part_starts, part_ends):
+    """Same calculation as track_tests.check_parallell_and_similar for a list of parts of the melodies, 
+    given by their rows in the matrix and their start and end slots. 
+    Returns three arrays with the number of parallel, similar and extra slots of every melody.
+    
+    Within a part, an interval starts at the start of the part and at every note start in any of the voices.
+    Every interval after the first is parallel if it is the same as the first interval of the part (or the
+    same kind of third, second or seventh in the same octave), otherwise similar. A run of intervals of the
+    same kind adds its length and the length of the interval before it, which is also counted as an extra 
+    beat if it is not the first interval. So the result is counted per slot of the part, from the 
+    interval the slot is in and the next interval."""
+
+    population_size = len(matrix)
+    nr_slots = min(fixed_matrix.grid.shape[1], matrix.grid.shape[1])
+    grid_first = fixed_matrix.grid[0, :nr_slots]
+    grid_second = matrix.grid[:, :nr_slots]
+    interval = grid_second - grid_first
+
+    # The last interval start at or before every slot, and the next interval start after it
+    slots = np.arange(nr_slots)
+    boundary = np.zeros((population_size, nr_slots), dtype = bool)
+    boundary[np.nonzero(matrix.valid)[0], matrix.start[matrix.valid]] = True
+    fixed_starts = fixed_matrix.start[0, fixed_matrix.valid[0]]
+    boundary[:, fixed_starts[fixed_starts < nr_slots]] = True
+    last_boundary = np.maximum.accumulate(np.where(boundary, slots, -1), axis = 1)
+    next_boundary = np.full((population_size, nr_slots), nr_slots)
+    next_boundary[:, :-1] = np.minimum.accumulate(np.where(boundary, slots, nr_slots)[:, ::-1], axis = 1)[:, ::-1][:, 1:]
+
+    # One element for every slot of every part
+    part_lengths = part_ends - part_starts
+    part_index = np.repeat(np.arange(len(part_rows)), part_lengths)
+    slot_rows = part_rows[part_index]
+    slot = part_starts[part_index] + np.arange(part_index.size) - np.repeat(np.cumsum(part_lengths) - part_lengths, part_lengths)
+    part_start = part_starts[part_index]
+    part_end = part_ends[part_index]
+
+    first_interval = interval[slot_rows, part_start]
+    interval_start = np.maximum(last_boundary[slot_rows, slot], part_start)
+    first_in_part = interval_start == part_start
+    parallel_here = repeated_interval(interval[slot_rows, interval_start], first_interval)
+    next_start = next_boundary[slot_rows, slot]
+    has_next = next_start < part_end
+    parallel_next = repeated_interval(interval[slot_rows, np.minimum(next_start, nr_slots - 1)], first_interval)
+    
+    # Slots in an interval after the first count for the kind of their interval. Slots before a new run count
+    # for the kind of the run, and as extra beats if the run is not the first.
+    counted_here = np.logical_not(first_in_part)
+    new_run = np.logical_and(has_next, np.logical_or(first_in_part, parallel_here != parallel_next))
+    extra = np.logical_and(new_run, np.logical_not(first_in_part))
+    parallel = np.logical_and(counted_here, parallel_here).astype(np.int64) + np.logical_and(new_run, parallel_next)
+    similar = np.logical_and(counted_here, np.logical_not(parallel_here)).astype(np.int64) + np.logical_and(new_run, np.logical_not(parallel_next))
+    
+    return (np.bincount(slot_rows, weights = parallel, minlength = population_size).astype(np.int64), 
+            np.bincount(slot_rows, weights = similar, minlength = population_size).astype(np.int64),
+            np.bincount(slot_rows, weights = extra, minlength = population_size).astype(np.int64))
+
+def repeated_interval(intervals, first_intervals):
+    "Returns True where the interval is the same as the first interval, or the same kind of third, second or seventh in the same octave."
+    repeated = intervals == first_intervals
+    same_octave = intervals // 12 == first_intervals // 12
+    for interval_group in [[3, 4], [1, 2], [10, 11]]:
+        same_group = np.logical_and(np.isin(intervals % 12, interval_group), np.isin(first_intervals % 12, interval_group))
+        repeated = np.logical_or(repeated, np.logical_and(same_group, same_octave))
+    return repeated
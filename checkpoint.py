@@ -0,0 +1,116 @@
+#---------------------------------------------
+# In this file we save and load checkpoints of EvolutionaryGenerator runs (when checkpoint_file is given).
+# A checkpoint holds the population, its fitness values, the best individual, the generation, the state
+# of its random number generator and the fitness cache, so a resumed run gives the same result as a run 
+# that was never stopped.
+# When the run is finished the final result is saved, and resuming it only restores the result and the
+# random state. Then a longer job, like generate_longer_fugue, can be restarted and skip the finished parts.
+# A hash of all settings, the input melody and the random state at the start of the run is saved too, and
+# a checkpoint of a run with another input, seed or settings is refused instead of resumed.
+# The file is a gzip compressed pickle, written to a temporary file first so a stopped job never leaves
+# half a checkpoint.
+#---------------------------------------------
+
+import gzip
+import hashlib
+import os
+import pickle
+import fitness_cache as Fitness_Cache
+
+"""FUNCTION INDEX                                           (to be able to find functions easier)
+save_checkpoint(generator, iGen, fitness_values, finished)  Saves the state of the generator after generation iGen.
+load_checkpoint(file_name)                                  Returns the saved checkpoint, or None if there is none.
+restore_checkpoint(generator, checkpoint)                   Sets the state of the generator from a checkpoint.
+settings_hash(generator)                                    Returns a hash of everything that decides the run of the generator.
+"""
+
+# Settings that must be the same for the generator saving and the one resuming a checkpoint
+checked_settings = ['key', 'nr_bars', 'fitness_function', 'genome_mode']
+
+# Settings of the evolution that are not in evolution_settings, but change the result of a run
+run_settings = ['population_size', 'nr_generations', 'probability_rest', 'crossover_probability', 
+        'tournament_selection_parameter', 'tournament_size', 'nr_copies', 'pitch_probability', 'pause_probability', 
+        'possible_lengths', 'plateau_generations', 'min_relative_improvement', 'improvement_window', 'min_diversity']
+
+
+def save_checkpoint(generator, iGen, fitness_values, finished = False):
+    settings = generator.fitness_settings()
+    checkpoint = {'settings': {name: settings[name] for name in checked_settings},
+            'settings_hash': generator.run_settings_hash,
+            'generation': iGen,
+            'finished': finished,
+            'population': generator.population,
+            'fitness_values': fitness_values,
+            'best_individual': generator.best_individual,
+            'max_fitness_value': generator.max_fitness_value,
+            'fitness_history': generator.fitness_history,
+            'stop_reason': generator.stop_reason,
+            'random_state': generator.rng.bit_generator.state,
+            'fitness_cache': None if generator.fitness_cache is None else generator.fitness_cache.values}
+
+    temporary_file_name = generator.checkpoint_file + '.tmp'
+    with gzip.open(temporary_file_name, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol = pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_file_name, generator.checkpoint_file)
+
+def load_checkpoint(file_name):
+    if not os.path.exists(file_name):
+        return None
+    with gzip.open(file_name, 'rb') as f:
+        return pickle.load(f)
+
+
+# ---------------------------------------------
+# restore_checkpoint:
+# Sets the population, best individual and random state of the generator to the ones in the checkpoint.
+# Returns the generation of the checkpoint and the fitness values of its population.
+# ---------------------------------------------
+def restore_checkpoint(generator, checkpoint):
+    settings = generator.fitness_settings()
+    for name in checked_settings:
+        if checkpoint['settings'][name] != settings[name]:
+            raise ValueError(f'Checkpoint {generator.checkpoint_file} was saved with another {name}.')
+    if checkpoint.get('settings_hash') != generator.run_settings_hash:
+        raise ValueError(f'Checkpoint {generator.checkpoint_file} was saved with another input, seed or settings.')
+
+    # The fitness cache is restored too. With lazy_fitness_contenders the individuals that are not contenders
+    # only get a bound, which depends on which exact fitness values are in the cache.
+    if generator.fitness_cache_size > 0:
+        generator.fitness_cache = Fitness_Cache.FitnessCache(generator.fitness_cache_size)
+        if checkpoint.get('fitness_cache') is not None:
+            for individual_hash, fitness in checkpoint['fitness_cache'].items():
+                generator.fitness_cache.put(individual_hash, fitness)
+
+    generator.population = checkpoint['population']
+    generator.best_individual = checkpoint['best_individual']
+    generator.max_fitness_value = checkpoint['max_fitness_value']
+    generator.fitness_history = checkpoint['fitness_history']
+    generator.stop_reason = checkpoint['stop_reason']
+    generator.rng.bit_generator.state = checkpoint['random_state']
+
+    if checkpoint['finished']:
+        print(f"Finished run loaded from {generator.checkpoint_file}")
+    else:
+        print(f"Resuming from generation {checkpoint['generation']} in {generator.checkpoint_file}")
+
+    return checkpoint['generation'], checkpoint['fitness_values']
+
+
+# ---------------------------------------------
+# settings_hash:
+# Returns a hash of the evolution settings, the input melody, the bars before and after, the other settings
+# of the evolution and the state of the random number generator. Called when the run starts, since the
+# generator changes global_max and its random state during the run.
+# ---------------------------------------------
+def settings_hash(generator):
+    settings = generator.evolution_settings()
+    if settings['input_melody'] is not None:
+        settings['input_melody'] = Fitness_Cache.track_hash(settings['input_melody'])
+    for name in ['from_bar', 'to_bar']:
+        if settings[name] is not None:
+            settings[name] = Fitness_Cache.bar_hash(settings[name])
+    for name in run_settings:
+        settings[name] = getattr(generator, name)
+    settings['random_state'] = generator.rng.bit_generator.state
+
+    return hashlib.blake2b(repr(sorted(settings.items())).encode(), digest_size = 16).hexdigest()
@@ -0,0 +1,81 @@
+#---------------------------------------------
+# In this file we create the fitness cache used by EvolutionaryGenerator.
+# Individuals are identified by a canonical hash of their notes, so copies of the same melody
+# (elitism, tournament winners) only have their fitness calculated once during a run.
+#---------------------------------------------
+
+from collections import OrderedDict
+import hashlib
+
+"""FUNCTION INDEX                                           (to be able to find functions easier)
+FitnessCache(max_size)                                      LRU cache from individual hash to fitness value, with hit and miss counters.
+track_hash(track)                                           Returns a canonical hash of the (beat, duration, pitch) sequence of a track.
+bar_hash(bar)                                               Returns a canonical hash of the (beat, duration, pitch) sequence of a bar.
+genome_hash(pitch_row, onset_row)                           Returns a canonical hash of one genome in genome mode.
+"""
+
+
+# ---------------------------------------------
+# track_hash, bar_hash:
+# Returns a hash of the notes of the track. Two tracks get the same hash if every bar has notes with
+# the same beats, durations and pitches. Pitches are compared by name and octave, since the fitness
+# functions look at the note names (for example count_notes_in_scale).
+# ---------------------------------------------
+def track_hash(track):
+    notes = []
+    for bar_nr in range(len(track)):
+        for beat, duration, note_container in track[bar_nr]:
+            if note_container is None:
+                pitch = None
+            else:
+                pitch = tuple((note.name, note.octave) for note in note_container)
+            notes.append((bar_nr, beat, duration, pitch))
+    return hashlib.blake2b(repr(notes).encode(), digest_size = 16).digest()
+
+def bar_hash(bar):
+    notes = []
+    for beat, duration, note_container in bar:
+        if note_container is None:
+            pitch = None
+        else:
+            pitch = tuple((note.name, note.octave) for note in note_container)
+        notes.append((beat, duration, pitch))
+    return hashlib.blake2b(repr(notes).encode(), digest_size = 16).digest()
+
+def genome_hash(pitch_row, onset_row):
+    return hashlib.blake2b(pitch_row.tobytes() + onset_row.tobytes(), digest_size = 16).digest()
+
+
+# ---------------------------------------------
+# FitnessCache:
+# Keeps the fitness of the max_size most recently used individuals.
+# hits counts the individuals whose fitness did not have to be calculated, misses the ones that had to.
+# ---------------------------------------------
+class FitnessCache():
+
+    def __init__(self, max_size = 1000):
+        self.max_size = max_size
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, key):
+        "Returns the cached fitness, or None if the key is not in the cache. Does not update the counters."
+        if key in self.values:
+            self.values.move_to_end(key)
+            return self.values[key]
+        return None
+
+    def put(self, key, fitness):
+        self.values[key] = fitness
+        self.values.move_to_end(key)
+        while len(self.values) > self.max_size:
+            self.values.popitem(last = False)
+
+    def hit_rate(self):
+        if self.hits + self.misses == 0:
+            return 0.0
+        return self.hits/(self.hits + self.misses)
@@ -3,10 +3,14 @@
 # ==============================================
 
 import numpy as np
+import bisect
 import copy
 from mingus.containers import *
 import track_tests as measure
 import track_functions as Track_Functions
+import batch_tests as batch
+import genome_functions as Genome_Functions
+import fitness_cache as Fitness_Cache
 
 # Points given to different note durations:
 points_duration = {16:   1/32, 
@@ -46,6 +50,56 @@ def near_calc(population_value, perfect_value, bias):
 def more_calc(population_fraction, bias):
     return population_fraction * bias
 
+# Returns a list with a dict for each melody, with the values of the one-voice measures (see track_tests.melody_statistics)
+# and of check_if_intervals_are_consonant_or_too_big if input_melody is given. With a bar_cache (a FitnessCache) the 
+# measures that can be calculated bar by bar (see track_tests.bar_statistics) are only calculated the first time a bar 
+# with the same content is seen, and only the ones that depend on notes in other bars (see track_tests.sequence_statistics)
+# are calculated for the whole melodies. Without it all measures are calculated for the whole melodies.
+# input_grid is an optional Track_Functions.pitch_grid of the input melody.
+def bar_measures(melodies, key = None, input_melody = None, bar_cache = None, input_grid = None):
+    if bar_cache is None:
+        melodies_measures = []
+        for melody in melodies:
+            measures = measure.melody_statistics(melody, key)
+            if input_melody is not None:
+                measures['check_if_intervals_are_consonant_or_too_big'] = measure.check_if_intervals_are_consonant_or_too_big(input_melody, melody, input_grid)
+            melodies_measures.append(measures)
+        return melodies_measures
+    
+    input_bars = []
+    input_hashes = []
+    if input_melody is not None:
+        input_bars = [input_melody[bar_nr] for bar_nr in range(len(input_melody))]
+        input_hashes = [Fitness_Cache.bar_hash(bar) for bar in input_bars]
+        if input_grid is not None:
+            input_bar_grids = [input_grid[16*bar_nr:16*(bar_nr + 1)] for bar_nr in range(len(input_bars))]
+    
+    melodies_measures = []
+    for melody in melodies:
+        bars_statistics = []
+        for bar_nr in range(len(melody)):
+            bar = melody[bar_nr]
+            # The intervals are measured against the bar of the input melody played at the same time
+            input_bar = input_bars[bar_nr] if bar_nr < len(input_bars) else None
+            input_hash = input_hashes[bar_nr] if bar_nr < len(input_bars) else None
+            input_bar_grid = input_bar_grids[bar_nr] if input_grid is not None and bar_nr < len(input_bars) else None
+            
+            cache_key = (Fitness_Cache.bar_hash(bar), input_hash, key)
+            statistics = bar_cache.get(cache_key)
+            if statistics is None:
+                statistics = measure.bar_statistics(bar, key, input_bar, input_bar_grid)
+                bar_cache.put(cache_key, statistics)
+                bar_cache.misses += 1
+            else:
+                bar_cache.hits += 1
+            bars_statistics.append(statistics)
+        
+        nr_input_bars = None if input_melody is None else len(input_melody)
+        measures = measure.sequence_statistics(melody.get_notes())
+        measures.update(measure.combine_bar_statistics(bars_statistics, nr_input_bars, key))
+        melodies_measures.append(measures)
+    return melodies_measures
+
 # Favor notes close to C-4
 def calculate_fitness_C(population, nr_bars):
         population_size = len(population)
@@ -85,150 +139,122 @@ def calculate_fitness_rests(population):
         fitness_values[iPop] = fitness
     return fitness_values
 
-    
-# A fitness function for modulating/binding together two bars 
-def calculate_fitness_modulate(population, from_bar, to_bar, is_complex = True):
-    "Return a melody that modulates from from_bar to to_bar"
-    
-    if is_complex:
-        # Create a list of melodies including the bar before, the generated melody and the bar after.
-        melodies = []
-        track_from_bar = Track().add_bar(from_bar)
-        track_to_bar = Track().add_bar(to_bar)
-        for melody in population:
-            track = copy.deepcopy(track_from_bar)
-            Track_Functions.add_tracks(track, melody)
-            Track_Functions.add_tracks(track, track_to_bar)
-            melodies.append(track)
-
-        population_size = len(population) 
-        fitness_values = np.zeros(population_size) 
-        
-        default_bias = 10.0
-        #For every melody in population calculate fitness THIS IS THE BIG CALCULATION PART
-        for iPop in range(population_size):
-            melody = melodies[iPop]
-            notes = melody.get_notes()
-            fitness = 1.0
-            
-            #----------------------------------------------------------------------------------------------------------------    
-            #Measure closeness to ideal value
-            
-            #Within the melody
-            #Function that measures:                                                   Ideal value:                    Bias:
-            fitness += near_calc(measure.repeating_note_length(melody),                frac_repeating_note_length,     default_bias)
-            fitness += near_calc(measure.average_note_length_clusters(melody),         nmb_note_length_clusters,       default_bias)
-            (x,y,frac_repeating_passage) = measure.repeating_passages(melody)
-            fitness += near_calc(x,                                                    nmb_of_passage_rep,             default_bias)
-            fitness += near_calc(y,                                                    len_of_passage_rep,             default_bias) 
-            
-            #-----------------------------------------------------------------------------------------------------------------
-            #Function that calculates fraction where 1 is best                          Bias:
-            fitness += more_calc(frac_repeating_passage,                                default_bias) #Calculated previously
-            (on_beat,on_half_beat) = measure.count_notes_on_beat(melody)
-            #When multiplying or dividing the default bias we change the relative weight of that function
-            fitness += more_calc(on_beat,                                               default_bias*2)
-            fitness += more_calc(on_half_beat,                                          default_bias/2)
-
-            fitness -= more_calc(measure.repeating_note_pitch(melody,True),             default_bias)
-            fitness -= more_calc(measure.count_tritone_or_seventh_in_two_skips(melody), default_bias*1.2)
-                
-            fitness += more_calc(measure.check_melody_intervals(melody),                default_bias*5)
-            fitness += more_calc(measure.check_motion_of_melody(melody),                default_bias*5)
-            
-            durations = measure.check_note_durations(melody)
-            for iDur in accepted_durations:
-                fitness += more_calc(durations[iDur],     points_duration[iDur] *       default_bias)
 
-            #Add resulting fitness value to list
-            fitness_values[iPop] = fitness
-            
-            
-        return fitness_values 
-    else:
 
-        return calculate_fitness_C(population, 2)   
+# ---------------------------------------------
+# Feature matrix:
+# The measures of track_tests are calculated once for every melody and stored as one row of a feature matrix,
+# with one column for each name in feature_names. A fitness function is a weight profile and the fitness of a 
+# melody is the dot product of its row and the weights, so the same features can be scored with other weights.
+# The near_ features are near_calc with bias 1 (minus the distance to the perfect value), the other features are 
+# the values of the measures. Features that need a key or an input melody are NaN when they are not given.
+# ---------------------------------------------
+duration_names = {16: '16', 8: '8', 16/3: '16/3', 4: '4', 8/3: '8/3', 2: '2', 4/3: '4/3', 1: '1'}
+
+melody_feature_names = ['constant', 'near_repeating_note_length', 'near_note_length_clusters', 'near_nmb_of_passage_rep', 
+        'near_len_of_passage_rep', 'frac_repeating_passage', 'on_beat', 'on_half_beat', 'repeating_note_pitch', 
+        'tritone_or_seventh_in_two_skips', 'melody_intervals', 'motion_of_melody'] + [
+        'note_duration_' + duration_names[iDur] for iDur in accepted_durations]
+key_feature_names = ['notes_in_scale']
+input_feature_names = ['same_pattern', 'consonant_intervals', 'too_big_intervals', 
+        'contrary', 'oblique', 'similar', 'parallel', 'rest']
+feature_names = melody_feature_names + key_feature_names + input_feature_names
+
+# Features that are expensive to calculate, with the smallest and largest value they can have.
+# They are calculated last by calculate_fitness_profile_lazy, and only for melodies that can be among the best.
+expensive_feature_ranges = {'same_pattern': (0.0, 1.0), 'contrary': (0.0, 1.0), 'oblique': (0.0, 1.0), 
+        'similar': (0.0, 1.0), 'parallel': (0.0, 1.0), 'rest': (0.0, 1.0)}
+
+def melody_features(melody, measures, input_melody = None, input_grid = None, expensive = True):
+    """Returns a dict with the features of one melody, measures are its bar_measures.
+    With expensive = False the features in expensive_feature_ranges are left out."""
     
+    features = {'constant': 1.0}
+    features['near_repeating_note_length'] = near_calc(measures['repeating_note_length'], frac_repeating_note_length, 1.0)
+    features['near_note_length_clusters'] = near_calc(measures['average_note_length_clusters'], nmb_note_length_clusters, 1.0)
+    (x,y,frac_repeating_passage) = measures['repeating_passages']
+    features['near_nmb_of_passage_rep'] = near_calc(x, nmb_of_passage_rep, 1.0)
+    features['near_len_of_passage_rep'] = near_calc(y, len_of_passage_rep, 1.0)
+    features['frac_repeating_passage'] = frac_repeating_passage
+    (features['on_beat'], features['on_half_beat']) = measures['count_notes_on_beat']
+    features['repeating_note_pitch'] = measures['repeating_note_pitch']
+    features['tritone_or_seventh_in_two_skips'] = measures['count_tritone_or_seventh_in_two_skips']
+    features['melody_intervals'] = measures['check_melody_intervals']
+    features['motion_of_melody'] = measures['check_motion_of_melody']
+    durations = measures['check_note_durations']
+    for iDur in accepted_durations:
+        features['note_duration_' + duration_names[iDur]] = durations[iDur]
     
-def calculate_fitness_harmony(population, input_melody, key, counter = False):
-
-    if len(input_melody) == 0:
-        print('Wrong input in fitness function')
-        
-    population_size = len(population) 
-    fitness_values = np.zeros(population_size) 
-
-    default_bias = 10.0
-        
-    #For every melody in population calculate fitness THIS IS THE BIG CALCULATION PART
-    for iPop in range(population_size):
-        melody = population[iPop]
-        notes = melody.get_notes()
-        fitness = 1.0
-        #----------------------------------------------------------------------------------------------------------------    
-        #Measure closeness to ideal value
-        
-        #Within the melody
-        #Function that measures:                                                   Ideal value:                    Bias:
-        fitness += near_calc(measure.repeating_note_length(melody),                frac_repeating_note_length,     default_bias)
-        fitness += near_calc(measure.average_note_length_clusters(melody),         nmb_note_length_clusters,       default_bias)
-        (x,y,frac_repeating_passage) = measure.repeating_passages(melody)
-        fitness += near_calc(x,                                                    nmb_of_passage_rep,             default_bias)
-        fitness += near_calc(y,                                                    len_of_passage_rep,             default_bias)
-        
-        # Between the melodies
-        
-        # Can be used here instead if wanting a lower amount of same pattern than 1
-        #fitness += near_calc(measure.check_same_pattern(input_melody, melody),     frac_same_pattern,              default_bias)
-        
-        #-----------------------------------------------------------------------------------------------------------------
-        #Function that calculates fraction where 1 is best                          Bias:
-        fitness += more_calc(frac_repeating_passage,                                default_bias) #Calculated previously
-        (on_beat,on_half_beat) = measure.count_notes_on_beat(melody)
-        fitness += more_calc(on_beat,                                               default_bias*2)
-        fitness += more_calc(on_half_beat,                                          default_bias/2)
-
-        fitness += more_calc(measure.count_notes_in_scale(melody, key),             default_bias*5)
-        fitness += more_calc(measure.check_same_pattern(input_melody, melody),      default_bias)
-
-        consonant, too_long = measure.check_if_intervals_are_consonant_or_too_big(input_melody, melody)
-        fitness += more_calc(consonant,                                             default_bias*2)
-        fitness -= more_calc(too_long,                                              default_bias*5)
-
-        fitness -= more_calc(measure.repeating_note_pitch(melody,True),             default_bias)
-        fitness -= more_calc(measure.count_tritone_or_seventh_in_two_skips(melody), default_bias*1.2)
-        
-        fitness += more_calc(measure.check_melody_intervals(melody),                default_bias*1.2)
-        fitness += more_calc(measure.check_motion_of_melody(melody),                default_bias*1.2)
-               
-        contrapuntal_motion_values = measure.contrapuntal_motion(input_melody, melody)
-        fitness += more_calc(contrapuntal_motion_values['Contrary'],                default_bias*2)
-        
-        # If included, should add less than Contrary. Contrary is good, oblique and similar is okay.
-        fitness += more_calc(contrapuntal_motion_values['Oblique'],                 default_bias*1.2)
-        fitness += more_calc(contrapuntal_motion_values['Similar'],                 default_bias*1.2)
-        
-        # Having parallel motion or rest in both tracks is considered bad.
-        fitness -= more_calc(contrapuntal_motion_values['Parallel'],                default_bias*3)
-        fitness -= more_calc(contrapuntal_motion_values['Rest'],                    default_bias)
-               
-        durations = measure.check_note_durations(melody)
-        for iDur in accepted_durations:
-            fitness += more_calc(durations[iDur],     points_duration[iDur]       * default_bias*4)
-
-        #Add resulting fitness value to list
-        fitness_values[iPop] = fitness
-
-    return fitness_values
-
-
-def calculate_fitness_harmony_and_modulate(population, from_bar, to_bar, input_melody, key, counter = False):
-    "Return a melody that modulates from from_bar to to_bar and harmonizes the input_melody"
+    if 'count_notes_in_scale' in measures:
+        features['notes_in_scale'] = measures['count_notes_in_scale']
+    
+    # Between the melodies
+    if input_melody is not None:
+        (features['consonant_intervals'], features['too_big_intervals']) = measures['check_if_intervals_are_consonant_or_too_big']
+        if expensive:
+            features.update(expensive_features(melody, input_melody, input_grid))
     
+    return features
 
-    if len(input_melody) == 0:
-        print('Wrong input in fitness function')
+def expensive_features(melody, input_melody, input_grid = None):
+    "Returns a dict with the features in expensive_feature_ranges of one melody."
+    
+    features = {'same_pattern': measure.check_same_pattern(input_melody, melody)}
+    contrapuntal_motion_values = measure.contrapuntal_motion(input_melody, melody, input_grid)
+    for motion in ['Contrary', 'Oblique', 'Similar', 'Parallel', 'Rest']:
+        features[motion.lower()] = contrapuntal_motion_values[motion]
+    
+    return features
 
+def feature_matrix(melodies, key = None, input_melody = None, bar_cache = None, input_grid = None, expensive = True):
+    "Returns the feature matrix of the melodies, with arguments as in bar_measures and melody_features."
+    
+    features = np.full((len(melodies), len(feature_names)), np.nan)
+    melodies_measures = bar_measures(melodies, key, input_melody, bar_cache, input_grid)
+    for iMel in range(len(melodies)):
+        melody_values = melody_features(melodies[iMel], melodies_measures[iMel], input_melody, input_grid, expensive)
+        features[iMel] = [melody_values.get(name, np.nan) for name in feature_names]
+    
+    return features
+
+
+# ---------------------------------------------
+# Fitness profiles:
+# fitness_profiles holds a weight profile for each fitness function that is calculated from the feature matrix.
+# weights is a dict with the weight of each feature, features that are not in weights get weight 0.
+# With surround = True the melodies are measured between from_bar and to_bar, with two_voices = True 
+# the melodies are measured in the key and against the input melody.
+# ---------------------------------------------
+fitness_profiles = {}
+
+def register_fitness_profile(name, weights, surround = False, two_voices = False):
+    for feature in weights:
+        if not feature in feature_names:
+            raise ValueError(f'Unknown feature {feature} in fitness profile {name}.')
+    fitness_profiles[name] = {'weights': weights, 'surround': surround, 'two_voices': two_voices}
+
+def profile_weights(name):
+    "Returns the weights of the fitness profile as an array in the order of feature_names."
+    if not name in fitness_profiles:
+        raise ValueError(f'Unknown fitness profile {name}.')
+    weights = fitness_profiles[name]['weights']
+    return np.array([weights.get(feature, 0.0) for feature in feature_names])
+
+def score_features(features, name):
+    "Returns the fitness values of the rows of a feature matrix, with the weights of the fitness profile."
+    weights = profile_weights(name)
+    used = weights != 0
+    if np.any(np.isnan(features[:, used])):
+        missing = [feature_names[i] for i in np.flatnonzero(used) if np.any(np.isnan(features[:, i]))]
+        raise ValueError(f'Fitness profile {name} needs the features {missing}, which are not calculated.')
+    return features[:, used] @ weights[used]
+
+def profile_melodies(population, name, from_bar = None, to_bar = None):
+    "Returns the melodies that the fitness profile measures."
+    
+    if not fitness_profiles[name]['surround']:
+        return population
+    
     # Create a list of melodies including the bar before, the generated melody and the bar after.
     melodies = []
     track_from_bar = Track().add_bar(from_bar)
@@ -238,68 +264,201 @@ def calculate_fitness_harmony_and_modulate(population, from_bar, to_bar, input_m
         Track_Functions.add_tracks(track, melody)
         Track_Functions.add_tracks(track, track_to_bar)
         melodies.append(track)
+    return melodies
 
-    population_size = len(population) 
-    fitness_values = np.zeros(population_size) 
+def calculate_profile_features(population, name, key = None, input_melody = None, from_bar = None, to_bar = None, 
+        bar_cache = None, input_grid = None, expensive = True):
+    "Returns the feature matrix of the population, measured as the fitness profile needs."
+    
+    melodies = profile_melodies(population, name, from_bar, to_bar)
+    if not fitness_profiles[name]['two_voices']:
+        return feature_matrix(melodies, bar_cache = bar_cache, expensive = expensive)
+    return feature_matrix(melodies, key, input_melody, bar_cache, input_grid, expensive)
+
+def calculate_fitness_profile(population, name, key = None, input_melody = None, from_bar = None, to_bar = None, 
+        bar_cache = None, input_grid = None):
+    "Returns the fitness values of the population with the fitness profile."
+    features = calculate_profile_features(population, name, key, input_melody, from_bar, to_bar, bar_cache, input_grid)
+    return score_features(features, name)
+
+
+# ---------------------------------------------
+# calculate_fitness_profile_lazy:
+# Tiered version of calculate_fitness_profile. First the cheap features of all melodies are calculated, which
+# together with expensive_feature_ranges give the lowest and highest fitness each melody can have. Then the 
+# expensive features are calculated in order of the highest possible fitness, until no melody that is left can
+# be among the nr_contenders best. Those melodies get their highest possible fitness, which is below the fitness
+# of the nr_contenders best, so the best melodies and their fitness values are the same as without skipping.
+# The bounds can not be compared with each other or with the other fitness values below the best, so they must be 
+# calculated exactly before such comparisons (as EvolutionaryGenerator.exact_fitness_values does for tournaments).
+# Returns the fitness values and an array that is True for the melodies with exact fitness.
+# ---------------------------------------------
+def calculate_fitness_profile_lazy(population, name, nr_contenders, key = None, input_melody = None, from_bar = None, 
+        to_bar = None, bar_cache = None, input_grid = None):
     
-    default_bias = 10.0
+    weights = profile_weights(name)
+    melodies = profile_melodies(population, name, from_bar, to_bar)
+    two_voices = fitness_profiles[name]['two_voices']
+    if two_voices:
+        features = feature_matrix(melodies, key, input_melody, bar_cache, input_grid, expensive = False)
+    else:
+        features = feature_matrix(melodies, bar_cache = bar_cache, expensive = False)
+    
+    expensive_columns = [feature_names.index(feature) for feature in expensive_feature_ranges]
+    is_exact = np.zeros(len(melodies), dtype = bool)
+    if not two_voices or not np.any(weights[expensive_columns] != 0):
+        is_exact[:] = True
+        return score_features(features, name), is_exact
+    
+    # Bound the fitness with the cheap features and the ranges of the expensive ones
+    cheap_weights = weights.copy()
+    cheap_weights[expensive_columns] = 0
+    cheap_columns = np.flatnonzero(cheap_weights)
+    highest_fitness = features[:, cheap_columns] @ cheap_weights[cheap_columns]
+    for feature, (lowest, highest) in expensive_feature_ranges.items():
+        weight = weights[feature_names.index(feature)]
+        highest_fitness += max(weight*lowest, weight*highest)
+    fitness_values = highest_fitness.copy()
+    
+    # Fitness values of the best melodies so far, sorted from the lowest
+    best_fitness_values = []
+    for iMel in np.argsort(-highest_fitness, kind = 'stable'):
+        if len(best_fitness_values) >= nr_contenders and highest_fitness[iMel] < best_fitness_values[0]:
+            break
+        melody_values = expensive_features(melodies[iMel], input_melody, input_grid)
+        features[iMel, expensive_columns] = [melody_values[feature] for feature in expensive_feature_ranges]
+        is_exact[iMel] = True
+        
+        fitness = score_features(features[iMel:iMel + 1], name)[0]
+        bisect.insort(best_fitness_values, fitness)
+        if len(best_fitness_values) > nr_contenders:
+            best_fitness_values.pop(0)
+    
+    fitness_values[is_exact] = score_features(features[is_exact], name)
+    return fitness_values, is_exact
 
 
-    #For every melody in population calculate fitness THIS IS THE BIG CALCULATION PART
-    for iPop in range(population_size):
-        melody = melodies[iPop]
-        notes = melody.get_notes()
-        fitness = 1.0
-        
-        #----------------------------------------------------------------------------------------------------------------    
-        #Measure closeness to ideal value
-        
-        #Within the melody
-        #Function that measures:                                                   Ideal value:                    Bias:
-        fitness += near_calc(measure.repeating_note_length(melody),                frac_repeating_note_length,     default_bias)
-        fitness += near_calc(measure.average_note_length_clusters(melody),         nmb_note_length_clusters,       default_bias)
-        (x,y,frac_repeating_passage) = measure.repeating_passages(melody)
-        fitness += near_calc(x,                                                    nmb_of_passage_rep,             default_bias)
-        fitness += near_calc(y,                                                    len_of_passage_rep,             default_bias) 
-        
-        #-----------------------------------------------------------------------------------------------------------------
-        #Function that calculates fraction where 1 is best                          Bias:
-        fitness += more_calc(frac_repeating_passage,                                default_bias) #Calculated previously
-        (on_beat,on_half_beat) = measure.count_notes_on_beat(melody)
+default_bias = 10.0
+
+# Weights of the features within one melody
+#Feature:                                       Bias:
+melody_weights = {'constant':                   1.0,
+        'near_repeating_note_length':           default_bias,
+        'near_note_length_clusters':            default_bias,
+        'near_nmb_of_passage_rep':              default_bias,
+        'near_len_of_passage_rep':              default_bias,
+        'frac_repeating_passage':               default_bias,
         #When multiplying or dividing the default bias we change the relative weight of that function
-        fitness += more_calc(on_beat,                                               default_bias*2)
-        fitness += more_calc(on_half_beat,                                          default_bias/2)
+        'on_beat':                              default_bias*2,
+        'on_half_beat':                         default_bias/2,
+        'repeating_note_pitch':                 -default_bias,
+        'tritone_or_seventh_in_two_skips':      -default_bias*1.2}
+
+# Weights of the features between the melody and the input melody
+two_voice_weights = {'notes_in_scale':          default_bias*5,
+        'same_pattern':                         default_bias,
+        'consonant_intervals':                  default_bias*2,
+        'too_big_intervals':                    -default_bias*5,
+        'contrary':                             default_bias*2,
+        # If included, should add less than Contrary. Contrary is good, oblique and similar is okay.
+        'oblique':                              default_bias*1.2,
+        'similar':                              default_bias*1.2,
+        # Having parallel motion or rest in both tracks is considered bad.
+        'parallel':                             -default_bias*3,
+        'rest':                                 -default_bias}
+
+def duration_weights(points, bias):
+    return {'note_duration_' + duration_names[iDur]: points[iDur]*bias for iDur in accepted_durations}
 
-        fitness += more_calc(measure.count_notes_in_scale(melody, key),             default_bias*5)
-        fitness += more_calc(measure.check_same_pattern(input_melody, melody),      default_bias)
+# A fitness function for modulating/binding together two bars 
+register_fitness_profile('modulate', {**melody_weights, 
+        'melody_intervals': default_bias*5, 'motion_of_melody': default_bias*5, 
+        **duration_weights(points_duration, default_bias)}, surround = True)
 
-        consonant, too_long = measure.check_if_intervals_are_consonant_or_too_big(input_melody, melody)
-        fitness += more_calc(consonant,                                             default_bias*2)
-        fitness -= more_calc(too_long,                                              default_bias*5)
+# A fitness function for harmonizing the input melody
+harmony_weights = {**melody_weights, **two_voice_weights, 
+        'melody_intervals': default_bias*1.2, 'motion_of_melody': default_bias*1.2, 
+        **duration_weights(points_duration, default_bias*4)}
+register_fitness_profile('harmony', harmony_weights, two_voices = True)
+register_fitness_profile('counter', harmony_weights, two_voices = True)
 
-        fitness -= more_calc(measure.repeating_note_pitch(melody,True),             default_bias)
-        fitness -= more_calc(measure.count_tritone_or_seventh_in_two_skips(melody), default_bias*1.2)
-            
-        fitness += more_calc(measure.check_melody_intervals(melody),                default_bias*5)
-        fitness += more_calc(measure.check_motion_of_melody(melody),                default_bias*5)
+# A fitness function for modulating from from_bar to to_bar and harmonizing the input melody
+register_fitness_profile('ending', {**melody_weights, **two_voice_weights, 
+        'melody_intervals': default_bias*5, 'motion_of_melody': default_bias*5, 
+        **duration_weights(points_duration_ending, default_bias)}, surround = True, two_voices = True)
 
-        contrapuntal_motion_values = measure.contrapuntal_motion(input_melody, melody)
-        fitness += more_calc(contrapuntal_motion_values['Contrary'],                default_bias*2)
-        
-        # If included, should add less than Contrary. Contrary is good, oblique and similar is okay.
-        fitness += more_calc(contrapuntal_motion_values['Oblique'],                 default_bias*1.2)
-        fitness += more_calc(contrapuntal_motion_values['Similar'],                 default_bias*1.2)
-        
-        # Having parallel motion or rest in both tracks is considered bad.
-        fitness -= more_calc(contrapuntal_motion_values['Parallel'],                default_bias*3)
-        fitness -= more_calc(contrapuntal_motion_values['Rest'],                    default_bias)
-        
-        durations = measure.check_note_durations(melody)
-        for iDur in accepted_durations:
-            fitness += more_calc(durations[iDur],     points_duration_ending[iDur] *       default_bias)
 
-        #Add resulting fitness value to list
-        fitness_values[iPop] = fitness
-        
-        
-    return fitness_values
\ No newline at end of file
+# A fitness function for modulating/binding together two bars 
+def calculate_fitness_modulate(population, from_bar, to_bar, is_complex = True, bar_cache = None):
+    "Return a melody that modulates from from_bar to to_bar"
+    
+    if is_complex:
+        return calculate_fitness_profile(population, 'modulate', from_bar = from_bar, to_bar = to_bar, bar_cache = bar_cache)
+    else:
+
+        return calculate_fitness_C(population, 2)   
+    
+    
+def calculate_fitness_harmony(population, input_melody, key, counter = False, bar_cache = None, input_grid = None):
+
+    if len(input_melody) == 0:
+        print('Wrong input in fitness function')
+    
+    return calculate_fitness_profile(population, 'harmony', key, input_melody, bar_cache = bar_cache, input_grid = input_grid)
+
+
+def calculate_fitness_harmony_and_modulate(population, from_bar, to_bar, input_melody, key, counter = False, bar_cache = None, input_grid = None):
+    "Return a melody that modulates from from_bar to to_bar and harmonizes the input_melody"
+    
+    if len(input_melody) == 0:
+        print('Wrong input in fitness function')
+    
+    return calculate_fitness_profile(population, 'ending', key, input_melody, from_bar, to_bar, bar_cache, input_grid)
+
+# Batch version of feature_matrix for calculate_fitness_harmony. Calculates all features for the whole population 
+# at once with the functions in batch_tests. The population can be a list of Tracks or a GenomePopulation.
+# Gives the same features as feature_matrix for melodies on the semiquaver grid.
+def batch_feature_matrix(population, input_melody, key):
+
+    if isinstance(population, Genome_Functions.GenomePopulation):
+        melodies = batch.genomes_to_matrix(population, key)
+    else:
+        melodies = batch.tracks_to_matrix(population)
+    fixed_melody = batch.tracks_to_matrix([input_melody])
+    
+    features = {'constant': np.ones(len(melodies))}
+    rhythm = batch.rhythm_measures(melodies)
+    features['near_repeating_note_length'] = near_calc(rhythm['repeating_note_length'], frac_repeating_note_length, 1.0)
+    features['near_note_length_clusters'] = near_calc(rhythm['average_note_length_clusters'], nmb_note_length_clusters, 1.0)
+    (x,y,frac_repeating_passage) = batch.repeating_passages(melodies)
+    features['near_nmb_of_passage_rep'] = near_calc(x, nmb_of_passage_rep, 1.0)
+    features['near_len_of_passage_rep'] = near_calc(y, len_of_passage_rep, 1.0)
+    features['frac_repeating_passage'] = frac_repeating_passage
+    (features['on_beat'], features['on_half_beat']) = rhythm['count_notes_on_beat']
+    features['repeating_note_pitch'] = batch.repeating_note_pitch(melodies)
+    melodic_intervals = batch.melodic_interval_measures(melodies)
+    features['tritone_or_seventh_in_two_skips'] = melodic_intervals['count_tritone_or_seventh_in_two_skips']
+    features['melody_intervals'] = melodic_intervals['check_melody_intervals']
+    features['motion_of_melody'] = melodic_intervals['check_motion_of_melody']
+    durations = rhythm['check_note_durations']
+    for iDur in accepted_durations:
+        features['note_duration_' + duration_names[iDur]] = durations[iDur]
+    
+    features['notes_in_scale'] = batch.count_notes_in_scale(melodies, key)
+    two_voices = batch.two_voice_measures(fixed_melody, melodies)
+    features['same_pattern'] = two_voices['check_same_pattern']
+    (features['consonant_intervals'], features['too_big_intervals']) = two_voices['check_if_intervals_are_consonant_or_too_big']
+    contrapuntal_motion_values = two_voices['contrapuntal_motion']
+    for motion in ['Contrary', 'Oblique', 'Similar', 'Parallel', 'Rest']:
+        features[motion.lower()] = contrapuntal_motion_values[motion]
+    
+    return np.column_stack([features[name] for name in feature_names])
+
+# Batch version of calculate_fitness_harmony, scores batch_feature_matrix with the harmony profile.
+def calculate_fitness_harmony_batch(population, input_melody, key, counter = False):
+
+    if len(input_melody) == 0:
+        print('Wrong input in fitness function')
+    
+    return score_features(batch_feature_matrix(population, input_melody, key), 'harmony')
+
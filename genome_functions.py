@@ -0,0 +1,178 @@
+#---------------------------------------------
+# In this file we create functions for the array based genome that EvolutionaryGenerator
+# uses when genome_mode is set. A melody is stored on a grid of semiquavers (1/16 of a bar),
+# with one integer pitch per grid slot together with onset/hold/rest flags.
+# Conversion to mingus Tracks is only done when a Track is really needed.
+#---------------------------------------------
+
+from mingus.containers import Track
+from mingus.containers import Bar
+from mingus.containers import Note
+import mingus.core.notes as notes
+import mingus.core.keys as keys
+import numpy as np
+
+"""FUNCTION INDEX                                           (to be able to find functions easier)
+GenomePopulation(pitch, onset)                              Population of melodies stored as two (population_size, nr_slots) arrays.
+empty_population(population_size, nr_bars)                  Returns a GenomePopulation where every slot is a rest.
+note_lengths(onset_row)                                     Returns (start slots, lengths in slots) of all notes in one genome.
+duration_to_slots(duration)                                 Translates a mingus duration to a number of grid slots.
+slots_to_duration(nr_slots)                                 Translates a number of grid slots to a mingus duration.
+pitch_to_note(pitch, key)                                   Returns a Note with the given integer pitch, spelled after the key.
+track_to_genome(track, nr_bars)                             Returns (pitch, onset) arrays for a track on the semiquaver grid.
+genome_to_track(pitch_row, onset_row, key)                  Returns a Track built from one genome.
+"""
+
+# Number of grid slots in one bar, the grid is semiquavers in 4/4.
+SLOTS_PER_BAR = 16
+
+# Pitch value used for slots that are rests
+REST = -1
+
+
+# ---------------------------------------------
+# GenomePopulation:
+# A population of melodies stored as arrays, one row per individual and one column per grid slot.
+# pitch holds the integer pitch (as int(Note)) sounding in the slot, or REST.
+# onset is True where a note or rest starts. A slot that is not an onset holds the previous slot.
+# ---------------------------------------------
+class GenomePopulation():
+
+    def __init__(self, pitch, onset):
+        self.pitch = pitch
+        self.onset = onset
+
+    def __len__(self):
+        return self.pitch.shape[0]
+
+    @property
+    def rest(self):
+        "Flags for the slots that are rests"
+        return self.pitch == REST
+
+    @property
+    def hold(self):
+        "Flags for the slots that continue the note started before them"
+        return np.logical_not(self.onset)
+
+    def select(self, indices):
+        "Returns a new GenomePopulation with the individuals at the given indices."
+        return GenomePopulation(self.pitch[indices], self.onset[indices])
+
+    def get_individual(self, index):
+        "Returns the (pitch, onset) arrays of one individual, as views into the population arrays."
+        return (self.pitch[index], self.onset[index])
+
+    def set_individual(self, index, individual):
+        "Overwrites one individual with the given (pitch, onset) arrays."
+        self.pitch[index] = individual[0]
+        self.onset[index] = individual[1]
+
+    def to_track(self, index, key):
+        return genome_to_track(self.pitch[index], self.onset[index], key)
+
+    def to_tracks(self, key):
+        return [self.to_track(i, key) for i in range(len(self))]
+
+
+def empty_population(population_size, nr_bars):
+    "Returns a GenomePopulation where every bar is a whole rest."
+    nr_slots = nr_bars*SLOTS_PER_BAR
+    pitch = np.full((population_size, nr_slots), REST, dtype = np.int16)
+    onset = np.zeros((population_size, nr_slots), dtype = bool)
+    onset[:, ::SLOTS_PER_BAR] = True
+    return GenomePopulation(pitch, onset)
+
+
+def note_lengths(onset_row):
+    "Returns two arrays with the start slot and the length in slots of every note in the genome."
+    starts = np.flatnonzero(onset_row)
+    lengths = np.diff(np.append(starts, len(onset_row)))
+    return starts, lengths
+
+
+# ---------------------------------------------
+# Conversion between mingus durations and grid slots.
+# Durations that fits the grid evenly (16, 8, 4, 2, 1) are kept as int, as in the rest of the program.
+# ---------------------------------------------
+def duration_to_slots(duration):
+    nr_slots = SLOTS_PER_BAR/duration
+    if abs(nr_slots - round(nr_slots)) > 1e-9 or round(nr_slots) < 1:
+        raise ValueError('Note duration is not on the semiquaver grid.')
+    return int(round(nr_slots))
+
+def slots_to_duration(nr_slots):
+    if SLOTS_PER_BAR % nr_slots == 0:
+        return SLOTS_PER_BAR // nr_slots
+    return SLOTS_PER_BAR / nr_slots
+
+
+def pitch_to_note(pitch, key):
+    """Returns a Note with the given integer pitch. Notes in the scale of the key use the
+    name from the scale, other notes get sharps or flats depending on the key signature."""
+
+    pitch = int(pitch)
+    pitch_class = pitch % 12
+    name = None
+    for scale_name in keys.get_notes(key):
+        if notes.note_to_int(scale_name) == pitch_class:
+            name = scale_name
+            break
+    if name is None:
+        if keys.get_key_signature(key) < 0:
+            name = notes.int_to_note(pitch_class, 'b')
+        else:
+            name = notes.int_to_note(pitch_class)
+
+    # Names like Cb and B# belong to a neighbouring octave
+    octave = (pitch - int(Note(name, 0))) // 12
+    return Note(name, octave)
+
+
+# ---------------------------------------------
+# track_to_genome:
+# Translates a track to (pitch, onset) arrays. Only the first note of every NoteContainer is used.
+# Raises ValueError if any note does not start and end on the semiquaver grid.
+# ---------------------------------------------
+def track_to_genome(track, nr_bars = None):
+    if nr_bars is None:
+        nr_bars = len(track)
+
+    pitch = np.full(nr_bars*SLOTS_PER_BAR, REST, dtype = np.int16)
+    onset = np.zeros(nr_bars*SLOTS_PER_BAR, dtype = bool)
+    onset[::SLOTS_PER_BAR] = True
+
+    for bar_nr in range(nr_bars):
+        bar_start = bar_nr*SLOTS_PER_BAR
+        for note in track[bar_nr]:
+            start = note[0]*SLOTS_PER_BAR
+            if abs(start - round(start)) > 1e-9:
+                raise ValueError('Note start is not on the semiquaver grid.')
+            start = bar_start + int(round(start))
+            end = start + duration_to_slots(note[1])
+
+            onset[start] = True
+            if note[2] is not None and len(note[2]) > 0:
+                pitch[start:end] = int(note[2][0])
+
+    return pitch, onset
+
+
+def genome_to_track(pitch_row, onset_row, key):
+    "Returns a Track with the notes of one genome."
+
+    track = Track()
+    starts, lengths = note_lengths(onset_row)
+    bar = None
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        if start % SLOTS_PER_BAR == 0:
+            bar = Bar(key)
+            track.add_bar(bar)
+
+        duration = slots_to_duration(length)
+        if pitch_row[start] == REST:
+            bar.place_rest(duration)
+        else:
+            bar.place_notes(pitch_to_note(pitch_row[start], key), duration)
+
+    return track
@@ -0,0 +1,148 @@
+#---------------------------------------------
+# In this file we run EvolutionaryGenerator in island mode (nr_islands > 1).
+# Each island is a separate population that evolves in a process of the shared pool (see parallel_fitness).
+# Every migration_interval generations the islands stop, each island sends copies of its migration_size best
+# individuals to the next island (in a ring), where they replace the worst individuals. Then all islands continue.
+# The result is the best individual over all islands.
+#---------------------------------------------
+
+import contextlib
+import os
+import numpy as np
+import genome_functions as Genome_Functions
+import parallel_fitness as Parallel_Fitness
+
+"""FUNCTION INDEX                                           (to be able to find functions easier)
+run_evolution(generator)                                    Runs the evolution of the generator on nr_islands islands.
+evolve_island(run, population, fitness_values, ...)         Evolves one island for a number of generations, in a worker process.
+migrate(generator, populations, fitness_values)             Moves the best individuals of each island to the next island.
+"""
+
+
+# ---------------------------------------------
+# run_evolution:
+# Island mode version of EvolutionaryGenerator.run_evolution. Saves the best individual over all islands
+# in generator.best_individual, and the population of that island in generator.population.
+# ---------------------------------------------
+def run_evolution(generator):
+
+    if generator.checkpoint_file is not None:
+        raise ValueError('Checkpoints are not supported in island mode.')
+
+    # The islands calculate their fitness in their own process
+    settings = generator.evolution_settings()
+    run = Parallel_Fitness.start_run(settings)
+    executor = Parallel_Fitness.get_pool(generator.nr_islands)
+
+    populations = [None]*generator.nr_islands
+    fitness_values = [None]*generator.nr_islands
+    generator.max_fitness_value = -5000
+    generator.fitness_history = []
+    generator.stop_reason = None
+
+    iGen = 0
+    while iGen < generator.nr_generations:
+        nr_generations = min(generator.migration_interval, generator.nr_generations - iGen)
+
+        futures = [executor.submit(evolve_island, run, populations[i], fitness_values[i], iGen, nr_generations,
+                int(generator.rng.integers(2**32))) for i in range(generator.nr_islands)]
+        results = [future.result() for future in futures]
+        populations = [result[0] for result in results]
+        fitness_values = [result[1] for result in results]
+        island_histories = [result[2] for result in results]
+        iGen += nr_generations
+
+        # Print best individual and its fitness value if better than before
+        best_island = int(np.argmax([np.max(values) for values in fitness_values]))
+        best_fitness_value = np.max(fitness_values[best_island])
+        generator.population = populations[best_island]
+        if best_fitness_value > generator.max_fitness_value:
+            best_individual = generator.get_individual(int(np.argmax(fitness_values[best_island])))
+            print(f"Generation: {iGen}")
+            print(f"Best individual: {generator.individual_to_track(best_individual)}")
+            print(f"Maximal fitness: {best_fitness_value}")
+            generator.max_fitness_value = best_fitness_value
+
+        # The fitness history is the best fitness over all islands in each generation. The stopping rules are
+        # only checked after each migration interval, the diversity on the best island.
+        # An island that reached global_max stopped early, so its history can be shorter.
+        histories = np.full((generator.nr_islands, max(len(history) for history in island_histories)), -np.inf)
+        for iIsland, history in enumerate(island_histories):
+            histories[iIsland, :len(history)] = history
+        generator.fitness_history.extend(np.max(histories, axis = 0).tolist())
+        generator.stop_reason = generator.check_stopping()
+        if generator.stop_reason is not None:
+            break
+
+        migrate(generator, populations, fitness_values)
+
+    if generator.stop_reason is None:
+        generator.stop_reason = 'max_generations'
+
+    # Save the best individual over all islands
+    best_island = int(np.argmax([np.max(values) for values in fitness_values]))
+    generator.population = populations[best_island]
+    generator.best_individual = generator.individual_to_track(generator.get_individual(int(np.argmax(fitness_values[best_island]))))
+
+    print(f"Stopped after generation {iGen}: {generator.stop_reason}")
+    Parallel_Fitness.end_run(run)
+
+
+# ---------------------------------------------
+# evolve_island:
+# Runs in the worker processes. Evolves the population for nr_generations generations, starting from a new
+# population if population is None. fitness_values are the known fitness values of the population, or None.
+# Returns the last population, its fitness values and the best fitness of each evaluated generation.
+# ---------------------------------------------
+def evolve_island(run, population, fitness_values, first_generation, nr_generations, seed):
+    generator = Parallel_Fitness.get_worker_generator(run)
+
+    # Every island gets its own random numbers, drawn by the main generator
+    generator.rng = np.random.default_rng(seed)
+
+    # Only the main process prints the progress
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        # Keep the fitness cache of the run if this worker already evolved an island of it
+        fitness_cache = generator.fitness_cache
+        generator.start_evolution(population)
+        if fitness_cache is not None:
+            generator.fitness_cache = fitness_cache
+
+        for iGen in range(first_generation, first_generation + nr_generations):
+            fitness_values = generator.evaluate_generation(iGen, fitness_values)
+            if generator.max_fitness_value == generator.global_max:
+                return generator.population, fitness_values, generator.fitness_history
+            generator.next_generation(fitness_values)
+            fitness_values = None
+
+        fitness_values = generator.calculate_fitness()
+
+    return generator.population, fitness_values, generator.fitness_history
+
+
+def migrate(generator, populations, fitness_values):
+    "Replaces the worst individuals of each island with copies of the best individuals of the previous island."
+
+    migration_size = min(generator.migration_size, generator.population_size//2)
+    if migration_size == 0:
+        return
+
+    # Copy all migrants before any island is changed
+    migrants = []
+    for population, values in zip(populations, fitness_values):
+        best_indices = np.argsort(values)[-migration_size:]
+        if isinstance(population, Genome_Functions.GenomePopulation):
+            migrants.append((population.select(best_indices), values[best_indices]))
+        else:
+            migrants.append(([population[i] for i in best_indices], values[best_indices]))
+
+    for iIsland in range(len(populations)):
+        population = populations[iIsland]
+        individuals, values = migrants[iIsland - 1]
+        worst_indices = np.argsort(fitness_values[iIsland])[:migration_size]
+        for i in range(migration_size):
+            if isinstance(population, Genome_Functions.GenomePopulation):
+                population.set_individual(worst_indices[i], individuals.get_individual(i))
+            else:
+                population[worst_indices[i]] = individuals[i]
+            fitness_values[iIsland][worst_indices[i]] = values[i]
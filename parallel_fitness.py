@@ -0,0 +1,113 @@
+#---------------------------------------------
+# In this file we create the process pool that EvolutionaryGenerator uses to calculate fitness in
+# parallel when nr_workers > 1. The pool is shared by all generators and stays alive between
+# generations and between runs, until shutdown_pool is called.
+# The fixed inputs of a run (input melody, bars, key, ...) are written to a file once when the run
+# starts, and every worker loads them the first time it gets a part of that run. After that only
+# the population parts are sent to the workers.
+#---------------------------------------------
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import os
+import pickle
+import tempfile
+import uuid
+import genome_functions as Genome_Functions
+
+"""FUNCTION INDEX                                           (to be able to find functions easier)
+get_pool(nr_workers)                                        Returns the shared process pool with at least nr_workers workers.
+shutdown_pool()                                             Stops the worker processes of the shared pool.
+start_run(settings)                                         Saves the fixed inputs of a run and returns a handle for it.
+end_run(run)                                                Removes the saved fixed inputs of a run.
+get_worker_generator(run)                                   In a worker process, returns a generator with the fixed inputs of a run.
+calculate_fitness(generator, population, return_exact, exact) Calculates the fitness of a population in the pool.
+"""
+
+# The shared pool and its number of workers. The pool is only made again if more workers are needed, so
+# generators that use different numbers of workers (like nr_workers and nr_islands) share the same pool.
+pool = None
+pool_nr_workers = 0
+
+# In the worker processes: generators holding the fixed inputs of the runs seen by this worker.
+worker_generators = {}
+max_nr_worker_generators = 8
+
+
+def get_pool(nr_workers):
+    global pool, pool_nr_workers
+    if pool is None or pool_nr_workers < nr_workers:
+        shutdown_pool()
+        pool = ProcessPoolExecutor(max_workers = nr_workers)
+        pool_nr_workers = nr_workers
+    return pool
+
+def shutdown_pool():
+    global pool, pool_nr_workers
+    if pool is not None:
+        pool.shutdown()
+    pool = None
+    pool_nr_workers = 0
+
+
+def start_run(settings):
+    "Saves the fixed inputs of a run (keyword arguments to EvolutionaryGenerator) and returns a handle (run_id, path)."
+    file_descriptor, path = tempfile.mkstemp(suffix = '.pickle', prefix = 'fugue_run_')
+    with os.fdopen(file_descriptor, 'wb') as f:
+        pickle.dump(settings, f)
+    return (uuid.uuid4().hex, path)
+
+def end_run(run):
+    try:
+        os.remove(run[1])
+    except OSError:
+        pass
+
+
+# ---------------------------------------------
+# get_worker_generator:
+# Runs in the worker processes. Returns a generator holding the fixed inputs of the run, 
+# they are loaded the first time they are needed.
+# ---------------------------------------------
+def get_worker_generator(run):
+    run_id, path = run
+    if not run_id in worker_generators:
+        # Imported here since EvolutionaryGenerator imports this file
+        from EvolutionaryGenerator import EvolutionaryGenerator
+
+        with open(path, 'rb') as f:
+            settings = pickle.load(f)
+
+        if len(worker_generators) >= max_nr_worker_generators:
+            worker_generators.pop(next(iter(worker_generators)))
+        worker_generators[run_id] = EvolutionaryGenerator(**settings)
+
+    return worker_generators[run_id]
+
+def calculate_fitness_part(run, population_part, return_exact = False, exact = False):
+    return get_worker_generator(run).calculate_population_fitness(population_part, return_exact, exact)
+
+
+def calculate_fitness(generator, population, return_exact = False, exact = False):
+    """Splits the population over the pool and returns the fitness values, using the fixed inputs of the generator.
+    return_exact and exact are as in EvolutionaryGenerator.calculate_population_fitness."""
+
+    if generator.fitness_run is None:
+        generator.fitness_run = start_run(generator.fitness_settings())
+
+    parts = np.array_split(np.arange(len(population)), generator.nr_workers)
+    parts = [part for part in parts if len(part) > 0]
+
+    executor = get_pool(generator.nr_workers)
+    futures = []
+    for part in parts:
+        if isinstance(population, Genome_Functions.GenomePopulation):
+            population_part = population.select(part)
+        else:
+            population_part = [population[i] for i in part]
+        futures.append(executor.submit(calculate_fitness_part, generator.fitness_run, population_part, return_exact, exact))
+
+    results = [future.result() for future in futures]
+    if return_exact:
+        return (np.concatenate([result[0] for result in results]), np.concatenate([result[1] for result in results]))
+    return np.concatenate(results)
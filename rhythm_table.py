@@ -0,0 +1,68 @@
+#---------------------------------------------
+# In this file we enumerate all rhythms of one bar that can be made of the possible note lengths, on the
+# semiquaver grid of genome_functions. The rhythms are stored once in a table, so a random bar rhythm, or a
+# random note length that fits in the rest of a bar, is a lookup in the table instead of drawing lengths
+# until one fits.
+#---------------------------------------------
+
+import numpy as np
+import genome_functions as Genome_Functions
+
+"""FUNCTION INDEX                                           (to be able to find functions easier)
+RhythmTable(possible_lengths)                               Table of all bar rhythms made of the possible note lengths.
+get_rhythm_table(possible_lengths)                          Returns the RhythmTable of the possible lengths, made only once.
+"""
+
+
+# ---------------------------------------------
+# RhythmTable:
+# lengths are the possible note lengths in slots, sorted from the shortest.
+# nr_fitting_lengths[slots_left] is the number of lengths that fit in the last slots_left slots of a bar,
+# so the lengths that fit are lengths[:nr_fitting_lengths[slots_left]].
+# rhythms[i] is a tuple with the note lengths in slots of rhythm i, and onsets[i] are its onset flags.
+# The probability of a rhythm is the one it gets when the notes are drawn one by one, each length with
+# the same probability among the lengths that fit in the rest of the bar.
+# ---------------------------------------------
+class RhythmTable():
+
+    def __init__(self, possible_lengths):
+        slots_per_bar = Genome_Functions.SLOTS_PER_BAR
+        self.lengths = np.array(sorted(Genome_Functions.duration_to_slots(duration) for duration in possible_lengths))
+        self.nr_fitting_lengths = np.searchsorted(self.lengths, np.arange(slots_per_bar + 1), side = 'right')
+
+        # Rhythms that fill the last slots_left slots of a bar, with their probabilities
+        rhythms_left = [[((), 1.0)]]
+        for slots_left in range(1, slots_per_bar + 1):
+            fitting_lengths = self.lengths[:self.nr_fitting_lengths[slots_left]]
+            rhythms_left.append([((length,) + rhythm, probability/len(fitting_lengths))
+                    for length in fitting_lengths.tolist() for rhythm, probability in rhythms_left[slots_left - length]])
+
+        self.rhythms = [rhythm for rhythm, probability in rhythms_left[slots_per_bar]]
+        probabilities = np.array([probability for rhythm, probability in rhythms_left[slots_per_bar]])
+        self.cumulative_probabilities = np.cumsum(probabilities)/np.sum(probabilities)
+
+        self.onsets = np.zeros((len(self.rhythms), slots_per_bar), dtype = bool)
+        for iRhythm, rhythm in enumerate(self.rhythms):
+            self.onsets[iRhythm, np.cumsum((0,) + rhythm[:-1])] = True
+
+    def __len__(self):
+        return len(self.rhythms)
+
+    def draw_rhythms(self, rng, size):
+        "Returns an array of the given size with indices of random rhythms."
+        indices = np.searchsorted(self.cumulative_probabilities, rng.random(size), side = 'right')
+        return np.minimum(indices, len(self.rhythms) - 1)
+
+    def fitting_lengths(self, slots_left):
+        "Returns the lengths that fit in the last slots_left slots of a bar."
+        return self.lengths[:self.nr_fitting_lengths[slots_left]]
+
+
+# The tables that are made, one for each tuple of possible lengths
+rhythm_tables = {}
+
+def get_rhythm_table(possible_lengths):
+    possible_lengths = tuple(possible_lengths)
+    if not possible_lengths in rhythm_tables:
+        rhythm_tables[possible_lengths] = RhythmTable(possible_lengths)
+    return rhythm_tables[possible_lengths]
@@ -0,0 +1,62 @@
+#---------------------------------------------
+# In this file we run tasks that depend on each other, like the evolutionary parts of a fugue.
+# A task is started as soon as the tasks it depends on are done, so independent tasks run at the same
+# time in a pool of processes.
+#---------------------------------------------
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+"""FUNCTION INDEX                                           (to be able to find functions easier)
+run_task_graph(tasks, function, nr_parallel_tasks)          Runs function for every task when its dependencies are done.
+"""
+
+
+# ---------------------------------------------
+# run_task_graph:
+# tasks is a dict from task name to (dependencies, prepare), where dependencies is a list of task names.
+# When the dependencies of a task are done, prepare is called in this process with their results and
+# returns the argument to function, which is called in one of nr_parallel_tasks worker processes.
+# With nr_parallel_tasks = 1 everything runs in this process. Ready tasks are started in the order of the dict.
+# Returns a dict from task name to the result of function.
+# ---------------------------------------------
+def run_task_graph(tasks, function, nr_parallel_tasks = 1):
+    for name, (dependencies, prepare) in tasks.items():
+        for dependency in dependencies:
+            if not dependency in tasks:
+                raise ValueError(f'Task {name} depends on unknown task {dependency}.')
+
+    results = {}
+    waiting = list(tasks)
+    running = {}
+    executor = None
+    if nr_parallel_tasks > 1:
+        executor = ProcessPoolExecutor(max_workers = nr_parallel_tasks)
+
+    try:
+        while len(waiting) > 0 or len(running) > 0:
+            # Start all tasks whose dependencies are done
+            for name in list(waiting):
+                dependencies, prepare = tasks[name]
+                if not all(dependency in results for dependency in dependencies):
+                    continue
+                waiting.remove(name)
+                argument = prepare(*[results[dependency] for dependency in dependencies])
+                if executor is None:
+                    results[name] = function(argument)
+                else:
+                    running[executor.submit(function, argument)] = name
+
+            if executor is None or len(running) == 0:
+                if len(waiting) > 0 and not any(all(dependency in results for dependency in tasks[name][0]) for name in waiting):
+                    raise ValueError('The tasks have circular dependencies.')
+                continue
+
+            # Wait for at least one task to finish
+            done, not_done = wait(running, return_when = FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return results
@@ -0,0 +1,62 @@
+#---------------------------------------------
+# In this file we test that the batch harmony fitness (see batch_tests) gives the same values as the
+# scalar one, for populations of Tracks and of genomes (see genome_functions) made by the generator.
+# Run with: python -m pytest test_batch_fitness.py
+#---------------------------------------------
+
+import pytest
+import numpy as np
+from EvolutionaryGenerator import EvolutionaryGenerator
+import fitness_functions as Fitness_Functions
+import track_functions as Track_Functions
+
+# Largest allowed difference between the batch and the scalar fitness of an individual
+tolerance = 1e-9
+
+# Presets of whole bars on the semiquaver grid, as the input melodies of the generator are
+presets = ['blinka', 'nokia', 'windows', 'brick']
+seeds = [0, 1, 2]
+
+
+def initial_population(preset, seed, genome_mode):
+    "Returns a first population of the harmony generator for the preset, with its input melody and key."
+    input_melody, key = Track_Functions.init_preset_track(preset)
+    generator = EvolutionaryGenerator(key, nr_bars = len(input_melody), fitness_function = 'harmony',
+            input_melody = input_melody, genome_mode = genome_mode, seed = seed)
+    generator.population_size = 200
+    if genome_mode:
+        return generator.initialize_genome_population(), input_melody, key
+    return generator.initialize_population(), input_melody, key
+
+
+@pytest.mark.parametrize('genome_mode', [False, True], ids = ['tracks', 'genomes'])
+@pytest.mark.parametrize('seed', seeds)
+@pytest.mark.parametrize('preset', presets)
+def test_batch_harmony_fitness_equals_scalar(preset, seed, genome_mode):
+    population, input_melody, key = initial_population(preset, seed, genome_mode)
+
+    batch_values = Fitness_Functions.calculate_fitness_harmony_batch(population, input_melody, key)
+    if genome_mode:
+        population = population.to_tracks(key)
+    scalar_values = Fitness_Functions.calculate_fitness_harmony(population, input_melody, key)
+
+    assert batch_values.shape == scalar_values.shape
+    np.testing.assert_allclose(batch_values, scalar_values, rtol = 0, atol = tolerance)
+
+
+@pytest.mark.parametrize('genome_mode', [False, True], ids = ['tracks', 'genomes'])
+@pytest.mark.parametrize('preset', presets)
+def test_batch_harmony_fitness_equals_scalar_after_evolution(preset, genome_mode):
+    # The population after some generations, with crossed over and mutated individuals
+    input_melody, key = Track_Functions.init_preset_track(preset)
+    generator = EvolutionaryGenerator(key, nr_bars = len(input_melody), fitness_function = 'harmony',
+            input_melody = input_melody, genome_mode = genome_mode, seed = 3, nr_generations = 10)
+    generator.run_evolution()
+    population = generator.population
+
+    batch_values = Fitness_Functions.calculate_fitness_harmony_batch(population, input_melody, key)
+    if genome_mode:
+        population = population.to_tracks(key)
+    scalar_values = Fitness_Functions.calculate_fitness_harmony(population, input_melody, key)
+
+    np.testing.assert_allclose(batch_values, scalar_values, rtol = 0, atol = tolerance)
@@ -0,0 +1,85 @@
+#---------------------------------------------
+# In this file we test the checkpoints of EvolutionaryGenerator (see checkpoint): a run that is stopped and
+# resumed from its checkpoint gives the same best individual, fitness history and random state as a run
+# with the same seed that was never stopped, also with lazy fitness and the fitness cache. A checkpoint of 
+# a run with another seed or input melody is refused.
+# Run with: python -m pytest test_checkpoint.py
+#---------------------------------------------
+
+import os
+import pytest
+from EvolutionaryGenerator import EvolutionaryGenerator
+import parallel_fitness as Parallel_Fitness
+import track_functions as Track_Functions
+
+nr_generations = 40
+checkpoint_interval = 10
+
+# Generation where the run is stopped, between two checkpoints
+stop_generation = 25
+
+
+@pytest.fixture(autouse = True)
+def shutdown_pool():
+    yield
+    Parallel_Fitness.shutdown_pool()
+
+
+def harmony_generator(genome_mode, lazy, checkpoint_file = None, seed = 7, preset = 'blinka'):
+    "Returns a harmony generator for the preset, with lazy fitness and a fitness cache if lazy = True."
+    input_melody, key = Track_Functions.init_preset_track(preset)
+    lazy_settings = dict(lazy_fitness_contenders = 5, fitness_cache_size = 60) if lazy else {}
+    return EvolutionaryGenerator(key, nr_bars = 1, fitness_function = 'harmony', input_melody = input_melody,
+            nr_generations = nr_generations, seed = seed, genome_mode = genome_mode, checkpoint_file = checkpoint_file,
+            checkpoint_interval = checkpoint_interval, **lazy_settings)
+
+
+def result(generator):
+    "Returns the fitness history, the best individual and the next random number of a finished run."
+    return generator.fitness_history, str(generator.best_individual), generator.rng.random()
+
+
+def stopped_run(generator, monkeypatch):
+    "Runs the generator until it is stopped, as by Ctrl-C, in generation stop_generation."
+    next_generation = EvolutionaryGenerator.next_generation
+    nr_calls = [0]
+    def stopping_next_generation(self, fitness_values):
+        nr_calls[0] += 1
+        if nr_calls[0] == stop_generation:
+            raise KeyboardInterrupt
+        return next_generation(self, fitness_values)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(EvolutionaryGenerator, 'next_generation', stopping_next_generation)
+        with pytest.raises(KeyboardInterrupt):
+            generator.run_evolution()
+
+
+@pytest.mark.parametrize('lazy', [False, True], ids = ['eager', 'lazy'])
+@pytest.mark.parametrize('genome_mode', [False, True], ids = ['tracks', 'genomes'])
+def test_resumed_run_equals_uninterrupted_run(genome_mode, lazy, tmp_path, monkeypatch):
+    checkpoint_file = str(tmp_path / 'checkpoint.pickle.gz')
+    generator = harmony_generator(genome_mode, lazy)
+    generator.run_evolution()
+    uninterrupted = result(generator)
+
+    stopped_run(harmony_generator(genome_mode, lazy, checkpoint_file), monkeypatch)
+    assert os.path.exists(checkpoint_file)
+
+    generator = harmony_generator(genome_mode, lazy, checkpoint_file)
+    generator.run_evolution()
+    assert len(generator.fitness_history) == len(uninterrupted[0])
+    assert result(generator) == uninterrupted
+
+    # A finished run is restored from its checkpoint
+    generator = harmony_generator(genome_mode, lazy, checkpoint_file)
+    generator.run_evolution()
+    assert result(generator) == uninterrupted
+
+
+@pytest.mark.parametrize('other_run', [dict(seed = 8), dict(preset = 'brick')], ids = ['seed', 'input_melody'])
+def test_checkpoint_of_other_run_is_refused(other_run, tmp_path, monkeypatch):
+    checkpoint_file = str(tmp_path / 'checkpoint.pickle.gz')
+    stopped_run(harmony_generator(False, False, checkpoint_file), monkeypatch)
+    with pytest.raises(ValueError):
+        harmony_generator(False, False, checkpoint_file, **other_run).run_evolution()
@@ -0,0 +1,129 @@
+#---------------------------------------------
+# In this file we test that the melodic interval measures (batch_tests.melodic_interval_measures and the
+# one-voice measures of track_tests) give the same values as the first versions, which measured the 
+# intervals note by note with Note.measure. The tracks are the presets and populations made by the generator.
+# Run with: python -m pytest test_interval_kernel.py
+#---------------------------------------------
+
+import pytest
+import numpy as np
+from mingus.containers import Bar, Note, Track
+from EvolutionaryGenerator import EvolutionaryGenerator
+import batch_tests as Batch_Tests
+import track_tests as Track_Tests
+import track_functions as Track_Functions
+
+presets = ['blinka', 'nokia', 'windows', 'brick']
+measures = ['count_tritone_or_seventh_in_two_skips', 'check_melody_intervals', 'check_motion_of_melody']
+
+
+def fixed_tracks(preset):
+    "Returns the preset track and a population of the harmony generator for it, made with a fixed seed."
+    input_melody, key = Track_Functions.init_preset_track(preset)
+    generator = EvolutionaryGenerator(key, nr_bars = len(input_melody), fitness_function = 'harmony', 
+            input_melody = input_melody, seed = 1)
+    generator.population_size = 200
+    return [input_melody] + generator.initialize_population()
+
+
+def note_by_note_tritone_or_seventh_in_two_skips(track):
+    "The first version of count_tritone_or_seventh_in_two_skips."
+    notes = [track[i][j][2] for i in range(len(track.bars)) for j in range(len(track[i]))]
+    nmb = 0
+    for i in range(len(notes) - 2):
+        if notes[i] is None or notes[i + 2] is None:
+            continue
+        interval = Note(notes[i][0]).measure(Note(notes[i + 2][0]))
+        if abs(interval) % 12 in [6, 10, 11]:
+            nmb += 1
+    return nmb
+
+def note_by_note_melody_intervals(track):
+    "The first version of check_melody_intervals."
+    melody = [note[2][0] for note in track.get_notes() if note[2]]
+    if len(melody) <= 1:
+        return 0.0
+    nmb = 0
+    for i in range(len(melody) - 1):
+        interval = Note(melody[i]).measure(Note(melody[i + 1]))
+        if abs(interval) in [0, 1, 2, 3, 4, 5, 7, 12]:
+            nmb += 1
+        elif interval in [8, 9] and i + 2 < len(melody):
+            if Note(melody[i + 1]).measure(Note(melody[i + 2])) < 0:
+                nmb += 1
+    return nmb/(len(melody) - 1)
+
+def note_by_note_motion_of_melody(track):
+    "The first version of check_motion_of_melody."
+    melody = [note[2][0] for note in track.get_notes() if note[2]]
+    if len(melody) <= 1:
+        return 0
+    skip_next_iteration = False
+    last_two_skips_dir = 0
+    good = 0
+    for i in range(len(melody) - 1):
+        if skip_next_iteration:
+            skip_next_iteration = False
+            continue
+        interval = Note(melody[i]).measure(Note(melody[i + 1]))
+        if abs(interval) <= 2:
+            good += 1
+            last_two_skips_dir = 0
+            continue
+        direction = interval/abs(interval)
+        if direction == last_two_skips_dir:
+            continue
+        last_two_skips_dir = 0
+        if i + 2 >= len(melody):
+            good += 1
+            continue
+        skip_next_iteration = True
+        next_interval = Note(melody[i + 1]).measure(Note(melody[i + 2]))
+        if abs(next_interval) <= 2:
+            good += 2
+            continue
+        if direction != next_interval/abs(next_interval):
+            good += 2
+            last_two_skips_dir = 0
+        elif abs(next_interval) < abs(interval):
+            good += 2
+            last_two_skips_dir = direction
+        else:
+            last_two_skips_dir = direction
+    return good/(len(melody) - 1)
+
+note_by_note = {'count_tritone_or_seventh_in_two_skips': note_by_note_tritone_or_seventh_in_two_skips,
+        'check_melody_intervals': note_by_note_melody_intervals,
+        'check_motion_of_melody': note_by_note_motion_of_melody}
+
+
+@pytest.mark.parametrize('preset', presets)
+def test_track_measures_equal_note_by_note(preset):
+    for track in fixed_tracks(preset):
+        statistics = Track_Tests.melody_statistics(track)
+        for measure in measures:
+            assert statistics[measure] == pytest.approx(note_by_note[measure](track), abs = 1e-12), measure
+
+
+@pytest.mark.parametrize('preset', presets)
+def test_batch_kernel_equals_note_by_note(preset):
+    tracks = fixed_tracks(preset)
+    batch_values = Batch_Tests.melodic_interval_measures(Batch_Tests.tracks_to_matrix(tracks))
+    for measure in measures:
+        expected = [note_by_note[measure](track) for track in tracks]
+        np.testing.assert_allclose(batch_values[measure], expected, rtol = 0, atol = 1e-12, err_msg = measure)
+
+
+def test_skips_and_rests():
+    # Skips in the same direction, a sixth up followed by a step down and rests between the notes
+    bar = Bar('C')
+    for name in ['C-4', 'G-4', 'D-5', None, 'A-5', 'G-5', 'B-4', None]:
+        if name is None:
+            bar.place_rest(8)
+        else:
+            bar.place_notes(name, 8)
+    tracks = [Track().add_bar(bar)]
+    
+    batch_values = Batch_Tests.melodic_interval_measures(Batch_Tests.tracks_to_matrix(tracks))
+    for measure in measures:
+        assert batch_values[measure][0] == pytest.approx(note_by_note[measure](tracks[0]), abs = 1e-12), measure
@@ -0,0 +1,44 @@
+#---------------------------------------------
+# In this file we test the stopping rules of EvolutionaryGenerator in island mode (see island_model).
+# Run with: python -m pytest test_island_model.py
+#---------------------------------------------
+
+import pytest
+from EvolutionaryGenerator import EvolutionaryGenerator
+import parallel_fitness as Parallel_Fitness
+import track_functions as Track_Functions
+
+
+@pytest.fixture(autouse = True)
+def shutdown_pool():
+    yield
+    Parallel_Fitness.shutdown_pool()
+
+
+def is_plateau(history, plateau_generations):
+    "The plateau rule of EvolutionaryGenerator.check_stopping on the history."
+    return len(history) > plateau_generations and max(history[-plateau_generations:]) <= history[-plateau_generations - 1]
+
+
+def test_island_mode_does_not_stop_early_on_an_improving_run():
+    # A counter run that still improves in the generations before the first migration
+    input_melody, key = Track_Functions.init_preset_track('nokia')
+    migration_interval = 20
+    plateau_generations = 10
+    generator = EvolutionaryGenerator(key, nr_bars = 2, fitness_function = 'counter', input_melody = input_melody,
+            nr_generations = 60, seed = 1, nr_islands = 2, migration_interval = migration_interval,
+            plateau_generations = plateau_generations)
+    generator.run_evolution()
+    history = generator.fitness_history
+
+    # One best fitness for every generation, not one value repeated over the migration interval
+    assert len(history) % migration_interval == 0
+    assert len(history) > migration_interval
+
+    # The run only stopped at a migration where the history really has a plateau
+    for end in range(migration_interval, len(history), migration_interval):
+        assert not is_plateau(history[:end], plateau_generations)
+    if generator.stop_reason == 'plateau':
+        assert is_plateau(history, plateau_generations)
+    else:
+        assert generator.stop_reason == 'max_generations'
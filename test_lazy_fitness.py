@@ -0,0 +1,55 @@
+#---------------------------------------------
+# In this file we test that the lazy fitness (see lazy_fitness_contenders in EvolutionaryGenerator) selects
+# the same individuals as the fitness where every individual is calculated exactly.
+# Run with: python -m pytest test_lazy_fitness.py
+#---------------------------------------------
+
+import pytest
+import numpy as np
+from EvolutionaryGenerator import EvolutionaryGenerator
+import track_functions as Track_Functions
+
+presets = ['blinka', 'nokia']
+seeds = [0, 1]
+
+
+def make_generator(preset, seed, lazy_fitness_contenders, genome_mode = False, nr_generations = 20):
+    input_melody, key = Track_Functions.init_preset_track(preset)
+    return EvolutionaryGenerator(key, nr_bars = len(input_melody), fitness_function = 'harmony', 
+            input_melody = input_melody, genome_mode = genome_mode, seed = seed, nr_generations = nr_generations,
+            lazy_fitness_contenders = lazy_fitness_contenders)
+
+
+@pytest.mark.parametrize('seed', seeds)
+@pytest.mark.parametrize('preset', presets)
+def test_lazy_tournament_winners_equal_eager(preset, seed):
+    winners = []
+    for lazy_fitness_contenders in [None, 2]:
+        generator = make_generator(preset, seed, lazy_fitness_contenders)
+        generator.start_evolution()
+        fitness_values = generator.calculate_fitness()
+        winners.append(generator.tournament_selection_batch(fitness_values, generator.tournament_selection_parameter,
+                generator.tournament_size, generator.population_size))
+
+    np.testing.assert_array_equal(winners[0], winners[1])
+
+
+@pytest.mark.parametrize('genome_mode', [False, True], ids = ['tracks', 'genomes'])
+@pytest.mark.parametrize('preset', presets)
+def test_lazy_run_equals_eager(preset, genome_mode):
+    results = []
+    for lazy_fitness_contenders in [None, 2]:
+        generator = make_generator(preset, 3, lazy_fitness_contenders, genome_mode)
+        generator.run_evolution()
+        results.append((generator.fitness_history, str(generator.best_individual)))
+
+    # The features are summed in another order for the exact individuals, which can change the last bits
+    np.testing.assert_allclose(results[0][0], results[1][0], rtol = 1e-12)
+    assert results[0][1] == results[1][1]
+
+
+def test_lazy_fitness_needs_the_fitness_cache():
+    input_melody, key = Track_Functions.init_preset_track('blinka')
+    with pytest.raises(ValueError):
+        EvolutionaryGenerator(key, fitness_function = 'harmony', input_melody = input_melody, 
+                lazy_fitness_contenders = 2, fitness_cache_size = 0)
@@ -0,0 +1,105 @@
+#---------------------------------------------
+# In this file we test that the repeating passages measure (track_tests.repeating_passages, found with a trie,
+# and batch_tests.repeating_passages) gives the same values as the first version, which kept every passage 
+# as a string key. The tracks are the presets and populations made by the generator.
+# Run with: python -m pytest test_repeating_passages.py
+#---------------------------------------------
+
+import pytest
+import numpy as np
+from mingus.containers import Bar, Note, Track
+from EvolutionaryGenerator import EvolutionaryGenerator
+import batch_tests as Batch_Tests
+import track_tests as Track_Tests
+import track_functions as Track_Functions
+
+presets = ['blinka', 'nokia', 'windows', 'brick']
+
+
+def fixed_tracks(preset):
+    "Returns the preset track and a population of the harmony generator for it, made with a fixed seed."
+    input_melody, key = Track_Functions.init_preset_track(preset)
+    generator = EvolutionaryGenerator(key, nr_bars = len(input_melody), fitness_function = 'harmony', 
+            input_melody = input_melody, seed = 0)
+    generator.population_size = 200
+    return [input_melody] + generator.initialize_population()
+
+
+def string_key_repeating_passages(track, with_duration = False):
+    "The first version of track_tests.repeating_passages, every passage ending at a note is a string key."
+    passage_repetitions = {}
+    passage_lengths = {}
+    current_passage = []
+    previous_note = None
+    previous_note_length = 0
+    nmb_of_notes = 0.0
+    
+    for note in track.get_notes():
+        nmb_of_notes += 1.0
+        if note[-1] is None:
+            continue
+        elif note[0] == 0.0 or previous_note is None:
+            previous_note = note[-1][0]
+            previous_note_length = note[1]
+            current_passage = []
+            continue
+        
+        diff = Note.measure(previous_note, note[-1][0])
+        if with_duration:
+            current_passage.append([diff, (previous_note_length - note[1])])
+            previous_note_length = note[1]
+        else:
+            current_passage.append(diff)
+        previous_note = note[-1][0]
+        
+        for i in range(len(current_passage)):
+            key = str(current_passage[i:len(current_passage)])
+            if key in passage_repetitions:
+                passage_repetitions[key] += 1.0
+                break
+            passage_repetitions[key] = 0.0
+            passage_lengths[key] = len(current_passage) - i + 1.0
+    
+    average_nm_of_rep = 0.0
+    average_len_of_repetition = 0.0
+    nmb_of_repeating_passages = 0.0
+    percentage_of_repetition = 0.0
+    for key, occurences in passage_repetitions.items():
+        if occurences > 0.0:
+            average_nm_of_rep += occurences
+            percentage_of_repetition += passage_lengths[key]*occurences
+            average_len_of_repetition += passage_lengths[key]
+            nmb_of_repeating_passages += 1.0
+    if nmb_of_repeating_passages > 0.0:
+        average_nm_of_rep = average_nm_of_rep/nmb_of_repeating_passages
+        average_len_of_repetition = average_len_of_repetition/nmb_of_repeating_passages
+        percentage_of_repetition = percentage_of_repetition/nmb_of_notes
+    
+    return (average_nm_of_rep, average_len_of_repetition, percentage_of_repetition)
+
+
+@pytest.mark.parametrize('with_duration', [False, True])
+@pytest.mark.parametrize('preset', presets)
+def test_trie_equals_string_keys(preset, with_duration):
+    for track in fixed_tracks(preset):
+        assert Track_Tests.repeating_passages(track, with_duration) == string_key_repeating_passages(track, with_duration)
+
+
+@pytest.mark.parametrize('preset', presets)
+def test_batch_equals_string_keys(preset):
+    tracks = fixed_tracks(preset)
+    batch_values = Batch_Tests.repeating_passages(Batch_Tests.tracks_to_matrix(tracks))
+    string_key_values = np.array([string_key_repeating_passages(track) for track in tracks]).T
+    
+    np.testing.assert_allclose(np.array(batch_values), string_key_values, rtol = 0, atol = 1e-12)
+
+
+def test_repeated_passage_in_one_bar():
+    # C D E C D E C D: the passage C D E (and its parts) is repeated within the bar
+    bar = Bar('C')
+    for name in ['C', 'D', 'E', 'C', 'D', 'E', 'C', 'D']:
+        bar.place_notes(name, 8)
+    track = Track().add_bar(bar)
+    
+    assert Track_Tests.repeating_passages(track) == string_key_repeating_passages(track)
+    assert Track_Tests.repeating_passages(track)[0] > 0
@@ -0,0 +1,121 @@
+#---------------------------------------------
+# In this file we test that the rhythm measures (batch_tests.rhythm_measures and the one-voice measures of 
+# track_tests) give the same values as the first versions, which went through the notes of a copied track 
+# with float beats. The tracks are the presets and populations made by the generator.
+# Run with: python -m pytest test_rhythm_kernel.py
+#---------------------------------------------
+
+import copy
+import pytest
+import numpy as np
+from mingus.containers import Bar, Track
+from EvolutionaryGenerator import EvolutionaryGenerator
+import batch_tests as Batch_Tests
+import track_tests as Track_Tests
+import track_functions as Track_Functions
+
+presets = ['blinka', 'nokia', 'windows', 'brick']
+durations = [16, 8, 16/3, 4, 8/3, 2, 4/3, 1, 'Strange']
+
+
+def fixed_tracks(preset):
+    "Returns the preset track and a population of the harmony generator for it, made with a fixed seed."
+    input_melody, key = Track_Functions.init_preset_track(preset)
+    generator = EvolutionaryGenerator(key, nr_bars = len(input_melody), fitness_function = 'harmony', 
+            input_melody = input_melody, seed = 2)
+    generator.population_size = 200
+    population = generator.initialize_population()
+    
+    # Some melodies twice, so several melodies share a rhythm
+    return [input_melody] + population + population[:20]
+
+
+def note_by_note_repeating_note_length(track):
+    "The first version of repeating_note_length."
+    note_lengths = {}
+    nmb_of_notes = 0.0
+    for note in copy.deepcopy(track).get_notes():
+        note_lengths[note[1]] = note_lengths.get(note[1], 0.0) + 1.0
+        nmb_of_notes += 1.0
+    return max(occurences/nmb_of_notes for occurences in note_lengths.values())
+
+def note_by_note_note_length_clusters(track):
+    "The first version of average_note_length_clusters."
+    notes = copy.deepcopy(track).get_notes()
+    cluster_length = [1.0]
+    current_note_length = next(notes)[1]
+    for note in notes:
+        if note[1] == current_note_length:
+            cluster_length[-1] += 1.0
+        else:
+            current_note_length = note[1]
+            cluster_length.append(1.0)
+    return sum(cluster_length)/len(cluster_length)
+
+def note_by_note_notes_on_beat(track):
+    "The first version of count_notes_on_beat."
+    placed_on_beat = 0
+    placed_on_half_beat = 0
+    total_nr_of_notes = 0
+    for note_beat, note_duration, note_container in track.get_notes():
+        total_nr_of_notes += 1
+        if (note_beat % (1/note_duration)) == 0:
+            placed_on_beat += 1
+        elif (note_beat % (1/(2*note_duration))) == 0:
+            placed_on_half_beat += 1
+    return (placed_on_beat/total_nr_of_notes, placed_on_half_beat/total_nr_of_notes)
+
+def note_by_note_note_durations(track):
+    "The first version of check_note_durations."
+    duration_counter = {duration: 0 for duration in durations}
+    for note in track.get_notes():
+        if not note[1] in duration_counter:
+            duration_counter['Strange'] += 1
+        else:
+            duration_counter[note[1]] += 1
+    return duration_counter
+
+
+@pytest.mark.parametrize('preset', presets)
+def test_track_measures_equal_note_by_note(preset):
+    for track in fixed_tracks(preset):
+        statistics = Track_Tests.melody_statistics(track)
+        assert statistics['repeating_note_length'] == pytest.approx(note_by_note_repeating_note_length(track), abs = 1e-12)
+        assert statistics['average_note_length_clusters'] == pytest.approx(note_by_note_note_length_clusters(track), abs = 1e-12)
+        assert statistics['count_notes_on_beat'] == pytest.approx(note_by_note_notes_on_beat(track), abs = 1e-12)
+        assert statistics['check_note_durations'] == note_by_note_note_durations(track)
+
+
+@pytest.mark.parametrize('preset', presets)
+def test_batch_kernel_equals_note_by_note(preset):
+    tracks = fixed_tracks(preset)
+    batch_values = Batch_Tests.rhythm_measures(Batch_Tests.tracks_to_matrix(tracks))
+    
+    np.testing.assert_allclose(batch_values['repeating_note_length'], 
+            [note_by_note_repeating_note_length(track) for track in tracks], rtol = 0, atol = 1e-12)
+    np.testing.assert_allclose(batch_values['average_note_length_clusters'], 
+            [note_by_note_note_length_clusters(track) for track in tracks], rtol = 0, atol = 1e-12)
+    np.testing.assert_allclose(np.array(batch_values['count_notes_on_beat']).T, 
+            [note_by_note_notes_on_beat(track) for track in tracks], rtol = 0, atol = 1e-12)
+    for duration in durations:
+        np.testing.assert_array_equal(batch_values['check_note_durations'][duration], 
+                [note_by_note_note_durations(track)[duration] for track in tracks], err_msg = str(duration))
+
+
+def test_triplets_and_dotted_notes():
+    # Lengths that are not powers of two, on and off their own beats
+    bar = Bar('C')
+    for name, duration in [('C', 16/3), ('D', 16/3), ('E', 16/3), (None, 16), ('G', 8/3)]:
+        if name is None:
+            assert bar.place_rest(duration)
+        else:
+            assert bar.place_notes(name, duration)
+    assert bar.is_full()
+    tracks = [Track().add_bar(bar)]
+    
+    batch_values = Batch_Tests.rhythm_measures(Batch_Tests.tracks_to_matrix(tracks))
+    assert batch_values['average_note_length_clusters'][0] == pytest.approx(note_by_note_note_length_clusters(tracks[0]))
+    assert (batch_values['count_notes_on_beat'][0][0], batch_values['count_notes_on_beat'][1][0]) == \
+            pytest.approx(note_by_note_notes_on_beat(tracks[0]))
+    for duration in durations:
+        assert batch_values['check_note_durations'][duration][0] == note_by_note_note_durations(tracks[0])[duration]
@@ -0,0 +1,257 @@
+#---------------------------------------------
+# In this file we test the Score of track_functions: a Track goes to a Score and back unchanged, and the
+# Score versions of transpose, reverse, inverse, shift and create_answer give the same Tracks as the first
+# versions, which changed the notes of a copied Track one by one. The tracks are the presets, random
+# subjects, tracks with chords and rests, and tracks that start in the middle of a bar.
+# Run with: python -m pytest test_score.py
+#---------------------------------------------
+
+import copy
+import pytest
+import numpy as np
+from mingus.containers import Bar, Track, NoteContainer, Note
+import mingus.core.intervals as intervals
+import mingus.core.notes as notes
+import mingus.core.keys as keys
+import track_functions as Track_Functions
+
+presets = [1, 2, 'blinka', 'nokia', 'windows', 'brick', 'panther']
+
+
+def chord_track(key, seed):
+    "Returns a two bar track in the key with chords (also with equal notes), rests, triplets and dotted notes."
+    rng = np.random.default_rng(seed)
+    scale = keys.get_notes(key)
+    track = Track()
+    for durations in [[32, 32, 32, 32, 32/3, 32, 8, 12, 12, 12, 4, 8], [32/3, 32, 16, 8, 4, 32, 32, 32, 32, 8]]:
+        for duration in durations:
+            name = scale[int(rng.integers(7))]
+            if rng.random() < 0.15:
+                track.add_notes(None, duration)
+            elif rng.random() < 0.3:
+                note_container = NoteContainer()
+                note_container.notes = [Note(name, 4), Note(name, 4), Note(scale[int(rng.integers(7))], 3)]
+                track.add_notes(note_container, duration)
+            else:
+                track.add_notes(Note(name, int(rng.integers(3, 6))), duration)
+    return track
+
+
+def score_tracks():
+    "Returns the tracks of the tests, with a name and key."
+    tracks = []
+    for preset in presets:
+        track, key = Track_Functions.init_preset_track(preset)
+        tracks.append((f'preset {preset}', track, key))
+    rng = np.random.default_rng(1)
+    for key in ['C', 'G', 'F', 'Bb', 'A', 'Eb']:
+        track = Track()
+        for iBar in range(2):
+            Track_Functions.add_tracks(track, Track_Functions.init_random_track(key, is_subject = iBar == 0, rng = rng))
+        tracks.append((f'random {key}', track, key))
+    for key in ['C', 'G', 'Eb']:
+        for seed in range(3):
+            tracks.append((f'chords {key} {seed}', chord_track(key, seed), key))
+    for name, track, key in tracks[:7]:
+        tracks.append((f'{name} shifted', track_shift(track, 8), key))
+    return tracks
+
+def bars(track):
+    "Returns the key and notes of every bar, with beats and durations rounded as the first versions add up floats."
+    return [(getattr(bar.key, 'key', bar.key),
+            [(round(beat, 9), round(duration, 9), None if note_container is None else [(note.name, note.octave) for note in note_container])
+            for beat, duration, note_container in bar]) for bar in track]
+
+
+def track_transpose(track, interval, up):
+    "The first version of transpose."
+    transposed_track = copy.deepcopy(track)
+    for note in transposed_track.get_notes():
+        if note[-1] is not None:
+            note[-1].transpose(interval, up)
+    return transposed_track
+
+
+def track_transpose_from_halfnote(track, nmb_of_halfnotes, up = True):
+    "The first version of transpose_from_halfnote."
+    octave_change = 0
+    if nmb_of_halfnotes > 11:
+        octave_change = nmb_of_halfnotes // 12
+        nmb_of_halfnotes = nmb_of_halfnotes - 12*octave_change
+    if nmb_of_halfnotes != 0:
+        transposed_track = track_transpose(track, Track_Functions.get_interval_from_halfnotes(nmb_of_halfnotes), up)
+    else:
+        transposed_track = copy.deepcopy(track)
+    if octave_change != 0:
+        for note in transposed_track.get_notes():
+            if note[-1] is not None:
+                for single_note in note[-1]:
+                    single_note.change_octave(octave_change)
+    return transposed_track
+
+
+def track_transpose_to_relative_minor(track, original_key, harmonic):
+    "The first version of transpose_to_relative_minor (with a copied scale, the first one changed the one of mingus)."
+    transposed_track = copy.deepcopy(track)
+    old_scale = keys.get_notes(original_key)
+    new_scale = list(keys.get_notes(keys.relative_minor(original_key)))
+    if harmonic:
+        new_scale[6] = notes.reduce_accidentals(notes.augment(new_scale[6]))
+    for note in transposed_track.get_notes():
+        if note[-1] is None:
+            continue
+        for single_note in note[-1]:
+            if single_note.name in old_scale:
+                single_note.name = new_scale[old_scale.index(single_note.name)]
+            else:
+                single_note.transpose("b3")
+                single_note.name = notes.reduce_accidentals(single_note.name)
+            if single_note.name[0] == 'A' or single_note.name[0] == 'B':
+                single_note.octave_down()
+    return transposed_track
+
+
+def track_reverse(track, key = 'C'):
+    "The first version of reverse."
+    reversed_track = Track()
+    reversed_track.add_bar(Bar(key))
+    for note in reversed(list(copy.deepcopy(track).get_notes())):
+        reversed_track.add_notes(note[-1], duration = note[1])
+    return reversed_track
+
+
+def track_inverse(track):
+    "The first version of inverse."
+    inversed_track = copy.deepcopy(track)
+    transposed = 0
+    input_notes = inversed_track.get_notes()
+    tmp = next(input_notes)[-1]
+    while tmp is None:
+        tmp = next(input_notes)[-1]
+    start_note = tmp[0]
+    base_note_value = start_note.name[0]
+    if not (base_note_value == "C"):
+        transposed = intervals.measure(start_note.name[0], "C")
+        inversed_track = track_transpose_from_halfnote(inversed_track, transposed)
+        input_notes = inversed_track.get_notes()
+        tmp = next(input_notes)[-1]
+        while tmp is None:
+            tmp = next(input_notes)[-1]
+        start_note = tmp[0]
+        base_note_value = start_note.name[0]
+
+    scale = "CDEFGABCDEFGAB".split(base_note_value)[1]
+    for note in input_notes:
+        if note[-1] is None:
+            continue
+        for single_note in note[-1]:
+            diff = 0
+            if not (single_note.name[0] == base_note_value):
+                diff = scale.index(single_note.name[0]) + 1
+            if single_note.name[0] == "C":
+                single_note.octave = start_note.octave + (start_note.octave - single_note.octave)
+            else:
+                single_note.octave = start_note.octave + (start_note.octave - single_note.octave - 1)
+            if not (single_note.name[0] == base_note_value):
+                single_note.name = scale[-diff]
+            else:
+                single_note.name = base_note_value
+    if not (transposed == 0):
+        inversed_track = track_transpose_from_halfnote(inversed_track, transposed, False)
+    return inversed_track
+
+
+def track_shift(track, pause_duration):
+    "The first version of shift."
+    key = track[0].key
+    shifted_track = Track()
+    bar = Bar(key = key)
+    bar.place_rest(pause_duration)
+    for note in track.get_notes():
+        if not bar.place_notes(note[-1], note[1]):
+            beats_part_1 = 1.0 - bar.current_beat
+            beats_part_2 = 1/note[1] - beats_part_1
+            if beats_part_1 != 0:
+                bar.place_notes(note[-1], 1/beats_part_1)
+            shifted_track.add_bar(copy.deepcopy(bar))
+            bar = Bar(key = key)
+            bar.place_notes(note[-1], 1/beats_part_2)
+    shifted_track.add_bar(copy.deepcopy(bar))
+    return shifted_track
+
+
+def track_create_answer(track, key):
+    "The first version of create_answer."
+    track_copy = copy.deepcopy(track)
+    for i in range(len(track_copy[0])-1):
+        if track_copy[0][i][2] is None:
+            continue
+        note1 = track_copy[0][i][2][0].name
+        if note1 == key:
+            note2 = track_copy[0][i+1][2][0].name
+            if intervals.determine(note1, note2) == 'perfect fifth':
+                track_copy[0][i+1][2][0].transpose('2', False)
+    return track_transpose_from_halfnote(track_copy, 7, up = True)
+
+
+tracks = score_tracks()
+track_ids = [name for name, track, key in tracks]
+
+
+def assert_same(function, track_function, track, *args):
+    "Checks that the Score and the first version give the same track, and leave the input as it was."
+    before = bars(track)
+    assert bars(function(track, *args)) == bars(track_function(track, *args))
+    assert bars(track) == before
+
+
+@pytest.mark.parametrize('name, track, key', tracks, ids = track_ids)
+def test_round_trip(name, track, key):
+    score = Track_Functions.Score.from_track(track)
+    assert bars(score.to_track()) == bars(track)
+    # Chords keep the order and the equal notes of their note containers
+    for bar, new_bar in zip(track, score.to_track()):
+        for (beat, duration, note_container), (new_beat, new_duration, new_note_container) in zip(bar, new_bar):
+            assert beat == new_beat and duration == new_duration
+            if note_container is not None:
+                assert [str(note) for note in note_container] == [str(note) for note in new_note_container]
+
+
+@pytest.mark.parametrize('name, track, key', tracks, ids = track_ids)
+def test_transpose(name, track, key):
+    for interval, up in [(' 3', True), ('b3', False), ('#4', True), (' 7', False)]:
+        assert_same(Track_Functions.transpose, track_transpose, track, interval, up)
+    for nmb_of_halfnotes in [0, 1, 5, 7, 11, 12, 14, 19, 25]:
+        for up in [True, False]:
+            assert_same(Track_Functions.transpose_from_halfnote, track_transpose_from_halfnote, track, nmb_of_halfnotes, up)
+    for harmonic in [False, True]:
+        assert_same(Track_Functions.transpose_to_relative_minor, track_transpose_to_relative_minor, track, key, harmonic)
+
+
+@pytest.mark.parametrize('name, track, key', tracks, ids = track_ids)
+def test_reverse_and_inverse(name, track, key):
+    assert_same(Track_Functions.reverse, track_reverse, track, key)
+    assert_same(Track_Functions.inverse, track_inverse, track)
+
+
+@pytest.mark.parametrize('name, track, key', tracks, ids = track_ids)
+def test_shift(name, track, key):
+    for pause_duration in [1, 2, 4, 16, 32, 32/3]:
+        assert_same(Track_Functions.shift, track_shift, track, pause_duration)
+
+
+@pytest.mark.parametrize('name, track, key', tracks, ids = track_ids)
+def test_create_answer(name, track, key):
+    assert_same(Track_Functions.create_answer, track_create_answer, track, key)
+
+def test_create_answer_of_root_before_rest():
+    # The first version failed on a root note followed by a rest, which is not a leap
+    track = Track()
+    track.add_notes('C-4', 4)
+    track.add_notes(None, 4)
+    track.add_notes('G-4', 4)
+    track.add_notes('C-4', 4)
+    with pytest.raises(TypeError):
+        track_create_answer(track, 'C')
+    answer = Track_Functions.create_answer(track, 'C')
+    assert bars(answer) == bars(track_transpose_from_halfnote(track, 7))
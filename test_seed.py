@@ -0,0 +1,80 @@
+#---------------------------------------------
+# In this file we test that the same seed gives the same result, for the generator, the random tracks
+# and the fugue (see generate_fugue), and that the results do not depend on the global random state.
+# Run with: python -m pytest test_seed.py
+#---------------------------------------------
+
+import contextlib
+import io
+import random
+import pytest
+import numpy as np
+from EvolutionaryGenerator import EvolutionaryGenerator
+import FugueGenerator as Fugue_Generator
+import track_functions as Track_Functions
+
+
+def best_individual(fitness_function, seed, genome_mode = False):
+    "Runs a short evolution and returns its best individual and fitness history."
+    input_melody, key = Track_Functions.init_preset_track('blinka')
+    generator = EvolutionaryGenerator(key, nr_bars = 1, fitness_function = fitness_function, input_melody = input_melody,
+            nr_generations = 10, genome_mode = genome_mode, seed = seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator.run_evolution()
+    return str(generator.best_individual), generator.fitness_history
+
+
+@pytest.mark.parametrize('genome_mode', [False, True], ids = ['tracks', 'genomes'])
+@pytest.mark.parametrize('fitness_function', ['C', 'harmony', 'counter'])
+def test_same_seed_gives_same_best_individual(fitness_function, genome_mode):
+    first = best_individual(fitness_function, 4, genome_mode)
+    
+    # Drawing from the global random generators in between must not change anything
+    random.seed(1)
+    np.random.seed(1)
+    random.random()
+    np.random.random()
+    
+    assert best_individual(fitness_function, 4, genome_mode) == first
+
+
+def test_other_seed_gives_other_run():
+    assert best_individual('harmony', 4) != best_individual('harmony', 5)
+
+
+def test_same_seed_gives_same_random_track():
+    key = 'C'
+    first = Track_Functions.init_random_track(key, rng = 7)
+    second = Track_Functions.init_random_track(key, rng = np.random.default_rng(7))
+    assert str(first) == str(second)
+
+
+def test_same_seed_gives_same_fugue(monkeypatch, tmp_path):
+    # The fugue is written to files in the working directory
+    monkeypatch.chdir(tmp_path)
+    for name in ['harmony_nr_generations', 'modulate_nr_generations', 'counter_nr_generations']:
+        monkeypatch.setattr(Fugue_Generator, name, 3)
+    
+    fugues = []
+    for i in range(2):
+        subject, key = Track_Functions.init_preset_track('blinka')
+        with contextlib.redirect_stdout(io.StringIO()):
+            Fugue_Generator.generate_fugue(key, subject, seed = 11)
+        fugues.append(str(Fugue_Generator.fugue))
+    
+    assert fugues[0] == fugues[1]
+
+
+def test_same_seed_gives_same_longer_fugue(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    for name in ['harmony_nr_generations', 'modulate_nr_generations', 'counter_nr_generations']:
+        monkeypatch.setattr(Fugue_Generator, name, 3)
+    
+    fugues = []
+    for i in range(2):
+        subject, key = Track_Functions.init_preset_track('blinka')
+        with contextlib.redirect_stdout(io.StringIO()):
+            Fugue_Generator.generate_longer_fugue(key, subject, 2, seed = 11)
+        fugues.append(str(Fugue_Generator.fugue))
+    
+    assert fugues[0] == fugues[1]
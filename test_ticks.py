@@ -0,0 +1,75 @@
+#---------------------------------------------
+# In this file we test the integer tick helpers of track_functions: durations and beats go to ticks and
+# back unchanged, and durations or beats that are not on the ticks raise ValueError.
+# Run with: python -m pytest test_ticks.py
+#---------------------------------------------
+
+import pytest
+from mingus.containers import Bar, Track
+from EvolutionaryGenerator import EvolutionaryGenerator
+import track_functions as Track_Functions
+
+# The durations of the generator, and shorter, dotted and triplet notes down to the size of a tick
+durations = [1, 2, 4, 8, 16, 32, 64, 4/3, 8/3, 16/3, 32/3, 3, 6, 12, 24, 48, 96, 192]
+not_on_ticks = [5, 7, 9, 10, 128, 256]
+
+
+@pytest.mark.parametrize('duration', durations)
+def test_duration_round_trip(duration):
+    nr_ticks = Track_Functions.duration_to_ticks(duration)
+    assert nr_ticks*duration == pytest.approx(Track_Functions.TICKS_PER_BAR)
+    assert Track_Functions.ticks_to_duration(nr_ticks) == pytest.approx(duration)
+    
+    # Durations that fit the bar evenly stay int
+    if Track_Functions.TICKS_PER_BAR % nr_ticks == 0:
+        assert isinstance(Track_Functions.ticks_to_duration(nr_ticks), int)
+
+
+def test_beat_round_trip():
+    for nr_ticks in range(Track_Functions.TICKS_PER_BAR + 1):
+        assert Track_Functions.beat_to_ticks(Track_Functions.ticks_to_beat(nr_ticks)) == nr_ticks
+
+
+def test_beats_of_a_bar_are_exact():
+    # The beats mingus gives the notes of a bar of triplets and dotted notes are on the ticks
+    bar = Bar('C')
+    for duration in [16/3, 16/3, 16/3, 16, 8/3]:
+        assert bar.place_notes('C', duration)
+    assert bar.is_full()
+    ticks = [Track_Functions.beat_to_ticks(beat) for beat, duration, notes in bar]
+    lengths = [Track_Functions.duration_to_ticks(duration) for beat, duration, notes in bar]
+    assert ticks == [0] + [sum(lengths[:i]) for i in range(1, len(lengths))]
+    assert sum(lengths) == Track_Functions.TICKS_PER_BAR
+
+
+@pytest.mark.parametrize('duration', not_on_ticks)
+def test_duration_not_on_ticks_raises(duration):
+    with pytest.raises(ValueError):
+        Track_Functions.duration_to_ticks(duration)
+
+
+@pytest.mark.parametrize('beat', [1/5, 1/7, 1/384, 0.3])
+def test_beat_not_on_ticks_raises(beat):
+    with pytest.raises(ValueError):
+        Track_Functions.beat_to_ticks(beat)
+
+
+@pytest.mark.parametrize('duration', not_on_ticks)
+def test_ticks_per_bar_for(duration):
+    ticks_per_bar = Track_Functions.ticks_per_bar_for([4, duration])
+    assert ticks_per_bar % Track_Functions.TICKS_PER_BAR == 0
+    nr_ticks = Track_Functions.duration_to_ticks(duration, ticks_per_bar)
+    assert Track_Functions.ticks_to_duration(nr_ticks, ticks_per_bar) == pytest.approx(duration)
+
+
+def test_input_not_on_ticks_raises():
+    # A bar of quintuplets can not be used as the input of the generator
+    bar = Bar('C')
+    for i in range(5):
+        assert bar.place_notes('C', 5)
+    with pytest.raises(ValueError):
+        Track_Functions.check_on_ticks(Track().add_bar(bar), 'input_melody')
+    with pytest.raises(ValueError):
+        EvolutionaryGenerator('C', nr_bars = 1, fitness_function = 'harmony', input_melody = Track().add_bar(bar))
+    with pytest.raises(ValueError):
+        EvolutionaryGenerator('C', nr_bars = 2, fitness_function = 'modulate', from_bar = bar, to_bar = bar)
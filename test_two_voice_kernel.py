@@ -0,0 +1,68 @@
+#---------------------------------------------
+# In this file we test that the two-voice measures of the slot grid kernel (batch_tests.two_voice_measures)
+# give the same values as check_if_intervals_are_consonant_or_too_big, check_same_pattern and 
+# contrapuntal_motion in track_tests, with the preset as the first voice and populations made by the generator.
+# Run with: python -m pytest test_two_voice_kernel.py
+#---------------------------------------------
+
+import pytest
+import numpy as np
+from mingus.containers import Bar, Track
+from EvolutionaryGenerator import EvolutionaryGenerator
+import batch_tests as Batch_Tests
+import track_tests as Track_Tests
+import track_functions as Track_Functions
+
+presets = ['blinka', 'nokia', 'windows', 'brick']
+motions = ['Similar', 'Parallel', 'Oblique', 'Contrary', 'Rest', 'One']
+
+
+def fixed_tracks(preset):
+    "Returns the preset track and a population of the harmony generator for it, made with a fixed seed."
+    input_melody, key = Track_Functions.init_preset_track(preset)
+    generator = EvolutionaryGenerator(key, nr_bars = len(input_melody), fitness_function = 'harmony', 
+            input_melody = input_melody, seed = 3)
+    generator.population_size = 200
+    return input_melody, generator.initialize_population() + [input_melody]
+
+
+def assert_kernel_equals_track_tests(first_voice, melodies):
+    batch_values = Batch_Tests.two_voice_measures(Batch_Tests.tracks_to_matrix([first_voice]), 
+            Batch_Tests.tracks_to_matrix(melodies))
+    first_voice_grid = Track_Functions.pitch_grid(first_voice)
+    
+    for iMel, melody in enumerate(melodies):
+        consonant, too_big = Track_Tests.check_if_intervals_are_consonant_or_too_big(first_voice, melody)
+        assert batch_values['check_if_intervals_are_consonant_or_too_big'][0][iMel] == pytest.approx(consonant, abs = 1e-12)
+        assert batch_values['check_if_intervals_are_consonant_or_too_big'][1][iMel] == pytest.approx(too_big, abs = 1e-12)
+        assert Track_Tests.check_if_intervals_are_consonant_or_too_big(first_voice, melody, first_voice_grid) == \
+                pytest.approx([consonant, too_big], abs = 1e-12)
+        
+        same_pattern = Track_Tests.check_same_pattern(first_voice, melody)
+        assert batch_values['check_same_pattern'][iMel] == pytest.approx(same_pattern, abs = 1e-12)
+        
+        motion = Track_Tests.contrapuntal_motion(first_voice, melody)
+        assert Track_Tests.contrapuntal_motion(first_voice, melody, first_voice_grid) == pytest.approx(motion, abs = 1e-12)
+        for name in motions:
+            assert batch_values['contrapuntal_motion'][name][iMel] == pytest.approx(motion[name], abs = 1e-12), name
+
+
+@pytest.mark.parametrize('preset', presets)
+def test_grid_kernel_equals_track_tests(preset):
+    first_voice, melodies = fixed_tracks(preset)
+    assert_kernel_equals_track_tests(first_voice, melodies)
+
+
+def test_rests_in_both_voices():
+    # Parallel, similar, contrary and oblique motion, and rests in one or both voices
+    first_bar = Bar('C')
+    second_bar = Bar('C')
+    for first, second in [('C-4', 'E-4'), ('D-4', 'F-4'), ('E-4', 'C-4'), (None, 'C-4'), (None, None), 
+            ('G-4', 'B-3'), ('A-4', 'B-3'), ('C-5', 'E-3')]:
+        for bar, name in [(first_bar, first), (second_bar, second)]:
+            if name is None:
+                bar.place_rest(8)
+            else:
+                bar.place_notes(name, 8)
+    
+    assert_kernel_equals_track_tests(Track().add_bar(first_bar), [Track().add_bar(second_bar)])
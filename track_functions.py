@@ -16,7 +16,9 @@ import mingus.midi.midi_file_in as midi
 import mingus.extra.lilypond as LilyPond
 from Mingus_LilyPond_helper import to_LilyPond_file
 import copy
-import random
+import math
+from fractions import Fraction
+import numpy as np
 
 
 #--------------------------------------------------------------------
@@ -245,97 +247,16 @@ def get_interval_from_halfnotes(nmb_of_halfnotes):
 
 #alt method using nmb_of_halfnotes (an int) as input
 def transpose_from_halfnote(track,nmb_of_halfnotes,up = True):
-    #breakpoint()
-    octave_change = 0
-    if nmb_of_halfnotes > 11:
-        octave_change = nmb_of_halfnotes // 12
-        nmb_of_halfnotes = nmb_of_halfnotes - 12*octave_change
-        
-        
-
-    if nmb_of_halfnotes != 0:
-        #determine interval from nmb_of_steps
-        interval = get_interval_from_halfnotes(nmb_of_halfnotes)
-        
-        # Use transpose_track to get a transposed copy of the track
-        transposed_track = transpose(track, interval, up)
-    else:
-        transposed_track = copy.deepcopy(track)
-        
-    if octave_change != 0:
-        notes_input = transposed_track.get_notes()
-        for note_description in notes_input:
-            note_construction = note_description[-1]
-            if note_construction is None:
-                continue
-            else:
-                for note in note_construction:
-                    note.change_octave(octave_change)
-    
-    # Return transposed track
-    return transposed_track
+    return Score.from_track(track).transpose_from_halfnote(nmb_of_halfnotes, up).to_track()
 
 
 def transpose_to_relative_minor(track, original_key, harmonic):
-    transposed_track = copy.deepcopy(track)
-    if original_key in keys.major_keys:
-        old_scale = keys.get_notes(original_key)
-        new_key = keys.relative_minor(original_key)
-        new_scale = keys.get_notes(new_key)
-        
-        if harmonic:
-            new_scale[6] = notes.augment(new_scale[6])
-            new_scale[6] = notes.reduce_accidentals(new_scale[6])
-        
-        
-        input_notes = transposed_track.get_notes()
-        for bar in input_notes:
-
-            #Check if the nc contained in the bar/"note" is a pause, then do nothing
-            nc = bar[-1]
-            if nc is None:
-                continue
-            
-            #Otherwise
-            else:
-                #For every actual note in the note containers (important if there is a chord)
-                for note in nc:
-                    #old_note = copy.deepcopy(note)
-                    if note.name in old_scale:
-                        index = old_scale.index(note.name)
-                        note.name = new_scale[index]
-
-                    else:
-                        note.transpose("b3")
-                        note.name = notes.reduce_accidentals(note.name)
-                    
-                    # Fix octaves
-                    if note.name[0] == 'A' or note.name[0] == 'B':
-                        note.octave_down()
-
-    else:
-        print("input key is not major key")   
-    return transposed_track
+    return Score.from_track(track).transpose_to_relative_minor(original_key, harmonic).to_track()
 
 
 def transpose(track, interval, up):
     "Return a copy of the track, transposed the given interval up if up = True, otherwise down."
-    
-    # Copy value of reference to aviod problems with overwriting    
-    transposed_track = copy.deepcopy(track)
-    
-    # Calculate transposed track
-    input_notes = transposed_track.get_notes()
-    for note in input_notes:
-        # Try to check if the note container is None. If not, transpose it.
-        # note is technically a note container, might be good to know sometime.
-        if note[-1] is None:
-                continue                    
-        else:
-            note[-1].transpose(interval, up)
-    
-    # Return transposed track
-    return transposed_track
+    return Score.from_track(track).transpose(interval, up).to_track()
 
 
 #--------------------------------------------------------------------
@@ -343,23 +264,7 @@ def transpose(track, interval, up):
 #Returns an copied and reversed track of input track
 #--------------------------------------------------------------------
 def reverse(track, key = 'C'):
-    # Copy value of reference to aviod problems with overwriting    
-    input_track = copy.deepcopy(track)
-    #empty track to write to later
-    reversed_track = Track()
-    b = Bar(key)
-    reversed_track.add_bar(b)
-
-    #create a reversed list of notes from input track
-    input_notes = input_track.get_notes()
-    reversed_notes = reversed(list(input_notes))
-    
-    #Add notes to reversed_track
-    for note in reversed_notes:
-        reversed_track.add_notes(note[-1], duration = note[1])
-
-    # Return reversed track
-    return reversed_track
+    return Score.from_track(track).reverse(key).to_track()
 
 #--------------------------------------------------------------------
 #INVERSE - IN PROGRESS
@@ -367,88 +272,7 @@ def reverse(track, key = 'C'):
 #returns a copied and inverted track of input track. Inverts around the starting note of the input track
 #--------------------------------------------------------------------
 def inverse(track):
-    # Copy value of reference to aviod problems with overwriting 
-    inversed_track = copy.deepcopy(track)
-    transposed = 0
-
-    #"note" generator
-    input_notes = inversed_track.get_notes()
-    #note[-1] is a note container
-    #note[-1][0] is a note
-
-    #take out the first actual note from the "note" generator
-    tmp = next(input_notes)[-1]
-    while(tmp is None):
-        tmp = next(input_notes)[-1]
-    
-    start_note = tmp[0]
-    #save the note name value without axidentals for camparison with the scale string
-    base_note_value = start_note.name[0]
-
-    if not (base_note_value == "C"):
-        transposed = intervals.measure(start_note.name[0].split("-")[0], "C")
-        inversed_track = transpose_from_halfnote(inversed_track, transposed)
-        input_notes = inversed_track.get_notes()
-        tmp = next(input_notes)[-1]
-        while(tmp is None):
-            tmp = next(input_notes)[-1]
-        start_note = tmp[0]
-        base_note_value = start_note.name[0]
-
-
-    #create a string with the ordered notes from the cmaj scale starting from the note after 
-    #the base_note_value until the base_note_value is read again. This is used to calculate the
-    #inversed notes later on
-    Cmaj_scale = "CDEFGABCDEFGAB"
-    scale = Cmaj_scale.split(base_note_value)[1]
-
-    #Its not pretty nut it seems to work
-    #For every bar/"note" we get out of the note generator
-    for bar in input_notes:
-
-        #Check if the nc contained in the bar/"note" is a pause, then do nothing
-        nc = bar[-1]
-        if nc is None:
-             continue
-        
-        #Otherwise
-        else:
-            #For every actual note in the note containers (important if there is a chord)
-            for note in nc:
-
-                #initial value for an offset variable 
-                diff = 0
-
-                #If the note doesn't have the same note name (eg. "C" or "D") as the base note 
-                #We calculate how many steps in the major scale we have to take to find 
-                # A note that corresponds the one we have without accidentals. 
-                # (eg. base_note_val ="C", note = "Eb" we have to take 2 steps to find "E" in Cmaj)
-                if not (note.name[0] == base_note_value):
-                    diff = scale.index(note.name[0]) + 1
-
-                #Calculation of octave, a little messy but works    
-                if base_note_value == "C":
-                    if note.name[0] == "C":
-                        note.octave = start_note.octave + (start_note.octave - note.octave)
-                    else:
-                        note.octave = start_note.octave + (start_note.octave - note.octave - 1)
-
-                else:
-                    print("something went wrong with inverse")
-                
-                #Use offset to assign the note the correct note value in C-maj
-                if not (note.name[0] == base_note_value):
-                    note.name = scale[-diff]
-                else:
-                    note.name = base_note_value
-                
-                #TODO Add the right accidentals to the notes depending on the scale
-           
-    if not (transposed == 0):
-        inversed_track = transpose_from_halfnote(inversed_track, transposed, False)            
-    
-    #return inversed track
-    return inversed_track  
+    return Score.from_track(track).inverse().to_track()
 
 
 #--------------------------------------------------------------------
@@ -463,14 +287,16 @@ def inverse(track):
 #   - the randomization is uniform
 #   - it can't generate any pauses
 #   - it only returns a single bar (useful for subjects but we might want to create longer random tracks ?)
+# The random numbers are drawn from rng, a seed or a numpy.random.Generator.
 # ----------------------------------
-def init_random_track(key, is_subject = True):
+def init_random_track(key, is_subject = True, rng = None):
+    rng = np.random.default_rng(rng)
     notes = keys.get_notes(key)
     bar = Bar(key = key)
     while bar.current_beat < 1 :
         # Randomize pitch and duration of each note. 
-        duration = 2**random.randint(1,3)
-        pitch = notes[random.randint(0,6)] 
+        duration = 2**int(rng.integers(1, 4))
+        pitch = notes[int(rng.integers(0, 7))] 
         
         # If it is intened to be a subject, set the first note to the root.
         if bar.current_beat == 0 and is_subject == True:
@@ -526,60 +352,328 @@ def change_speed(track, factor, key, up=True):
 # Used for canon
 #--------------------------------------------------------------------
 def shift(track, pause_duration):
-    key = track[0].key
-    shifted_track = Track()
-    
-    bar = Bar(key = key)
-    bar.place_rest(pause_duration)
-    input_note_containers = track.get_notes()
-    
-    for note in input_note_containers:
-        placed = bar.place_notes(note[-1], note[1])
-        if not placed:
-            beat_left = 1.0 - bar.current_beat
-            beats_part_1 = beat_left
-            beats_part_2 = 1/note[1] - beats_part_1
-            
-            if beats_part_1 != 0:
-                duration_part_1 = 1/beats_part_1
-                bar.place_notes(note[-1], duration_part_1)
-
-            shifted_track.add_bar(copy.deepcopy(bar))
-            
-            bar = Bar(key = key)
-            
-            duration_part_2 = 1/beats_part_2
-            
-            bar.place_notes(note[-1], duration_part_2)
-
-    shifted_track.add_bar(copy.deepcopy(bar))
-
-    return shifted_track
+    return Score.from_track(track, [pause_duration]).shift(pause_duration).to_track()
 
 
 # ---------------------------------------------
 # CREATE ANSWER
 # This function handles leaps from the root to the fifth, if there are any, in the subject before transposing
 # to the dominant. Such leaps are ok in the subject but should apparantly be avoided in the answer. (This is called tonal answer). 
+# A root note followed by a rest is not a leap.
 # ---------------------------------------------
 def create_answer(track, key):
     # First look for any perfect fifth leaps from the root note in the melody
     # If found, diminsh the fifth to a fourth before transposing
-    
-    track_copy = copy.deepcopy(track)
-    for i in range(len(track_copy[0])-1):
-        if track_copy[0][i][2] is None:
-            continue
-        note1 = track_copy[0][i][2][0].name      # This monstrosity is the note name
-        if note1 == key:                    
-            note2 = track_copy[0][i+1][2][0].name
-            interval = intervals.determine(note1,note2)
-            if interval == 'perfect fifth':
-                track_copy[0][i+1][2][0].transpose('2',False)
+    return Score.from_track(track).create_answer(key).to_track()
 
-    answer = transpose_from_halfnote(track_copy,7,up=True)    
-    return answer
 
+# -------------------------------------------------------
+# TICKS
+# Beats and durations are counted in integer ticks inside the generator, so that positions in a bar 
+# can be compared exactly. A bar (4/4) has TICKS_PER_BAR ticks, which fits notes down to 64ths, dotted notes 
+# down to dotted 32nds, and triplets.
+# The conversions are only done where notes are read from or placed in mingus Bars.
+# Durations that fit the bar evenly are kept as int, as in the rest of the program.
+# -------------------------------------------------------
+TICKS_PER_BAR = 192
+
+def duration_to_ticks(duration, ticks_per_bar = TICKS_PER_BAR):
+    "Translates a mingus duration to a number of ticks. Raises ValueError if it is not a whole number of ticks."
+    nr_ticks = ticks_per_bar/duration
+    if abs(nr_ticks - round(nr_ticks)) > 1e-9 or round(nr_ticks) < 1:
+        raise ValueError(f'Note duration {duration} is not a whole number of ticks.')
+    return int(round(nr_ticks))
+
+def ticks_to_duration(nr_ticks, ticks_per_bar = TICKS_PER_BAR):
+    "Translates a number of ticks to a mingus duration."
+    if ticks_per_bar % nr_ticks == 0:
+        return ticks_per_bar // nr_ticks
+    return ticks_per_bar / nr_ticks
+
+def beat_to_ticks(beat, ticks_per_bar = TICKS_PER_BAR):
+    "Translates a beat (in bars, as mingus counts them) to a number of ticks. Raises ValueError if it is not on a tick."
+    nr_ticks = beat*ticks_per_bar
+    if abs(nr_ticks - round(nr_ticks)) > 1e-9:
+        raise ValueError(f'Beat {beat} is not on a tick.')
+    return int(round(nr_ticks))
+
+def ticks_to_beat(nr_ticks):
+    "Translates a number of ticks to a beat (in bars, as mingus counts them)."
+    return nr_ticks/TICKS_PER_BAR
+
+def ticks_per_bar_for(durations):
+    "Returns the smallest multiple of TICKS_PER_BAR ticks per bar, for which all the durations are whole numbers of ticks."
+    ticks_per_bar = TICKS_PER_BAR
+    for duration in set(durations):
+        ticks_per_bar = math.lcm(ticks_per_bar, Fraction(1/duration).limit_denominator(10**6).denominator)
+    return ticks_per_bar
+
+def check_on_ticks(bars, name):
+    "Raises ValueError if a note in the bars (a Track or a list of Bars), called name in the message, is not on the ticks."
+    for bar in bars:
+        for beat, duration, note_container in bar:
+            try:
+                beat_to_ticks(beat)
+                duration_to_ticks(duration)
+            except ValueError:
+                raise ValueError(f'{name} has a note of duration {duration} on beat {beat}, which is not on the '
+                        f'{TICKS_PER_BAR} ticks of a bar.') from None
+
+# -------------------------------------------------------
+# SCORE
+# A compact form of a track that the transforms above (transpose, reverse, inverse, shift, ...) work on,
+# instead of a deep copy of the mingus objects that is changed note by note.
+# notes is a structured array with one row for every note, and one row for every rest (with an empty name):
+#   start, length   where the note starts in the track and how long it is, in ticks
+#   name, octave    the spelling of the note, as in mingus
+# The notes of a NoteContainer (a chord) are rows with the same start, in the order of the NoteContainer.
+# bar_keys has the key of every bar. A score has ticks_per_bar ticks in a bar, a multiple of TICKS_PER_BAR
+# chosen so that every note of the track (and e.g. the pause of shift) is a whole number of ticks.
+# A name is only changed once for each different name in the track, the rest is done on the arrays.
+# The mingus objects are only made again in to_track.
+# -------------------------------------------------------
+SCORE_DTYPE = np.dtype([('start', np.int64), ('length', np.int64), ('name', 'U8'), ('octave', np.int64)])
+
+def transposed_spelling(name, interval, up):
+    "Returns the name of a note transposed the interval (as Note.transpose does), and the change of octave."
+    new_name = intervals.from_shorthand(name, interval, up)
+    if up:
+        return new_name, int(int(Note(new_name, 0)) < int(Note(name, 0)))
+    return new_name, -int(int(Note(new_name, 0)) > int(Note(name, 0)))
+
+class Score():
+    __slots__ = ('notes', 'bar_keys', 'ticks_per_bar')
+
+    def __init__(self, notes, bar_keys, ticks_per_bar = TICKS_PER_BAR):
+        self.notes = notes
+        self.bar_keys = bar_keys
+        self.ticks_per_bar = ticks_per_bar
+
+    @classmethod
+    def from_track(cls, track, extra_durations = ()):
+        "Returns the Score of a mingus Track, with ticks that also fit the extra durations."
+        ticks_per_bar = ticks_per_bar_for([duration for beat, duration, note_container in track.get_notes()] + list(extra_durations))
+        rows = []
+        for iBar in range(len(track)):
+            bar_tick = iBar*ticks_per_bar
+            for beat, duration, note_container in track[iBar]:
+                start = bar_tick + beat_to_ticks(beat, ticks_per_bar)
+                length = duration_to_ticks(duration, ticks_per_bar)
+                if note_container is None:
+                    rows.append((start, length, '', 0))
+                else:
+                    rows.extend((start, length, note.name, note.octave) for note in note_container)
+        return cls(np.array(rows, dtype = SCORE_DTYPE), [track[iBar].key for iBar in range(len(track))], ticks_per_bar)
+
+    def to_track(self):
+        "Returns the score as a mingus Track."
+        track = Track()
+        notes = self.notes
+        first_rows = self.first_rows()
+        event_bars = notes['start'][first_rows] // self.ticks_per_bar
+        row_ends = np.append(first_rows[1:], len(notes))
+        iEvent = 0
+        for iBar, key in enumerate(self.bar_keys):
+            bar = Bar(key = key)
+            while iEvent < len(first_rows) and event_bars[iEvent] == iBar:
+                rows = notes[first_rows[iEvent]:row_ends[iEvent]]
+                if rows['name'][0] == '':
+                    note_container = None
+                else:
+                    # The notes are set directly, since NoteContainer would sort them and leave out equal ones
+                    note_container = NoteContainer()
+                    note_container.notes = [Note(str(row['name']), int(row['octave'])) for row in rows]
+                bar.place_notes(note_container, ticks_to_duration(int(rows['length'][0]), self.ticks_per_bar))
+                iEvent += 1
+            track.add_bar(bar)
+        return track
+
+    def copy(self):
+        return Score(self.notes.copy(), list(self.bar_keys), self.ticks_per_bar)
+
+    def first_rows(self):
+        "Returns the index of the first row of every note container or rest."
+        starts = self.notes['start']
+        if len(starts) == 0:
+            return np.zeros(0, dtype = np.int64)
+        return np.flatnonzero(np.append(True, starts[1:] != starts[:-1]))
+
+    def event_of_rows(self):
+        "Returns the index of the note container or rest of every row."
+        starts = self.notes['start']
+        if len(starts) == 0:
+            return np.zeros(0, dtype = np.int64)
+        return np.cumsum(np.append(True, starts[1:] != starts[:-1])) - 1
+
+    def respell(self, spelling, rows = None):
+        """Returns a copy where the name of every note (in rows, a bool array, if given) is changed by spelling(name),
+        that returns the new name and the change of octave."""
+        score = self.copy()
+        is_note = score.notes['name'] != ''
+        if rows is not None:
+            is_note &= rows
+        names, name_index = np.unique(score.notes['name'][is_note], return_inverse = True)
+        spellings = [spelling(str(name)) for name in names]
+        new_names = np.array([new_name for new_name, octave_change in spellings], dtype = SCORE_DTYPE['name'])
+        octave_changes = np.array([octave_change for new_name, octave_change in spellings], dtype = np.int64)
+        score.notes['name'][is_note] = new_names[name_index]
+        score.notes['octave'][is_note] += octave_changes[name_index]
+        return score
+
+    def change_octave(self, octave_change, rows = None):
+        "Changes the octave of every note (in rows, if given) in place, as Note.change_octave does."
+        is_note = self.notes['name'] != ''
+        if rows is not None:
+            is_note &= rows
+        self.notes['octave'][is_note] = np.maximum(self.notes['octave'][is_note] + octave_change, 0)
+
+    def transpose(self, interval, up):
+        return self.respell(lambda name: transposed_spelling(name, interval, up))
+
+    def transpose_from_halfnote(self, nmb_of_halfnotes, up = True):
+        octave_change = 0
+        if nmb_of_halfnotes > 11:
+            octave_change = nmb_of_halfnotes // 12
+            nmb_of_halfnotes = nmb_of_halfnotes - 12*octave_change
+
+        if nmb_of_halfnotes != 0:
+            score = self.transpose(get_interval_from_halfnotes(nmb_of_halfnotes), up)
+        else:
+            score = self.copy()
+
+        if octave_change != 0:
+            score.change_octave(octave_change)
+        return score
+
+    def transpose_to_relative_minor(self, original_key, harmonic):
+        if not original_key in keys.major_keys:
+            print("input key is not major key")
+            return self.copy()
+
+        old_scale = keys.get_notes(original_key)
+        new_scale = list(keys.get_notes(keys.relative_minor(original_key)))
+        if harmonic:
+            new_scale[6] = notes.reduce_accidentals(notes.augment(new_scale[6]))
+
+        def spelling(name):
+            # Notes of the scale are moved to the same step of the minor scale, others down a minor third
+            if name in old_scale:
+                return new_scale[old_scale.index(name)], 0
+            new_name, octave_change = transposed_spelling(name, "b3", True)
+            return notes.reduce_accidentals(new_name), octave_change
+
+        score = self.respell(spelling)
+        # Fix octaves
+        score.change_octave(-1, np.isin(score.notes['name'].astype('U1'), ['A', 'B']))
+        return score
+
+    def reverse(self, key = 'C'):
+        # The note containers and rests are placed from the end, as Track.add_notes would place them:
+        # one that does not fit in the rest of a bar is left out
+        first_rows = self.first_rows()
+        event_of_rows = self.event_of_rows()
+        lengths = self.notes['length'][first_rows][::-1]
+        starts = np.zeros(len(lengths), dtype = np.int64)
+        is_placed = np.zeros(len(lengths), dtype = bool)
+        current_tick = 0
+        for iEvent, length in enumerate(lengths.tolist()):
+            if current_tick % self.ticks_per_bar + length <= self.ticks_per_bar:
+                starts[iEvent] = current_tick
+                is_placed[iEvent] = True
+                current_tick += length
+
+        # Rows in the reversed order of their note containers, but in the same order inside them
+        nr_events = len(first_rows)
+        order = np.lexsort((np.arange(len(self.notes)), -event_of_rows))
+        reversed_events = nr_events - 1 - event_of_rows[order]
+        notes = self.notes[order]
+        notes['start'] = starts[reversed_events]
+        notes = notes[is_placed[reversed_events]]
+        nr_bars = max(1, -(-current_tick // self.ticks_per_bar))
+        return Score(notes, [key]*nr_bars, self.ticks_per_bar)
+
+    def inverse(self):
+        is_note = self.notes['name'] != ''
+        if not np.any(is_note):
+            raise ValueError('The track has no notes to invert.')
+        first_note = int(np.argmax(is_note))
+
+        # Invert around C, and transpose back afterwards
+        score = self
+        transposed = 0
+        base_note_value = str(self.notes['name'][first_note])[0]
+        if not (base_note_value == "C"):
+            transposed = intervals.measure(base_note_value, "C")
+            score = self.transpose_from_halfnote(transposed)
+            base_note_value = str(score.notes['name'][first_note])[0]
+        start_octave = int(score.notes['octave'][first_note])
+
+        # The notes after the first one are moved as many steps down the C-major scale from the
+        # base note as they were up, accidentals are left out
+        # TODO Add the right accidentals to the notes depending on the scale
+        scale = "CDEFGABCDEFGAB".split(base_note_value)[1]
+        inverted = score.notes['start'] > score.notes['start'][first_note]
+        if base_note_value == "C":
+            octaves = score.notes['octave']
+            is_base_note = score.notes['name'].astype('U1') == base_note_value
+            inverted_octaves = 2*start_octave - octaves - (~is_base_note).astype(np.int64)
+        else:
+            print("something went wrong with inverse")
+            inverted_octaves = score.notes['octave']
+
+        def spelling(name):
+            if name[0] == base_note_value:
+                return base_note_value, 0
+            return scale[-(scale.index(name[0]) + 1)], 0
+
+        inversed_score = score.respell(spelling, inverted)
+        inverted &= is_note
+        inversed_score.notes['octave'][inverted] = inverted_octaves[inverted]
+
+        if not (transposed == 0):
+            inversed_score = inversed_score.transpose_from_halfnote(transposed, False)
+        return inversed_score
+
+    def shift(self, pause_duration):
+        # The note containers and rests are placed one after the other after the pause. One that
+        # crosses a bar line is split into two at it.
+        ticks_per_bar = self.ticks_per_bar
+        pause_ticks = duration_to_ticks(pause_duration, ticks_per_bar)
+        first_rows = self.first_rows()
+        event_lengths = self.notes['length'][first_rows]
+        event_starts = pause_ticks + np.cumsum(event_lengths) - event_lengths
+        notes = self.notes.copy()
+        notes['start'] = event_starts[self.event_of_rows()]
+
+        ticks_in_bar = notes['start'] % ticks_per_bar
+        is_split = ticks_in_bar + notes['length'] > ticks_per_bar
+        ticks_part_1 = ticks_per_bar - ticks_in_bar[is_split]
+        part_2 = notes[is_split]
+        part_2['start'] += ticks_part_1
+        part_2['length'] -= ticks_part_1
+        notes['length'][is_split] = ticks_part_1
+        # The rows of a note container stay together and in order with a stable sort on the start
+        notes = np.concatenate((notes, part_2))
+        notes = notes[np.argsort(notes['start'], kind = 'stable')]
+
+        rest = np.array([(0, pause_ticks, '', 0)], dtype = SCORE_DTYPE)
+        end_tick = pause_ticks + int(np.sum(event_lengths))
+        nr_bars = max(1, -(-end_tick // ticks_per_bar))
+        return Score(np.concatenate((rest, notes)), [self.bar_keys[0]]*nr_bars, ticks_per_bar)
+
+    def create_answer(self, key):
+        # Perfect fifth leaps from the root note in the first bar are diminished to fourths. A root note
+        # followed by a rest is not a leap and is left as it is.
+        first_rows = self.first_rows()
+        first_rows = first_rows[self.notes['start'][first_rows] < self.ticks_per_bar]
+        names = self.notes['name']
+        fifth_rows = np.zeros(len(self.notes), dtype = bool)
+        for row1, row2 in zip(first_rows[:-1].tolist(), first_rows[1:].tolist()):
+            if names[row1] == key and names[row2] != '':
+                fifth_rows[row2] = intervals.determine(str(names[row1]), str(names[row2])) == 'perfect fifth'
+
+        answer = self.respell(lambda name: transposed_spelling(name, '2', False), fifth_rows)
+        return answer.transpose_from_halfnote(7, up = True)
 
 # -------------------------------------------------------
 # PITCH_AT_GIVEN_BEAT
@@ -606,13 +700,43 @@ def pitch_at_given_beat(track, beat):
     # Return the pitch/pitches
     return bar[index][2]
 
+# -------------------------------------------------------
+# PITCH_GRID
+# Returns a list with the pitch (as an int, None for rests) at every semiquaver of the track, the same pitch 
+# as pitch_at_given_beat returns at that beat. Used to look up the pitch of a track that does not change, 
+# like the input melody of a generator, without searching the bar.
+# Returns None if a note of the track does not start on a semiquaver.
+# -------------------------------------------------------
+def pitch_grid(track):
+    grid = []
+    for bar in track:
+        bar_grid = [None]*16
+        for note_beat, note_duration, note_container in bar:
+            slot = note_beat*16
+            if slot != int(slot):
+                return None
+            pitch = None if note_container is None else int(Note(note_container[0]))
+            for i in range(int(slot), 16):
+                bar_grid[i] = pitch
+        grid += bar_grid
+    return grid
+
 # ---------------------------------------------
 # interval_at_beat: 
 # Returns the interval between two tracks on the given beat
 # Returns a string by default, returns number of halftones if return_int=True, returns None if there is a pause in any voice
+# track1_grid is an optional pitch_grid of track1, used to find the pitch of track1 when return_int=True.
 # Limitation: Does not take octaves into account, example: [C4, G4] = [C4, G5] = fifth.
 # ---------------------------------------------
-def interval_at_beat(track1,track2,beat,return_int = False):
+def interval_at_beat(track1,track2,beat,return_int = False, track1_grid = None):
+    # Look up the pitch of track1 in the grid if the beat is on a semiquaver
+    if return_int and track1_grid is not None and beat*16 == int(beat*16):
+        pitch1 = track1_grid[int(beat*16)]
+        pitch2 = pitch_at_given_beat(track2,beat)
+        if pitch1 is None or pitch2 is None:
+            return None
+        return int(Note(pitch2[0])) - pitch1
+
     pitch1 = pitch_at_given_beat(track1,beat)
     pitch2 = pitch_at_given_beat(track2,beat)
     
@@ -668,9 +792,12 @@ def first_voice_ending(first_track, key):
 #ENDING WIP
 #Creates an ending to the piece
 #Modifies the given tracks
+#The random numbers are drawn from rng, a seed or a numpy.random.Generator
 #-----------------------
 
-def ending(first_track, second_track, subject, key=r""):
+def ending(first_track, second_track, subject, key=r"", rng = None):
+
+    rng = np.random.default_rng(rng)
 
     if not bool(key):
         key = 'C'
@@ -699,15 +826,15 @@ def ending(first_track, second_track, subject, key=r""):
         else:
             chord_notes = chord_notes[0]
 
-    bar.place_notes(chord_notes[random.randint(0, len(chord_notes) - 1)], 2)
+    bar.place_notes(chord_notes[int(rng.integers(0, len(chord_notes)))], 2)
 
     first_track.add_bar(bar)     #Sätt något som passar med andra hälften av subjektet
 
     while second_track[-1].current_beat < 1:       #Placing fitting notes in second to last bar
 
         #print('test1')
-        duration = 2 ** random.randint(1, 3)
-        pitch = cadence[0][random.randint(1, len(cadence[0])-1)]
+        duration = 2 ** int(rng.integers(1, 4))
+        pitch = cadence[0][int(rng.integers(1, len(cadence[0])))]
 
         # If the randomized duration doesn't fit in the bar, make it fit
         if 1 / duration > 1 - second_track[-1].current_beat:
@@ -731,8 +858,8 @@ def ending(first_track, second_track, subject, key=r""):
     while bar.current_beat < 0.5:
         #print('test2')
         # Randomize pitch and duration of each note.
-        duration = 2 ** random.randint(1, 3)
-        pitch = cadence[1][random.randint(1, len(cadence[1])-1)]
+        duration = 2 ** int(rng.integers(1, 4))
+        pitch = cadence[1][int(rng.integers(1, len(cadence[1])))]
 
         # If the randomized duration doesn't fit in the bar, make it fit
         if 1 / duration > 1 - bar.current_beat:
@@ -743,8 +870,8 @@ def ending(first_track, second_track, subject, key=r""):
     while bar.current_beat < 1:
 
         #print('test3')
-        duration = 2 ** random.randint(1, 3)
-        pitch = cadence[2][random.randint(1, len(cadence[2])-1)]
+        duration = 2 ** int(rng.integers(1, 4))
+        pitch = cadence[2][int(rng.integers(1, len(cadence[2])))]
 
         # If the randomized duration doesn't fit in the bar, make it fit
         if 1 / duration > 1 - bar.current_beat:
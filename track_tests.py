@@ -11,7 +11,7 @@ import mingus.core.intervals as intervals
 import mingus.core.notes as notes
 import mingus.core.scales as scales
 import mingus.core.keys as keys
-import copy
+import bisect
 import random
 import track_functions as Track_Functions
 
@@ -30,10 +30,15 @@ check_parallell_and_similar(first_voice, second_voice,
     start_beat, end_beat)                                   Returns dict with nr of beats of track having parallel and similar motion, and nr of beats with both.
 get_all_intervals(first_voice, second_voice, 
     start_beat = 0, end_beat = None)                        Returns a list of two list, where the first contains all interval lengths in halvnote steps and the second list contains the duration of the interval in beats.
+voice_notes(track)                                          Returns a dict with the lengths, pitches and ends in ticks of the notes of a track, read once.
 check_if_intervals_are_consonant_or_too_big(track1, track2) Returns list of the percentage of the tracks that have consonant intervals, and the percentage that have too big intervals.
 check_same_pattern(track1, track2)                          Returns the percentage of the tracks that have the same note duration pattern.
 count_fraction_of_good_melody_intervals(track)              Returns the percentage of good intervals in a melody
 check_note_durations(track)                                 Returns dict with number of notes of different accepted durations and the number of notes having other durations.
+melody_statistics(track, key, exact, with_duration)         Returns a dict with all the one-voice measures of the track.
+sequence_statistics(notes, with_duration)                   Returns a dict with the one-voice measures that depend on notes in other bars.
+bar_statistics(bar, key, input_bar)                         Returns the partial results of one bar for the measures that can be calculated bar by bar.
+combine_bar_statistics(bars_statistics, nr_input_bars, key) Combines the bar statistics of a track into the values of the measures.
 """
 
 #--------------------------------------------------------------------
@@ -42,28 +47,7 @@ check_note_durations(track)                                 Returns dict with nu
 # Ex. If 60% of the notes are quarter notes the function will return 0.6
 #--------------------------------------------------------------------
 def repeating_note_length(track):
-    note_generetor = copy.deepcopy(track).get_notes()
-    #Dictionary that matches note length to nmb of occurences of that note
-    note_lengths = {}
-    #nmb of notes in track
-    nmb_of_notes = 0.0
-
-    for note in note_generetor:
-        #If note length is not in dictionary add it
-        if not(note[1] in note_lengths):
-            note_lengths[note[1]] = 0.0
-        #increment nmb of occurences and total number of notes
-        note_lengths[note[1]] += 1.0
-        nmb_of_notes += 1.0
-    
-    #Calculate the biggest fraction between occurences and nmb of notes in track
-    biggest_fraction = 0.0
-    for lengths,occurences in note_lengths.items():
-        temp = occurences/nmb_of_notes
-        if temp > biggest_fraction:
-            biggest_fraction = copy.deepcopy(temp)
-
-    return biggest_fraction
+    return melody_statistics(track)['repeating_note_length']
 
 #--------------------------------------------------------------------
 # average_numb_of_chords:
@@ -92,28 +76,7 @@ def average_numb_of_chords(track1, track2):
 # returns the average size of same length note clusters (average number of notes in sequence to have the same note duration)
 #--------------------------------------------------------------------
 def average_note_length_clusters(track):
-    note_generetor = copy.deepcopy(track).get_notes()
-    nmb_of_notes = 1.0
-    #List with length of all note-length clusters saved sequentially
-    cluster_length = [1.0]
-    curent_note_length = next(note_generetor)[1]
-
-    for note in note_generetor:
-        #If note is part of current cluster increment value
-        if note[1] == curent_note_length:
-            cluster_length[-1] += 1.0
-        #Otherwise start new cluster
-        else:
-            curent_note_length = note[1]
-            cluster_length.append(1.0)
-    
-    #Add all cluster lengths together
-    added_cluster_legths = 0.0
-    for length in cluster_length:
-        added_cluster_legths += length
-        
-    #return average cluster length
-    return (added_cluster_legths/len(cluster_length))
+    return melody_statistics(track)['average_note_length_clusters']
 
 #--------------------------------------------------------------------
 # repeating_note_pitch:
@@ -121,37 +84,7 @@ def average_note_length_clusters(track):
 # exact is a bool that determines if you differ C-5, C, and Cb or consider them to be the same
 #--------------------------------------------------------------------    
 def repeating_note_pitch(track, exact = False):
-    note_generetor = copy.deepcopy(track).get_notes()
-    #Dictionary that matches note pitch to nmb of occurences of that note
-    note_pitches = {}
-    #nmb of notes in track
-    nmb_of_notes = 0.0
-
-    for note in note_generetor:
-        if note[-1] is None:
-            continue
-        #If note pitch is not in dictionary add it
-        nc = note[-1]
-        for note_pitch in nc:
-            if exact:
-                if not(note_pitch.name in note_pitches):
-                    note_pitches[note_pitch.name] = 0.0
-                note_pitches[note_pitch.name] += 1.0
-            else:
-                if not(note_pitch.name[0] in note_pitches):
-                    note_pitches[note_pitch.name[0]] = 0.0
-                note_pitches[note_pitch.name[0]] += 1.0
-        
-        nmb_of_notes += 1.0
-    
-    #Calculate the biggest fraction between occurences and nmb of notes in track
-    biggest_fraction = 0.0
-    for pitches,occurences in note_pitches.items():
-        temp = occurences/nmb_of_notes
-        if temp > biggest_fraction:
-            biggest_fraction = copy.deepcopy(temp)
-
-    return biggest_fraction
+    return melody_statistics(track, exact = exact)['repeating_note_pitch']
 
 #--------------------------------------------------------------------
 # repeating_passages: (Values may not be exact but are good enough to use in the fitness function)
@@ -161,78 +94,7 @@ def repeating_note_pitch(track, exact = False):
 # Note: Repetitions are measured within a bar, witdh_duration determines if repetition has to have same relative note duration or not.
 #--------------------------------------------------------------------   
 def repeating_passages(track, with_duration = False):
-    note_generetor = copy.deepcopy(track).get_notes()
-    passage_repetitions = {}    #directory of occurences of different passages (nmb of repetitions)
-    passage_lengths = {}        #directory of passage lenths, Cause you can't store two different values to same key in one directory
-    current_passage = []        #List of either just (intervals as ints) or (intervals,relative difference between note durations)
-    previous_note = None        
-    previous_note_length = 0    #Only useful when considering note durations
-    nmb_of_notes = 0.0          #Used to calculate percentage
-    
-    
-    for note in note_generetor:
-        nmb_of_notes += 1.0
-        #If pause go to next note
-        if note[-1] is None:
-            continue
-        
-        #If new bar or first Note, change previous note to be the current note
-        elif(note[0] == 0.0) or (previous_note is None):
-            previous_note = note[-1][0]
-            previous_note_length = note[1]
-            current_passage = []
-            continue
-
-        else:
-            #Calculate inteval as an int (works over octaves)
-            diff = Note.measure(previous_note,note[-1][0])
-
-            #If we have to take duration into consideration calculate relative duration
-            #ev. TODO not precicely what it does but allows repetitions with all same note duration pass
-            if with_duration:
-                current_passage.append([diff, (previous_note_length - note[1])])
-                previous_note_length = note[1]
-            
-            #If we don't consider duration just add interval
-            else:
-                current_passage.append(diff)
-
-            #Set previous note to be current one
-            previous_note = note[-1][0]
-            
-            #starting with the longes possible passage calculate the possible passages from current_passage
-            for i in range(len(current_passage)):
-                tmp = str(current_passage[i:len(current_passage)]) #key
-
-                #if passage is already added increace occurance of passage
-                if tmp in passage_repetitions:
-                    passage_repetitions[tmp] += 1.0
-                    break
-                #If passage isn't added to dictionary, add it
-                else: 
-                    passage_repetitions[tmp] = 0.0
-                    passage_lengths[tmp] = len(current_passage)- i + 1.0
-            
-    average_nm_of_rep = 0.0             #Will get the sum of all occurences
-    average_len_of_repetition = 0.0     #Will get the sum of all passage length of repeated passages
-    nmb_of_repeating_passages = 0.0     #Keeps track of the number of different repeated passages
-    percentage_of_repetition = 0.0      #Will get the sum of all repeated notes
-
-    for keys,occurences in passage_repetitions.items():
-        if occurences > 0.0:
-            average_nm_of_rep += occurences
-            length_of_passage = passage_lengths[keys]
-            percentage_of_repetition += (length_of_passage*occurences)
-            average_len_of_repetition += length_of_passage
-            nmb_of_repeating_passages += 1.0
-
-    #Calculate final return data
-    if nmb_of_repeating_passages > 0.0:
-        average_nm_of_rep = average_nm_of_rep/nmb_of_repeating_passages
-        average_len_of_repetition = average_len_of_repetition/nmb_of_repeating_passages
-        percentage_of_repetition = percentage_of_repetition/nmb_of_notes #TODO percentage in faulty
-
-    return (average_nm_of_rep,average_len_of_repetition,percentage_of_repetition)
+    return melody_statistics(track, with_duration = with_duration)['repeating_passages']
 
 #--------------------------------------------------------------------
 # count_notes_on_beat:
@@ -242,22 +104,7 @@ def repeating_passages(track, with_duration = False):
 # of notes in the middle of beats, normalized over total number of notes.
 #--------------------------------------------------------------------   
 def count_notes_on_beat(track):
-    placed_on_beat = 0
-    placed_on_half_beat = 0
-    total_nr_of_notes = 0
-
-    note_containers = track.get_notes()
-    for note in note_containers:
-        total_nr_of_notes += 1
-        # Get the note from the container
-        note_duration = note[1]
-        note_beat = note[0]
-        if (note_beat % (1/note_duration)) == 0:
-            placed_on_beat += 1
-        elif (note_beat % (1/(2*note_duration))) == 0:
-            placed_on_half_beat += 1
-    
-    return (placed_on_beat/total_nr_of_notes, placed_on_half_beat/total_nr_of_notes)
+    return melody_statistics(track)['count_notes_on_beat']
 
 #--------------------------------------------------------------------
 # count_notes_in_scale:
@@ -265,20 +112,7 @@ def count_notes_on_beat(track):
 # Returns the number of notes in scale normalized over total number of notes.
 #--------------------------------------------------------------------   
 def count_notes_in_scale(track, key):
-    total_nr_of_notes = 0
-    notes_in_scale = 0
-    scale_notes = keys.get_notes(key)
-    notes = track.get_notes()
-    for note_container in notes:
-        if note_container[-1] is None:
-            total_nr_of_notes += 1
-            continue
-        note = note_container[-1][0]
-        total_nr_of_notes += 1
-        if note.name in scale_notes:
-            notes_in_scale += 1
-    
-    return notes_in_scale/total_nr_of_notes
+    return melody_statistics(track, key)['count_notes_in_scale']
 
 # ------------------------------------------
 # count_tritone_or_seventh_in_two_skips(track): 
@@ -289,23 +123,7 @@ def count_notes_in_scale(track, key):
 # -------------------------------------------
 def count_tritone_or_seventh_in_two_skips(track, return_index = False):
     "Returns the number of tritones or sevenths in two skips in a one-voice track."
-    
-    unwanted_intervals = [6,10,11]  # tritone, minor and major seventh 
-    
-    # list of all notes
-    notes = [track[i][j][2] for i in range(len(track.bars)) for j in range(len(track[i]))]
-
-    # count nmb of unwanted intervals
-    nmb = 0
-    for i in range(len(notes)-2):
-        note1 = notes[i]
-        note2 = notes[i+2]
-        if note1 is None or note2 is None:  # make sure notes aren't pauses
-            continue
-        interval = Note(note1[0]).measure(Note(note2[0]))   #returns the nmb. of halftones between the notes
-        if abs(interval)%12 in unwanted_intervals:
-                nmb += 1
-    return nmb
+    return melody_statistics(track)['count_tritone_or_seventh_in_two_skips']
 
 # ---------------------------------------------
 # contrapuntal_motion: 
@@ -313,20 +131,20 @@ def count_tritone_or_seventh_in_two_skips(track, return_index = False):
 # Returns a dictionary with percentage that the motion is used.
 # The dictionary has the keys: 'Similar', 'Parallel', 'Oblique', 'Contrary', 'Rest' and 'One'.
 # 'One' is for when only one voice have rest. 'Rest' is if both are resting.
+# first_voice_grid is an optional Track_Functions.pitch_grid of the first voice, used to look up its pitches.
+# Both voices are read once (see voice_notes), and the parts with the same motion are measured from those notes.
+# All beats are counted in ticks (see Track_Functions.TICKS_PER_BAR).
 # ---------------------------------------------
-def contrapuntal_motion(first_voice, second_voice):
+def contrapuntal_motion(first_voice, second_voice, first_voice_grid = None):
     if len(first_voice) == 0:
-        print('Error occured')
-        breakpoint()
+        raise ValueError('The first voice is empty.')
 
-    beat_first = 0
-    beat_second = 0
-    
-    motion_first = motion_of_track(first_voice)
-    motion_second = motion_of_track(second_voice)
+    first_notes = voice_notes(first_voice)
+    second_notes = voice_notes(second_voice)
+    motion_first = motion_of_voice(first_notes)
+    motion_second = motion_of_voice(second_notes)
     
     # Check combo of motions
-    contrapuntal_motion = []
     parallel_motion = 0
     similar_motion = 0
     rest_motion = 0
@@ -334,85 +152,120 @@ def contrapuntal_motion(first_voice, second_voice):
     oblique_motion = 0
     contrary_motion = 0
     
-    extra_beats = 0
+    extra_ticks = 0
     
-    previous_beat = 0   # Start of interval
-    current_beat = min(motion_first[0][1], motion_second[0][1])     # End of interval
-    total_nr_beats = len(first_voice)
+    previous_tick = 0   # Start of interval
+    current_tick = min(motion_first[0][1], motion_second[0][1])     # End of interval
+    total_nr_ticks = len(first_voice)*Track_Functions.TICKS_PER_BAR
     ind_first = 0
     ind_second = 0
-    while previous_beat < total_nr_beats:
-        if current_beat <= previous_beat:
-            print(f"previous_beat: {previous_beat}")
-            print(f"current_beat: {current_beat}")
-            breakpoint()
+    while previous_tick < total_nr_ticks:
+        if current_tick <= previous_tick:
+            raise ValueError(f'The motions do not move forward, from tick {previous_tick} to {current_tick}.')
         # Check if same motion in both tracks
         if motion_first[ind_first][-1] == motion_second[ind_second][-1]:
             # Check if both are resting
             if motion_first[ind_first][-1] == 'Rest':
-                current_motion = 'Rest'
-                rest_motion += current_beat - previous_beat
+                rest_motion += current_tick - previous_tick
             else:
                 # Check if parallel or similar
-                parallel_and_similar = check_parallell_and_similar(first_voice, second_voice, previous_beat, current_beat)
-                
-                current_motion = 'Parallel and similar'
+                parallel_and_similar = voice_parallel_and_similar(first_notes, second_notes, previous_tick, current_tick, first_voice_grid)
                 parallel_motion += parallel_and_similar['Parallel']
                 similar_motion += parallel_and_similar['Similar']
-                try:
-                    extra_beats += parallel_and_similar['Extra beats']
-                except:
-                    #breakpoint()
-                    print('Error!')
-                    breakpoint()
+                extra_ticks += parallel_and_similar['Extra ticks']
         
         # Check if one track is 'Same', then oblique
         elif motion_first[ind_first][-1] == 'Same' or motion_second[ind_second][-1] == 'Same':
-            current_motion = 'Oblique'
-            oblique_motion += current_beat - previous_beat
+            oblique_motion += current_tick - previous_tick
         # Check if one track is resting, then 'One'
         elif motion_first[ind_first][-1] == 'Rest' or motion_second[ind_second][-1] == 'Rest':
-            current_motion = 'One'
-            one_motion += current_beat - previous_beat
+            one_motion += current_tick - previous_tick
         # Otherwise motion is in opposite directions and contrary
         else:
-            current_motion = 'Contrary'
-            contrary_motion += current_beat - previous_beat
-        
-        # Add motion to list
-        contrapuntal_motion.append([previous_beat, current_beat-previous_beat, current_motion])
+            contrary_motion += current_tick - previous_tick
 
         # If reach the end of track, break
-        if current_beat == total_nr_beats:
+        if current_tick == total_nr_ticks:
             break
         
-        # Update beats and indices
-        previous_beat = current_beat # Updating previous_beat
-        old_ind_first = ind_first
-        if motion_first[ind_first][0] + motion_first[ind_first][1] == current_beat:
+        # Update ticks and indices
+        if motion_first[ind_first][0] + motion_first[ind_first][1] == current_tick:
             # Take next part of motion_first
             ind_first += 1 
             
-        if motion_second[ind_second][0] + motion_second[ind_second][1] == current_beat:
+        if motion_second[ind_second][0] + motion_second[ind_second][1] == current_tick:
             # Take next part of motion_second
             ind_second += 1
         
-        # Update previous beat to be the start of the motion that starts last.
-        previous_beat = max(motion_first[ind_first][0], motion_second[ind_second][0])
+        if ind_first == len(motion_first) or ind_second == len(motion_second):
+            raise ValueError(f'The motion of a voice ends at tick {current_tick}, before the end of the track.')
 
-        # Double the beats that are in two separate parts
-        extra_beats += current_beat-previous_beat
+        # Update previous tick to be the start of the motion that starts last.
+        previous_tick = max(motion_first[ind_first][0], motion_second[ind_second][0])
 
-        # Update current_beat to be the end of the note ending first of the two current notes
-        current_beat = min(motion_first[ind_first][0] + motion_first[ind_first][1], motion_second[ind_second][0] + motion_second[ind_second][1])
+        # Double the ticks that are in two separate parts
+        extra_ticks += current_tick-previous_tick
+
+        # Update current_tick to be the end of the note ending first of the two current notes
+        current_tick = min(motion_first[ind_first][0] + motion_first[ind_first][1], motion_second[ind_second][0] + motion_second[ind_second][1])
 
         
-    contrapuntal_motion_values = {'Contrary': contrary_motion/(total_nr_beats + extra_beats), 'Parallel': parallel_motion/(total_nr_beats + extra_beats), 
-                    'Oblique': oblique_motion/(total_nr_beats + extra_beats), 'Similar': similar_motion/(total_nr_beats + extra_beats), 
-                    'Rest': rest_motion/(total_nr_beats + extra_beats), 'One': one_motion/(total_nr_beats + extra_beats)}
+    contrapuntal_motion_values = {'Contrary': contrary_motion/(total_nr_ticks + extra_ticks), 'Parallel': parallel_motion/(total_nr_ticks + extra_ticks), 
+                    'Oblique': oblique_motion/(total_nr_ticks + extra_ticks), 'Similar': similar_motion/(total_nr_ticks + extra_ticks), 
+                    'Rest': rest_motion/(total_nr_ticks + extra_ticks), 'One': one_motion/(total_nr_ticks + extra_ticks)}
     
     return contrapuntal_motion_values
 
+# ---------------------------------------------
+# voice_notes:
+# Help function that reads the notes of a track once, for contrapuntal_motion and the functions it uses.
+# Returns a dict with the length in ticks, the integer pitch (None for rests) and the end tick (counted from the 
+# start of the track) of every note, and for every bar the start ticks and pitches of its notes.
+# ---------------------------------------------
+def voice_notes(track):
+    lengths = []
+    pitches = []
+    ends = []
+    bar_starts = []
+    bar_pitches = []
+    end = 0
+    for bar in track:
+        bar_starts.append([])
+        bar_pitches.append([])
+        for note_beat, note_duration, note_container in bar:
+            pitch = None if note_container is None else int(note_container[0])
+            length = Track_Functions.duration_to_ticks(note_duration)
+            end += length
+            lengths.append(length)
+            pitches.append(pitch)
+            ends.append(end)
+            bar_starts[-1].append(Track_Functions.beat_to_ticks(note_beat))
+            bar_pitches[-1].append(pitch)
+
+    return {'Lengths': lengths, 'Pitches': pitches, 'Ends': ends, 'Bar starts': bar_starts, 
+            'Bar pitches': bar_pitches, 'Nr bars': len(track)}
+
+def voice_pitch_at_tick(voice, tick):
+    "Returns the integer pitch of the voice (from voice_notes) at the tick, as pitch_at_given_beat finds it."
+    bar_no = tick // Track_Functions.TICKS_PER_BAR
+    bar_starts = voice['Bar starts'][bar_no]
+    index = bisect.bisect_right(bar_starts, tick % Track_Functions.TICKS_PER_BAR) - 1
+    if index < 0:
+        raise ValueError(f'No note at tick {tick}.')
+    return voice['Bar pitches'][bar_no][index]
+
+def voice_interval_at_tick(first_voice, second_voice, tick, first_voice_grid = None):
+    "Returns the interval in halfnotes between two voices (from voice_notes) at the tick, as interval_at_beat does."
+    ticks_per_slot = Track_Functions.TICKS_PER_BAR//16
+    if first_voice_grid is not None and tick % ticks_per_slot == 0:
+        pitch1 = first_voice_grid[tick // ticks_per_slot]
+    else:
+        pitch1 = voice_pitch_at_tick(first_voice, tick)
+    pitch2 = voice_pitch_at_tick(second_voice, tick)
+    if pitch1 is None or pitch2 is None:
+        return None
+    return pitch2 - pitch1
+
 # ---------------------------------------------
 # track_motion: 
 # Help function that gets a track as input and calculates how the motion is for different parts.
@@ -420,106 +273,80 @@ def contrapuntal_motion(first_voice, second_voice):
 # motion, length being the length of the motion in beats, and type is either 'Up', 'Down', 'Same' or 'Rest'.
 # ---------------------------------------------
 def motion_of_track(track):
+    return [[Track_Functions.ticks_to_beat(start), Track_Functions.ticks_to_beat(length), motion] 
+            for start, length, motion in motion_of_voice(voice_notes(track))]
 
-    # Initialize lists to contain tuples of which beats contain which motion
-    motion = []
-
+# motion_of_track for a voice from voice_notes, with start and length in ticks
+def motion_of_voice(voice):
 
-    # Loop over all notes in first voice to decide motion
-    notes = track.get_notes()
+    # Initialize lists to contain tuples of which ticks contain which motion
+    motion = []
 
-    previous_note = None
+    previous_pitch = None
+    previous_length = None
     current_passage = 0
     current_start = 0
     current_motion = None
-    for note in notes:  
+    for note_length, pitch in zip(voice['Lengths'], voice['Pitches']):
 
         # If first note in track
-        if previous_note is None:
-            # If not a rest, add to first part but set which motion later
-            if not note[-1] is None:
-                previous_note = note
-                current_passage = 1/note[1]
-                continue
-            # If a rest, start a rest motion
-            else:
-                previous_note = note
-                current_passage = 1/note[1]
+        if previous_length is None:
+            previous_pitch = pitch
+            previous_length = note_length
+            current_passage = note_length
+            # If a rest, start a rest motion, otherwise set which motion later
+            if pitch is None:
                 current_motion = 'Rest'
-                continue
+            continue
           
         # If the note is a rest, end last motion and start a rest motion
-        if note[-1] is None:
+        if pitch is None:
             if current_motion != 'Rest':
                 # Add the previous motion to the list. If None, set it to Same.
                 if current_motion is None:
                     current_motion = 'Same'
                 motion.append([current_start, current_passage, current_motion])                
                 
-                # Start new upward motion
+                # Start new rest motion
                 current_start += current_passage
-                current_passage = 1/note[1]
+                current_passage = note_length
                 current_motion = 'Rest'
             else:
-                current_passage += 1/note[1]
+                current_passage += note_length
         # If last note was a rest, end rest motion and start new motion
         elif current_motion == 'Rest':
                 motion.append([current_start, current_passage, current_motion])
                 
                 # Start new unknown motion
                 current_start += current_passage
-                current_passage = 1/note[1]
+                current_passage = note_length
                 current_motion = None
         
-        # Upward motion between this and previous note
-        elif note[-1][0] > previous_note[-1][0]:
-            if current_motion == 'Up':
-                current_passage += 1/note[1]                
-            elif current_motion is None:
-                current_motion = 'Up'
-                current_passage += 1/note[1]                
-            else:
-                # Add the previous motion to the list
-                motion.append([current_start, current_passage, current_motion])                
-                
-                # Start new upward motion
-                current_start += current_passage - 1/previous_note[1]
-                current_passage = 1/previous_note[1] + 1/note[1]
-                current_motion = 'Up'
-        
-        # Downward motion between this and previous note
-        elif note[-1][0] < previous_note[-1][0]:
-            if current_motion == 'Down':
-                current_passage += 1/note[1]                
-            elif current_motion is None:
-                current_motion = 'Down'
-                current_passage += 1/note[1]                
+        else:
+            # Upward, downward or no motion between this and previous note
+            if pitch > previous_pitch:
+                note_motion = 'Up'
+            elif pitch < previous_pitch:
+                note_motion = 'Down'
             else:
-                # Add the previous motion to the list
-                motion.append([current_start, current_passage, current_motion])                
-                
-                # Start new upward motion
-                current_start += current_passage - 1/previous_note[1]
-                current_passage = 1/previous_note[1] + 1/note[1]
-                current_motion = 'Down'
-        
-        # No motion between this and previous note
-        elif note[-1][0] == previous_note[-1][0]:
-            if current_motion == 'Same':
-                current_passage += 1/note[1]                
+                note_motion = 'Same'
+            
+            if current_motion == note_motion:
+                current_passage += note_length
             elif current_motion is None:
-                current_motion = 'Same'
-                current_passage += 1/note[1]                
+                current_motion = note_motion
+                current_passage += note_length
             else:
                 # Add the previous motion to the list
                 motion.append([current_start, current_passage, current_motion])                
                 
-                # Start new upward motion
-                current_start += current_passage - 1/previous_note[1]
-                current_passage = 1/previous_note[1] + 1/note[1]
-                current_motion = 'Same'
+                # Start new motion, from the previous note
+                current_start += current_passage - previous_length
+                current_passage = previous_length + note_length
+                current_motion = note_motion
         
-        previous_note = note
+        previous_pitch = pitch
+        previous_length = note_length
     
     # Add the previous motion to the list
     motion.append([current_start, current_passage, current_motion])                
@@ -530,17 +357,25 @@ def motion_of_track(track):
 # Help function that takes two tracks and a time span as input, and calculates how much of this part has similar and how much has parallel motion.
 # Return a dictionary with keys 'Parallel' and 'Similar' with their respective number of beats having that motion. Also has a key 'Extra beats' with the number of overlapping beats.
 # ---------------------------------------------
-def check_parallell_and_similar(first_voice, second_voice, start_beat, end_beat):
+def check_parallell_and_similar(first_voice, second_voice, start_beat, end_beat, first_voice_grid = None):
     
     if len(first_voice) == 0:
-        print('Error occured')
-        breakpoint()
+        raise ValueError('The first voice is empty.')
+
+    parallel_and_similar = voice_parallel_and_similar(voice_notes(first_voice), voice_notes(second_voice), Track_Functions.beat_to_ticks(start_beat), 
+                                                      Track_Functions.beat_to_ticks(end_beat), first_voice_grid)
+    return {'Parallel': Track_Functions.ticks_to_beat(parallel_and_similar['Parallel']), 'Similar': Track_Functions.ticks_to_beat(parallel_and_similar['Similar']), 
+            'Extra beats': Track_Functions.ticks_to_beat(parallel_and_similar['Extra ticks'])}
 
-    # Get all intervals in this part, including the interval before the one at start_beat.
-    intervals, interval_lengths = get_all_intervals(first_voice, second_voice, start_beat, end_beat)
+# check_parallell_and_similar for voices from voice_notes, in ticks. Returns the number of ticks with each motion,
+# and the number of overlapping ticks as 'Extra ticks'.
+def voice_parallel_and_similar(first_voice, second_voice, start_tick, end_tick, first_voice_grid = None):
+
+    # Get all intervals in this part, including the interval before the one at start_tick.
+    intervals, interval_lengths = voice_intervals(first_voice, second_voice, start_tick, end_tick, first_voice_grid)
     
     if len(intervals) == 1:
-        return {'Parallel': 0, 'Similar': 0, 'Extra beats': 0}
+        return {'Parallel': 0, 'Similar': 0, 'Extra ticks': 0}
     
     third_intervals = [3, 4]
     second_intervals = [1, 2]
@@ -551,7 +386,7 @@ def check_parallell_and_similar(first_voice, second_voice, start_beat, end_beat)
     previous_interval = intervals[0]
     previous_motion = None
     current_pass = 0
-    extra_beats = 0
+    extra_ticks = 0
     for i in range(1,len(intervals)):
         # Check if minor of major third
         third_repeated = False
@@ -576,7 +411,7 @@ def check_parallell_and_similar(first_voice, second_voice, start_beat, end_beat)
             else:
                 if previous_motion == 'similar':
                     similar_time += current_pass
-                    extra_beats += interval_lengths[i-1]
+                    extra_ticks += interval_lengths[i-1]
                 previous_motion = 'parallel'
                 current_pass = interval_lengths[i-1] + interval_lengths[i]
         else:
@@ -585,7 +420,7 @@ def check_parallell_and_similar(first_voice, second_voice, start_beat, end_beat)
             else:
                 if previous_motion == 'parallel':
                     parallel_time += current_pass
-                    extra_beats += interval_lengths[i-1]
+                    extra_ticks += interval_lengths[i-1]
                 previous_motion = 'similar'
                 current_pass = interval_lengths[i-1] + interval_lengths[i]
     if previous_motion == 'similar':
@@ -593,107 +428,121 @@ def check_parallell_and_similar(first_voice, second_voice, start_beat, end_beat)
     else:
         parallel_time += current_pass
 
-    if similar_time + parallel_time == 0:
-        print(f"similar time: {similar_time}")
-        print(f"parallel time: {parallel_time}")
-        breakpoint()
-    return {'Parallel': parallel_time, 'Similar': similar_time, 'Extra beats': extra_beats}
+    return {'Parallel': parallel_time, 'Similar': similar_time, 'Extra ticks': extra_ticks}
     
 # ---------------------------------------------
 # get_all_intervals: 
 # Help function that takes two tracks and a time span as input, and finds all intervals in this part.
 # Returns two lists. The first one with all intervals between the two tracks in halfnotes. 
 # The second one with the length of all these intervals.
+# first_voice_grid is an optional Track_Functions.pitch_grid of the first voice, used to look up its pitches.
 # ---------------------------------------------
-def get_all_intervals(first_voice, second_voice, start_beat = 0, end_beat = None):
+def get_all_intervals(first_voice, second_voice, start_beat = 0, end_beat = None, first_voice_grid = None):
     """Returns two lists. The first one with all intervals between the two tracks in halfnotes. 
     The second one with the length of all these intervals.
     """
 
     if len(first_voice) == 0:
-        print('Error occured')
-        breakpoint()
+        raise ValueError('The first voice is empty.')
 
-    if end_beat is None:
-        end_beat = min(len(first_voice), len(second_voice))
-    
-    
-    # Get a generator for all notes in each track and skip to the notes at start_beat
-    notes_first = first_voice.get_notes()
-    notes_second = second_voice.get_notes()
-    #breakpoint()
-    first_beat = 0
-    for note_first in notes_first:
-        # If end of note is before beat, take the next note
-        if first_beat + 1/note_first[1] <= start_beat:
-            first_beat += 1/note_first[1]
-            continue
-        else:
-            break
+    end_tick = None if end_beat is None else Track_Functions.beat_to_ticks(end_beat)
+    intervals, interval_lengths = voice_intervals(voice_notes(first_voice), voice_notes(second_voice), Track_Functions.beat_to_ticks(start_beat), 
+                                                  end_tick, first_voice_grid)
+    return [intervals, [Track_Functions.ticks_to_beat(length) for length in interval_lengths]]
 
-    second_beat = 0
-    for note_second in notes_second:
-        # If end of note is before beat, take the next note
-        if second_beat + 1/note_second[1] <= start_beat:
-            second_beat += 1/note_second[1]
-            continue
-        else:
-            break
+# get_all_intervals for voices from voice_notes, in ticks. The notes at start_tick are found by bisection,
+# then the notes of both voices are merged up to end_tick.
+def voice_intervals(first_voice, second_voice, start_tick = 0, end_tick = None, first_voice_grid = None):
+
+    if end_tick is None:
+        end_tick = min(first_voice['Nr bars'], second_voice['Nr bars'])*Track_Functions.TICKS_PER_BAR
+    
+    # Skip to the notes at start_tick, that is the first notes that end after start_tick
+    lengths_first = first_voice['Lengths']
+    lengths_second = second_voice['Lengths']
+    ind_first, first_tick = note_at_tick(first_voice, start_tick)
+    ind_second, second_tick = note_at_tick(second_voice, start_tick)
     
     # Find all intervals
     intervals = []
     interval_lengths = []
-    beat = start_beat
-    ind_first = 0
-    ind_second = 0
-    while beat < end_beat:
+    tick = start_tick
+    while tick < end_tick:
         # Find interval
-        current_interval = Track_Functions.interval_at_beat(first_voice, second_voice, beat, return_int=True)
+        current_interval = voice_interval_at_tick(first_voice, second_voice, tick, first_voice_grid)
         
         # Save the interval
         intervals.append(current_interval)
 
-        # Save beat as previous beat
-        previous_beat = beat
+        # Save tick as previous tick
+        previous_tick = tick
         
-        old_note_first = note_first
-        old_first_beat = first_beat
-        # Update beat and current notes
-        if first_beat + 1/note_first[1] <= second_beat + 1/note_second[1]:
-            first_beat += 1/note_first[1]
-            beat = first_beat
-
-            if first_beat == end_beat:
-                interval_lengths.append(first_beat-previous_beat)
+        old_ind_first = ind_first
+        old_first_tick = first_tick
+        # Update tick and current notes
+        if first_tick + lengths_first[ind_first] <= second_tick + lengths_second[ind_second]:
+            first_tick += lengths_first[ind_first]
+            tick = first_tick
+
+            if first_tick == end_tick:
+                interval_lengths.append(first_tick-previous_tick)
                 break
-            try:
-                note_first = next(notes_first)
-            except:
-                print('Error now!')
-                breakpoint()
+            ind_first += 1
+            if ind_first == len(lengths_first):
+                raise ValueError(f'The first voice ends before tick {end_tick}.')
             
-        if old_first_beat + 1/old_note_first[1] >= second_beat + 1/note_second[1]:
-            second_beat += 1/note_second[1]
-            beat = second_beat
+        if old_first_tick + lengths_first[old_ind_first] >= second_tick + lengths_second[ind_second]:
+            second_tick += lengths_second[ind_second]
+            tick = second_tick
 
-            if second_beat == end_beat:
-                interval_lengths.append(second_beat-previous_beat)
+            if second_tick == end_tick:
+                interval_lengths.append(second_tick-previous_tick)
                 break
-            note_second = next(notes_second)
+            ind_second += 1
+            if ind_second == len(lengths_second):
+                raise ValueError(f'The second voice ends before tick {end_tick}.')
         
-        interval_lengths.append(beat-previous_beat)
+        interval_lengths.append(tick-previous_tick)
          
     return [intervals, interval_lengths]
 
+def note_at_tick(voice, tick):
+    """Returns the index of the first note of the voice (from voice_notes) that ends after the tick, 
+    and the tick where it starts. If no note ends after the tick, returns the last note and where it ends."""
+    ends = voice['Ends']
+    index = bisect.bisect_right(ends, tick)
+    if index == len(ends):
+        return index - 1, ends[-1]
+    if index == 0:
+        return 0, 0
+    return index, ends[index - 1]
+
 # ---------------------------------------------
 # check_consonant_percentage:
 # Takes two tracks as input and calculate the percentage of the track beats where it is consonant intervals bewteen the two tracks.
 # Return a float with percentage.
 # ---------------------------------------------
-def check_if_intervals_are_consonant_or_too_big(track1, track2):
+def check_if_intervals_are_consonant_or_too_big(track1, track2, track1_grid = None):
+    
+    consonant_total, over_maximum_interval = count_consonant_and_too_big_beats(track1, track2, track1_grid)
+            
+    consonant_rate = consonant_total/len(track1)
+    too_long_rate = over_maximum_interval/len(track1)
+    
+    return [consonant_rate, too_long_rate]
+
+# ---------------------------------------------
+# count_consonant_and_too_big_beats:
+# Help function to check_if_intervals_are_consonant_or_too_big. 
+# Returns the number of beats with consonant intervals and the number of beats with too big intervals.
+# ---------------------------------------------
+def count_consonant_and_too_big_beats(track1, track2, track1_grid = None):
     
-    # Get all intervals and their lengths
-    intervals, interval_lengths = get_all_intervals(track1, track2)
+    if len(track1) == 0:
+        raise ValueError('The first voice is empty.')
+
+    # Get all intervals and their lengths in ticks
+    intervals, interval_lengths = voice_intervals(voice_notes(track1), voice_notes(track2), first_voice_grid = track1_grid)
     
     # Get a generator for all notes in each track and skip to the notes at start_beat
     #notes_first = track1.get_notes()
@@ -722,11 +571,8 @@ def check_if_intervals_are_consonant_or_too_big(track1, track2):
         
         elif abs(intervals[i]) > 16:
             over_maximum_interval += interval_lengths[i]
-            
-    consonant_rate = consonant_total/len(track1)
-    too_long_rate = over_maximum_interval/len(track1)
     
-    return [consonant_rate, too_long_rate]
+    return [Track_Functions.ticks_to_beat(consonant_total), Track_Functions.ticks_to_beat(over_maximum_interval)]
 
 
 # ---------------------------------------------
@@ -776,10 +622,10 @@ def check_same_pattern(track1, track2):
 # Notes: Does not take tonality into account. If there are one or zero notes in the melody, it returns 0.
 # ------------------------------------------
 def check_melody_intervals(track):
-    # The melody we test is the track melody without pauses. It will work if the melody has multiple pitches
-    # in the same noteContainer, but it uses the first note in each container. A way to make it smarter would
-    # be to use the highest pitch, but I don't think that's necessary for now
-    melody = [note[2][0] for note in track.get_notes() if note[2]]
+    return melody_statistics(track)['check_melody_intervals']
+
+# Help function for check_melody_intervals, melody is the list of integer pitches of the notes in the track
+def fraction_of_good_melody_intervals(melody):
     good_intervals = [0,1,2,3,4,5,7,12]
     
     if len(melody) <= 1:
@@ -788,7 +634,7 @@ def check_melody_intervals(track):
     # count number of good intervals 
     nmb = 0
     for i in range(len(melody)-1):
-        interval = Note(melody[i]).measure(Note(melody[i+1]))
+        interval = melody[i+1] - melody[i]
         if abs(interval) in good_intervals:
             nmb += 1     # one point if good interval    
         
@@ -796,7 +642,7 @@ def check_melody_intervals(track):
             # if the interval was a sixth up, count as good only if it is followed by downward motion
             # (doesn't matter here what kind of downward motion - if it's 'good', it will get a point
             # in the next iteration of the loop)
-            next_interval = Note(melody[i+1]).measure(Note(melody[i+2]))
+            next_interval = melody[i+2] - melody[i+1]
             if next_interval < 0:
                 nmb +=1
 
@@ -815,8 +661,10 @@ def check_melody_intervals(track):
 #       - the names of these functions could be better/clearer 
 #  ---------------------------------
 def check_motion_of_melody(track):
-    melody = [note[2][0] for note in track.get_notes() if note[2]]    
-    
+    return melody_statistics(track)['check_motion_of_melody']
+
+# Help function for check_motion_of_melody, melody is the list of integer pitches of the notes in the track
+def fraction_of_good_melody_motion(melody):
     if len(melody) <= 1:
         return 0
     
@@ -832,9 +680,7 @@ def check_motion_of_melody(track):
             skip_next_iteration = False
             continue 
 
-        note1 = Note(melody[i])
-        note2 = Note(melody[i+1])
-        interval = note1.measure(note2)
+        interval = melody[i+1] - melody[i]
 
         # Steps are always good        
         if abs(interval) <= 2:
@@ -860,8 +706,7 @@ def check_motion_of_melody(track):
         # without looking at the next one            
         # --------- From here on we consider two intervals at a time ! ----------------
         skip_next_iteration = True      # So that the new interval is only counted once
-        note3 = Note(melody[i+2])
-        next_interval = note2.measure(note3)
+        next_interval = melody[i+2] - melody[i+1]
 
         # Good : Skip - step
         if abs(next_interval) <= 2:
@@ -889,14 +734,251 @@ def check_motion_of_melody(track):
 # and also the number of notes having strange durations.
 # ---------------------------------------------
 def check_note_durations(track):
-    notes = track.get_notes()
-    duration_counter = {16: 0, 8: 0, 16/3: 0, 4: 0, 8/3: 0, 2: 0, 4/3: 0, 1: 0, 'Strange': 0}
-    for note in notes:
-        duration = note[1]
-        if not duration in duration_counter:
-            duration_counter['Strange'] += 1
+    return melody_statistics(track)['check_note_durations']
+
+
+# ---------------------------------------------
+# melody_statistics:
+# Calculates all the one-voice measures of the track, without copying it.
+# Returns a dict from the name of each measure to the value it returns: repeating_note_length, 
+# average_note_length_clusters, repeating_note_pitch, repeating_passages, count_notes_on_beat, 
+# count_notes_in_scale (if key is given), count_tritone_or_seventh_in_two_skips, check_melody_intervals,
+# check_motion_of_melody and check_note_durations. exact and with_duration are the options of
+# repeating_note_pitch and repeating_passages.
+# The measures that depend on notes in other bars are calculated by sequence_statistics.
+# ---------------------------------------------
+def melody_statistics(track, key = None, exact = True, with_duration = False):
+    nr_notes = 0
+    lengths = {}
+    pitch_names = {}
+    nr_pitched_notes = 0
+    on_beat = 0
+    on_half_beat = 0
+    in_scale = 0
+    durations = {16: 0, 8: 0, 16/3: 0, 4: 0, 8/3: 0, 2: 0, 4/3: 0, 1: 0, 'Strange': 0}
+    if key is not None:
+        scale_notes = keys.get_notes(key)
+
+    notes = list(track.get_notes())
+    for note_beat, note_duration, note_container in notes:
+        nr_notes += 1
+        lengths[note_duration] = lengths.get(note_duration, 0) + 1
+
+        if note_duration in durations:
+            durations[note_duration] += 1
+        else:
+            durations['Strange'] += 1
+
+        if (note_beat % (1/note_duration)) == 0:
+            on_beat += 1
+        elif (note_beat % (1/(2*note_duration))) == 0:
+            on_half_beat += 1
+
+        if note_container is None:
+            continue
+        
+        nr_pitched_notes += 1
+        for note_pitch in note_container:
+            name = note_pitch.name if exact else note_pitch.name[0]
+            pitch_names[name] = pitch_names.get(name, 0) + 1
+        
+        if key is not None and len(note_container) > 0 and note_container[0].name in scale_notes:
+            in_scale += 1
+
+    statistics = {'repeating_note_length': 0.0 if nr_notes == 0 else max(lengths.values())/nr_notes,
+            'repeating_note_pitch': 0.0 if len(pitch_names) == 0 else max(pitch_names.values())/nr_pitched_notes,
+            'count_notes_on_beat': (0.0, 0.0) if nr_notes == 0 else (on_beat/nr_notes, on_half_beat/nr_notes),
+            'check_note_durations': durations}
+    if key is not None:
+        statistics['count_notes_in_scale'] = 0.0 if nr_notes == 0 else in_scale/nr_notes
+    statistics.update(sequence_statistics(notes, with_duration))
+
+    return statistics
+
+# ---------------------------------------------
+# sequence_statistics:
+# Calculates the one-voice measures that depend on the order of the notes over the whole track, also across
+# the bar lines: average_note_length_clusters, repeating_passages, count_tritone_or_seventh_in_two_skips, 
+# check_melody_intervals and check_motion_of_melody. notes are the notes of the track (see Track.get_notes).
+# The other measures can be calculated bar by bar, see bar_statistics.
+# ---------------------------------------------
+def sequence_statistics(notes, with_duration = False):
+    nr_notes = 0
+    nr_length_clusters = 0
+    previous_length = None
+    pitches = []                # Integer pitch of the first note of every note, None for rests
+    
+    # For repeating_passages: every passage of intervals within a bar that has been seen is a node in a trie, 
+    # where the passages are read from their last interval. Then all passages ending with the last interval are 
+    # found in one walk from the root. passage_children maps (node, interval) to the node one interval longer, 
+    # node 0 is the empty passage. Each node has its number of repetitions and its length in notes.
+    passage_children = {}
+    passage_repetitions = [0.0]
+    passage_lengths = [0.0]
+    current_passage = []
+    previous_pitch = None
+    previous_note_length = 0
+
+    for note_beat, note_duration, note_container in notes:
+        nr_notes += 1
+        if note_duration != previous_length:
+            nr_length_clusters += 1
+            previous_length = note_duration
+
+        if note_container is None or len(note_container) == 0:
+            pitches.append(None)
+            continue
+        pitch = int(note_container[0])
+        pitches.append(pitch)
+        
+        # If new bar or first Note, start a new passage
+        if note_beat == 0.0 or previous_pitch is None:
+            previous_pitch = pitch
+            previous_note_length = note_duration
+            current_passage = []
+            continue
+        
+        if with_duration:
+            # The duration changes are told apart by their text, so a change of 0 differs from 0.0
+            current_passage.append((pitch - previous_pitch, repr(previous_note_length - note_duration)))
+            previous_note_length = note_duration
         else:
-            duration_counter[duration] += 1
+            current_passage.append(pitch - previous_pitch)
+        previous_pitch = pitch
+        
+        # Find the longest passage ending here that has been seen before, and count one more repetition of it
+        node = 0
+        start = len(current_passage) - 1
+        while start >= 0 and (node, current_passage[start]) in passage_children:
+            node = passage_children[(node, current_passage[start])]
+            start -= 1
+        if node != 0:
+            passage_repetitions[node] += 1.0
+        
+        # Add the longer passages ending here
+        while start >= 0:
+            passage_children[(node, current_passage[start])] = len(passage_repetitions)
+            node = len(passage_repetitions)
+            passage_repetitions.append(0.0)
+            passage_lengths.append(len(current_passage) - start + 1.0)
+            start -= 1
+
+    statistics = {'average_note_length_clusters': 0.0 if nr_notes == 0 else nr_notes/nr_length_clusters}
+    
+    # Repeating passages
+    average_nm_of_rep = 0.0
+    average_len_of_repetition = 0.0
+    nmb_of_repeating_passages = 0.0
+    percentage_of_repetition = 0.0
+    for occurences, length_of_passage in zip(passage_repetitions, passage_lengths):
+        if occurences > 0.0:
+            average_nm_of_rep += occurences
+            percentage_of_repetition += length_of_passage*occurences
+            average_len_of_repetition += length_of_passage
+            nmb_of_repeating_passages += 1.0
+    if nmb_of_repeating_passages > 0.0:
+        average_nm_of_rep = average_nm_of_rep/nmb_of_repeating_passages
+        average_len_of_repetition = average_len_of_repetition/nmb_of_repeating_passages
+        percentage_of_repetition = percentage_of_repetition/nr_notes
+    statistics['repeating_passages'] = (average_nm_of_rep, average_len_of_repetition, percentage_of_repetition)
     
-    return duration_counter
+    # Tritones or sevenths in two skips
+    unwanted_intervals = [6,10,11]  # tritone, minor and major seventh 
+    nr_unwanted = 0
+    for i in range(len(pitches) - 2):
+        if pitches[i] is not None and pitches[i + 2] is not None and abs(pitches[i + 2] - pitches[i])%12 in unwanted_intervals:
+            nr_unwanted += 1
+    statistics['count_tritone_or_seventh_in_two_skips'] = nr_unwanted
+    
+    # The melody without pauses
+    melody = [pitch for pitch in pitches if pitch is not None]
+    statistics['check_melody_intervals'] = fraction_of_good_melody_intervals(melody)
+    statistics['check_motion_of_melody'] = fraction_of_good_melody_motion(melody)
+
+    return statistics
         
+
+# ---------------------------------------------
+# bar_statistics:
+# Returns the partial results of one bar for the measures that can be calculated bar by bar:
+# repeating_note_length, repeating_note_pitch (exact), count_notes_on_beat, count_notes_in_scale (if key is given),
+# check_note_durations and check_if_intervals_are_consonant_or_too_big (if input_bar, the bar of the other voice, is given).
+# input_grid is an optional Track_Functions.pitch_grid of input_bar.
+# The statistics of the bars of a track are combined with combine_bar_statistics.
+# ---------------------------------------------
+def bar_statistics(bar, key = None, input_bar = None, input_grid = None):
+    statistics = {'Notes': 0, 'Lengths': {}, 'Pitches': {}, 'Pitched notes': 0, 'On beat': 0, 'On half beat': 0, 
+            'In scale': 0, 'Durations': {16: 0, 8: 0, 16/3: 0, 4: 0, 8/3: 0, 2: 0, 4/3: 0, 1: 0, 'Strange': 0},
+            'Consonant': 0, 'Too big': 0}
+    if key is not None:
+        scale_notes = keys.get_notes(key)
+
+    for note_beat, note_duration, note_container in bar:
+        statistics['Notes'] += 1
+        statistics['Lengths'][note_duration] = statistics['Lengths'].get(note_duration, 0) + 1
+
+        if note_duration in statistics['Durations']:
+            statistics['Durations'][note_duration] += 1
+        else:
+            statistics['Durations']['Strange'] += 1
+
+        if (note_beat % (1/note_duration)) == 0:
+            statistics['On beat'] += 1
+        elif (note_beat % (1/(2*note_duration))) == 0:
+            statistics['On half beat'] += 1
+
+        if note_container is None:
+            continue
+        statistics['Pitched notes'] += 1
+        for note_pitch in note_container:
+            statistics['Pitches'][note_pitch.name] = statistics['Pitches'].get(note_pitch.name, 0) + 1
+        if key is not None and note_container[0].name in scale_notes:
+            statistics['In scale'] += 1
+
+    if input_bar is not None:
+        statistics['Consonant'], statistics['Too big'] = count_consonant_and_too_big_beats(Track().add_bar(input_bar), Track().add_bar(bar), input_grid)
+
+    return statistics
+
+# ---------------------------------------------
+# combine_bar_statistics:
+# Combines the bar_statistics of all bars in a track into the values of the measures for the whole track.
+# nr_input_bars is the length of the other voice, used to normalize the consonant and too big intervals.
+# count_notes_in_scale is only given if key is given, as in melody_statistics.
+# Returns a dict with the same values as the measures would return for the track.
+# ---------------------------------------------
+def combine_bar_statistics(bars_statistics, nr_input_bars = None, key = None):
+    nr_notes = 0
+    nr_pitched_notes = 0
+    lengths = {}
+    pitches = {}
+    durations = {16: 0, 8: 0, 16/3: 0, 4: 0, 8/3: 0, 2: 0, 4/3: 0, 1: 0, 'Strange': 0}
+    on_beat = 0
+    on_half_beat = 0
+    in_scale = 0
+    consonant = 0
+    too_big = 0
+    for statistics in bars_statistics:
+        nr_notes += statistics['Notes']
+        nr_pitched_notes += statistics['Pitched notes']
+        for length, occurences in statistics['Lengths'].items():
+            lengths[length] = lengths.get(length, 0) + occurences
+        for pitch, occurences in statistics['Pitches'].items():
+            pitches[pitch] = pitches.get(pitch, 0) + occurences
+        for duration, occurences in statistics['Durations'].items():
+            durations[duration] += occurences
+        on_beat += statistics['On beat']
+        on_half_beat += statistics['On half beat']
+        in_scale += statistics['In scale']
+        consonant += statistics['Consonant']
+        too_big += statistics['Too big']
+
+    values = {'repeating_note_length': 0.0 if nr_notes == 0 else max(lengths.values())/nr_notes,
+            'repeating_note_pitch': 0.0 if nr_pitched_notes == 0 else max(pitches.values())/nr_pitched_notes,
+            'count_notes_on_beat': (0.0, 0.0) if nr_notes == 0 else (on_beat/nr_notes, on_half_beat/nr_notes),
+            'check_note_durations': durations}
+    if key is not None:
+        values['count_notes_in_scale'] = 0.0 if nr_notes == 0 else in_scale/nr_notes
+    if nr_input_bars is not None:
+        values['check_if_intervals_are_consonant_or_too_big'] = [consonant/nr_input_bars, too_big/nr_input_bars]
+    return values